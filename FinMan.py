@@ -1,24 +1,1167 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog, filedialog
-from datetime import datetime
+import time
+
+_MODULE_T0 = time.perf_counter()
+
+from datetime import datetime, timedelta
+import bisect
+import calendar
+from collections import Counter, OrderedDict, deque, namedtuple
+import contextlib
+import copy
+import functools
+import hashlib
+import importlib
 import json
+import math
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import queue
+import re
+import sys
+import threading
+import tracemalloc
+import unicodedata
+
+# ==========================================
+# Startup Helpers
+# ==========================================
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access.
+
+    pandas and matplotlib take longer to import than building the Input tab,
+    so they are only pulled in when something actually uses them (or by the
+    background preload started in main).
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+# Tk is lazy too, so the headless commands (inbox, report) run without a display
+tk = LazyModule("tkinter")
+ttk = LazyModule("tkinter.ttk")
+messagebox = LazyModule("tkinter.messagebox")
+simpledialog = LazyModule("tkinter.simpledialog")
+filedialog = LazyModule("tkinter.filedialog")
+
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+mpl_figure = LazyModule("matplotlib.figure")
+mpl_backend_agg = LazyModule("matplotlib.backends.backend_agg")
+mpl_backend_tkagg = LazyModule("matplotlib.backends.backend_tkagg")
+mpl_collections = LazyModule("matplotlib.collections")
+mpl_patches = LazyModule("matplotlib.patches")
+
+PANDAS_MODULES = [np, pd]
+MATPLOTLIB_MODULES = [mpl_figure, mpl_backend_agg, mpl_backend_tkagg, mpl_collections, mpl_patches]
+
+
+class StartupTimer:
+    """Wall-clock marks (seconds since the module started importing).
+
+    Set FINMAN_STARTUP_REPORT=1 (or to a file path) to append one JSON line
+    per start to finman_startup.jsonl, which also works for --noconsole builds.
+    """
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self.marks = {}
+        self.lock = threading.Lock()
+        self.written = False
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.setdefault(name, round(time.perf_counter() - self.t0, 4))
+
+    def report(self):
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "marks": dict(sorted(self.marks.items(), key=lambda kv: kv[1])),
+        }
+
+    def write_report(self):
+        target = os.environ.get("FINMAN_STARTUP_REPORT")
+        if not target or self.written:
+            return
+        self.written = True
+        path = "finman_startup.jsonl" if target == "1" else target
+        line = json.dumps(self.report())
+        print(f"Startup timing: {line}")
+        try:
+            with open(path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Could not write startup report: {e}")
+
+
+STARTUP = StartupTimer(_MODULE_T0)
+MODULES_READY = threading.Event()
+
+
+class Instrumentation:
+    """Opt-in timings for DataManager operations and view refreshes.
+
+    Off by default (a disabled @instrumented call is one attribute check).
+    Turn it on with FINMAN_INSTRUMENT=1, or set it to a file path to also
+    get a JSON dump there on exit; the Diagnostics window can switch it on
+    for a running session. Keeps the last `capacity` calls in a ring
+    buffer plus per-operation counts, totals and a latency histogram.
+    """
+
+    # Histogram bucket upper edges in ms (the last bucket is "slower than 5 s")
+    EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self, enabled=False, capacity=2000):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.recent = deque(maxlen=capacity)
+        self.ops = {}
+
+    def record(self, op, seconds):
+        ms = seconds * 1000
+        with self.lock:
+            self.recent.append((time.time(), op, ms))
+            stats = self.ops.get(op)
+            if stats is None:
+                stats = self.ops[op] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "histogram": [0] * (len(self.EDGES_MS) + 1)}
+            stats["count"] += 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["histogram"][bisect.bisect_left(self.EDGES_MS, ms)] += 1
+
+    def clear(self):
+        with self.lock:
+            self.recent.clear()
+            self.ops = {}
+
+    @classmethod
+    def bucket_labels(cls):
+        return [f"<={e}ms" for e in cls.EDGES_MS] + [f">{cls.EDGES_MS[-1]}ms"]
+
+    def summary(self):
+        """Per-operation stats, slowest mean first"""
+        with self.lock:
+            ops = {op: dict(s, histogram=list(s["histogram"])) for op, s in self.ops.items()}
+        for s in ops.values():
+            s["mean_ms"] = s["total_ms"] / s["count"]
+        return dict(sorted(ops.items(), key=lambda kv: -kv[1]["mean_ms"]))
+
+    def slowest(self, n=50):
+        """(timestamp, op, ms) of the n slowest calls still in the ring buffer"""
+        with self.lock:
+            recent = list(self.recent)
+        return sorted(recent, key=lambda r: -r[2])[:n]
+
+    def report(self):
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "buckets": self.bucket_labels(),
+            "operations": self.summary(),
+            "slowest": [{"time": datetime.fromtimestamp(t).isoformat(timespec="milliseconds"), "op": op, "ms": round(ms, 3)}
+                        for t, op, ms in self.slowest()],
+        }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=4)
+
+    def write_exit_dump(self):
+        """Dump to FINMAN_INSTRUMENT when it names a file"""
+        target = os.environ.get("FINMAN_INSTRUMENT")
+        if not target or target == "1" or not self.ops:
+            return
+        try:
+            self.dump(target)
+        except OSError as e:
+            print(f"Could not write instrumentation dump: {e}")
+
+
+INSTRUMENTS = Instrumentation(enabled=bool(os.environ.get("FINMAN_INSTRUMENT")))
+
+
+def instrumented(method):
+    """Time calls to method in INSTRUMENTS (when enabled) as Class.method"""
+    op = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not INSTRUMENTS.enabled:
+            return method(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            INSTRUMENTS.record(op, time.perf_counter() - t0)
+    return wrapper
+
+
+# --- Memory accounting ---
+# Rows are (group, component, bytes, detail); bytes is None for things that
+# live outside Python's heap (Tk widgets) and are only counted.
+
+def deep_sizeof(obj, seen=None):
+    """Bytes reachable from obj. Objects already in seen are skipped (and
+    new ones added), so sharing a seen set counts shared objects once."""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        if pd.loaded and isinstance(o, (pd.DataFrame, pd.Series, pd.Index)):
+            usage = o.memory_usage(deep=True)
+            total += int(usage.sum()) if isinstance(o, pd.DataFrame) else int(usage)
+            continue
+        if np.loaded and isinstance(o, np.ndarray):
+            total += o.nbytes
+            continue
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        elif type(o).__module__ == __name__ and hasattr(o, "__dict__"):
+            # Our own helper objects (MonthView, SearchIndex, ...)
+            stack.append(vars(o))
+        elif type(o).__module__ == __name__ and hasattr(o, "__slots__"):
+            stack.extend(getattr(o, name) for name in o.__slots__)
+    return total
+
+
+def memory_report(rows, top=10):
+    """rows plus tracemalloc (when tracing) and peak RSS, as a JSON-able dict"""
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "rows": [{"group": g, "component": c, "bytes": b, "detail": d} for g, c, b, d in rows],
+        "accounted_bytes": sum(b for _, _, b, _ in rows if b),
+        "tracemalloc": None,
+        "peak_rss_bytes": None,
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+        report["tracemalloc"] = {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top": [{"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "bytes": s.size, "blocks": s.count} for s in stats],
+        }
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["peak_rss_bytes"] = rss if sys.platform == "darwin" else rss * 1024
+    except (ImportError, OSError):
+        pass # Windows
+    return report
+
+
+def format_bytes(n):
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+class MemorySampler:
+    """Compares successive memory reports and flags components that grew.
+
+    Growth counts when a component gained at least min_bytes and ratio of
+    its previous size (new components count from zero).
+    """
+
+    def __init__(self, min_bytes=1 << 20, ratio=0.2):
+        self.min_bytes = min_bytes
+        self.ratio = ratio
+        self.last = None
+
+    def sample(self, report):
+        """[(group, component, before, after)] that grew since the previous sample"""
+        sizes = {(r["group"], r["component"]): r["bytes"] for r in report["rows"] if r["bytes"] is not None}
+        if report["tracemalloc"]:
+            sizes[("Python", "tracemalloc current")] = report["tracemalloc"]["current_bytes"]
+        previous, self.last = self.last, sizes
+        if previous is None:
+            return []
+        grown = []
+        for key, after in sizes.items():
+            before = previous.get(key, 0)
+            if after - before >= self.min_bytes and after - before >= self.ratio * before:
+                grown.append((*key, before, after))
+        return grown
+
+
+def preload_heavy_modules():
+    """Import pandas and matplotlib (run in a background thread at startup)"""
+    try:
+        for module in PANDAS_MODULES:
+            module.load()
+        STARTUP.mark("pandas_loaded")
+        for module in MATPLOTLIB_MODULES:
+            module.load()
+        STARTUP.mark("matplotlib_loaded")
+    except Exception as e:
+        print(f"Background import failed: {e}")
+    finally:
+        MODULES_READY.set()
 
 # ==========================================
 # Data Manager & Backend Logic
 # ==========================================
 
 
+def is_iso_date(date_str):
+    """Cheap check for the "YYYY-MM-DD" dates the app writes"""
+    return (isinstance(date_str, str) and len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-"
+            and date_str[:4].isdigit() and date_str[5:7].isdigit() and date_str[8:].isdigit())
+
+
+def parse_year_month(date_str):
+    """(year, month) of a record date, None if it can't be parsed"""
+    if is_iso_date(date_str):
+        return int(date_str[0:4]), int(date_str[5:7])
+    try:
+        ts = pd.Timestamp(date_str)
+        return ts.year, ts.month
+    except (TypeError, ValueError):
+        return None
+
+
+def record_year(date_str):
+    """Year a record is saved under, None for dates save_data can't split by"""
+    if is_iso_date(date_str):
+        return int(date_str[:4])
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").year
+    except (TypeError, ValueError):
+        return None
+
+
+MonthDays = namedtuple("MonthDays", "days labels saturday weekend")
+
+
+@functools.lru_cache(maxsize=256)
+def month_day_meta(year, month):
+    """Real days of a month with "10.Sat" labels and Saturday/weekend flags"""
+    n_days = calendar.monthrange(year, month)[1]
+    days = tuple(range(1, n_days + 1))
+    weekdays = [calendar.weekday(year, month, day) for day in days]
+    labels = tuple(f"{day:02d}.{calendar.day_abbr[wd]}" for day, wd in zip(days, weekdays))
+    return MonthDays(days, labels, tuple(wd == 5 for wd in weekdays), tuple(wd >= 5 for wd in weekdays))
+
+
+DailyMatrix = namedtuple("DailyMatrix", "columns meta values row_totals col_totals rows total_row flags row_flags")
+
+# Suffix on Daily Trans cells holding an unusual amount (Treeview can't colour single cells)
+ANOMALY_MARK = " !"
+
+
+def build_daily_matrix(df, column, year, month, value="amount_eur", day_flags=None):
+    """Day-of-month x column calendar matrix for one month of expenses.
+
+    df holds that month's rows with a 'day' column. The pivot is reindexed
+    to the real days of the month; totals and the formatted Treeview rows
+    ("Day", cells..., "Total") are computed for the whole matrix at once.
+    Cells holding an expense flagged in df's 'anomaly' column, and the
+    totals of days in day_flags (one bool per day), get ANOMALY_MARK;
+    row_flags tells which days have any.
+    """
+    meta = month_day_meta(year, month)
+    if df.empty:
+        pivot = pd.DataFrame(index=pd.Index(meta.days, name="day"))
+    else:
+        pivot = df.pivot_table(index='day', columns=column, values=value, aggfunc='sum', fill_value=0)
+        pivot = pivot.reindex(meta.days, fill_value=0)
+    values = pivot.to_numpy(dtype=float)
+    row_totals = values.sum(axis=1)
+    col_totals = values.sum(axis=0)
+
+    # Flagged cells: (day, column) pairs with at least one flagged expense, plus the day totals
+    flags = np.zeros((len(meta.days), values.shape[1] + 1), dtype=bool)
+    if "anomaly" in df and df["anomaly"].any():
+        hits = df.loc[df["anomaly"], ["day", column]].drop_duplicates()
+        flags[pivot.index.get_indexer(hits["day"]), pivot.columns.get_indexer(hits[column])] = True
+    if day_flags is not None:
+        flags[:, -1] = day_flags
+
+    # Format every cell in one pass: labels | cells | row total
+    cells = np.char.mod("%.2f", np.column_stack([values, row_totals])) if len(meta.days) else np.empty((0, 1), dtype=str)
+    if flags.any():
+        cells = np.where(flags, np.char.add(cells, ANOMALY_MARK), cells)
+    rows = np.column_stack([np.array(meta.labels, dtype=object), cells.astype(object)]).tolist()
+    total_row = ["TOTAL"] + [f"{v:.2f}" for v in col_totals] + [f"{row_totals.sum():.2f}"]
+    return DailyMatrix([str(c) for c in pivot.columns], meta, values, row_totals, col_totals, rows, total_row,
+                       flags[:, :-1], flags.any(axis=1))
+
+
+YearMatrix = namedtuple("YearMatrix", "year columns values")
+
+
+def build_year_matrix(df, column, year, value="amount_eur"):
+    """Day-of-year x column totals for one year of expenses, from a single pivot.
+
+    values has a row for every day of the year (365/366), zeros where nothing was spent.
+    """
+    n_days = 366 if calendar.isleap(year) else 365
+    if df.empty:
+        return YearMatrix(year, [], np.zeros((n_days, 0)))
+    totals = df[value].groupby([df["date"].dt.dayofyear, df[column].fillna("")]).sum().unstack(fill_value=0.0)
+    totals = totals.reindex(range(1, n_days + 1), fill_value=0.0)
+    return YearMatrix(year, [str(c) for c in totals.columns], totals.to_numpy(dtype=float))
+
+
+def calendar_grid(year, daily):
+    """Daily values laid out as a 7 x weeks wall calendar (rows Mon..Sun, NaN outside the year)"""
+    offset = calendar.weekday(year, 1, 1)
+    slots = np.arange(len(daily)) + offset
+    grid = np.full((7, (len(daily) + offset + 6) // 7), np.nan)
+    grid[slots % 7, slots // 7] = daily
+    return grid
+
+
+class Query(namedtuple("Query", "region year month category subcategory subsubcategory "
+                                "inv_type date_range amount_gt amount_lt", defaults=(None,) * 10)):
+    """Filter for any view over expenses, income or investments.
+
+    Fields left as None or "All" (what the dropdowns show) don't filter.
+    date_range is an inclusive (start, end) pair, either end may be None.
+    Fields a record kind doesn't have are ignored for it, e.g. region for
+    income. apply_query() / DataManager.query() compile it into one mask.
+    """
+    __slots__ = ()
+
+    def active(self, kind="expenses"):
+        """{field: value} of the fields that filter records of this kind"""
+        return {field: value for field, value in self._asdict().items()
+                if value is not None and value != "All" and field in QUERY_COLUMNS[kind]}
+
+
+# Query field -> column, per record kind
+QUERY_COLUMNS = {
+    "expenses": {"region": "region", "year": "year", "month": "month", "category": "category",
+                 "subcategory": "subcategory", "subsubcategory": "subsubcategory", "date_range": "date",
+                 "amount_gt": "amount_eur", "amount_lt": "amount_eur"},
+    "income": {"year": "year", "month": "month", "date_range": "date", "amount_gt": "amount", "amount_lt": "amount"},
+    "investments": {"year": "year", "month": "month", "category": "category", "inv_type": "type",
+                    "date_range": "date", "amount_gt": "amount", "amount_lt": "amount"},
+}
+
+
+def range_bounds(date_range):
+    """(start, stop) datetime64 for an inclusive (start, end) date range; stop is the day after end"""
+    start, end = date_range
+    start = None if start is None else np.datetime64(pd.Timestamp(start).normalize())
+    stop = None if end is None else np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+    return start, stop
+
+
+def month_bounds(year, month=None):
+    """Inclusive (start, end) dates of a calendar year or month"""
+    if month is None:
+        return f"{int(year)}-01-01", f"{int(year)}-12-31"
+    return f"{int(year)}-{int(month):02d}-01", f"{int(year)}-{int(month):02d}-{calendar.monthrange(int(year), int(month))[1]:02d}"
+
+
+def intersect_ranges(a, b):
+    """Inclusive overlap of two (start, end) ranges (None = open end)"""
+    start = max((d for d in (a[0], b[0]) if d is not None), key=pd.Timestamp, default=None)
+    end = min((d for d in (a[1], b[1]) if d is not None), key=pd.Timestamp, default=None)
+    return start, end
+
+
+# Quick date ranges offered next to the year filters. Tax years run 1 Apr - 31 Mar.
+DATE_PRESETS = OrderedDict([
+    ("all", "All dates"),
+    ("last-30-days", "Last 30 days"),
+    ("last-90-days", "Last 90 days"),
+    ("last-365-days", "Last 365 days"),
+    ("this-tax-year", "This tax year"),
+    ("last-tax-year", "Last tax year"),
+])
+
+
+def preset_date_range(preset, today=None):
+    """Inclusive (start, end) ISO dates for a DATE_PRESETS key, None for "all" """
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    if preset == "all":
+        return None
+    if preset.startswith("last-") and preset.endswith("-days"):
+        days = int(preset.split("-")[1])
+        return (today - pd.Timedelta(days=days - 1)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+    tax_start = today.year if today.month >= 4 else today.year - 1
+    if preset == "last-tax-year":
+        tax_start -= 1
+    return f"{tax_start}-04-01", f"{tax_start + 1}-03-31"
+
+
+def apply_query(df, query, kind="expenses", fields=None):
+    """Rows of a DataManager.frame() matching query, selected with one combined mask"""
+    fields = query.active(kind) if fields is None else fields
+    if df.empty or not fields:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for field, value in fields.items():
+        col = df[QUERY_COLUMNS[kind][field]].to_numpy()
+        if field == "date_range":
+            start, stop = range_bounds(value)
+            if start is not None:
+                mask &= col >= start
+            if stop is not None:
+                mask &= col < stop
+        elif field == "amount_gt":
+            mask &= col > value
+        elif field == "amount_lt":
+            mask &= col < value
+        elif field in ("year", "month"):
+            mask &= col == int(value)
+        else:
+            mask &= col == value
+    return df if mask.all() else df[mask]
+
+
+class MonthView:
+    """One month of expenses for a region, with memoized calendar matrices.
+
+    Built once per (data version, region, year, month) by
+    DataManager.month_view() and shared by the three Daily Trans sub-tables
+    and the bottom chart. flagged is False while the anomaly scores for
+    this version are still to be computed (no cells are marked yet).
+    """
+
+    def __init__(self, df, year, month, day_flags=None, flagged=True):
+        self.df = df
+        self.year = year
+        self.month = month
+        self.day_flags = day_flags
+        self.flagged = flagged
+        self.matrices = {}
+
+    def matrix(self, level="category", category=None, subcategory=None):
+        key = (level, category, subcategory)
+        if key not in self.matrices:
+            query = Query(category=category, subcategory=subcategory if category is not None else None)
+            # Unusual whole-day totals only make sense for the unfiltered table
+            day_flags = self.day_flags if category is None else None
+            self.matrices[key] = build_daily_matrix(apply_query(self.df, query), level, self.year, self.month, day_flags=day_flags)
+        return self.matrices[key]
+
+
+# --- Anomaly detection ---
+# Robust z-score: (x - median) / (1.4826 * MAD) within each group, so a few
+# huge values don't inflate the baseline the way mean/std would. Groups with
+# fewer than ANOMALY_MIN_COUNT values are never flagged.
+
+ANOMALY_Z = 3.5
+ANOMALY_MIN_COUNT = 8
+
+Anomalies = namedtuple("Anomalies", "entry_z entry_typical day_z day_typical")
+
+
+def robust_z(values, keys, min_count=ANOMALY_MIN_COUNT):
+    """(z, median) Series aligned to values, with median/MAD per group of keys.
+
+    One groupby-transform pass over all groups. Where the MAD is 0 (most
+    values identical) the mean absolute deviation is used instead, and a
+    group with no spread at all gets z = 0.
+    """
+    groups = values.groupby(keys, sort=False, dropna=False)
+    ids = groups.ngroup()
+    by_id = values.groupby(ids, sort=False)
+    median = by_id.transform("median")
+    deviation = (values - median).abs()
+    by_dev = deviation.groupby(ids, sort=False)
+    spread = 1.4826 * by_dev.transform("median")
+    spread = spread.where(spread > 0, 1.2533 * by_dev.transform("mean"))
+    z = ((values - median) / spread.where(spread > 0)).fillna(0.0)
+    z[by_id.transform("size") < min_count] = 0.0
+    return z, median
+
+
+# --- Rolling windows and forecasting ---
+# Both work on a month-indexed frame (PeriodIndex, no gaps) with one column
+# per series, so every category path is handled by the same vectorized call.
+
+ROLLING_WINDOWS = (3, 6, 12)
+
+
+def fill_months(df):
+    """Reindex a PeriodIndex[M] frame to every month from first to last (missing -> 0)"""
+    if df.empty:
+        return df
+    return df.reindex(pd.period_range(df.index.min(), df.index.max(), freq="M"), fill_value=0.0)
+
+
+def rolling_stats(monthly, windows=ROLLING_WINDOWS, stats=("mean", "median")):
+    """{(stat, window): frame} of trailing rolling stats for every column.
+
+    A value needs a full window of history, so the first window-1 months are NaN.
+    """
+    result = {}
+    for window in windows:
+        rolling = monthly.rolling(window, min_periods=window)
+        for stat in stats:
+            result[(stat, window)] = getattr(rolling, stat)()
+    return result
+
+
+def seasonal_forecast(monthly, horizon=6, season=12):
+    """Next `horizon` months of every column: trend + average seasonal offset.
+
+    Level is the mean of the last season months, the trend is the change
+    against the season before (flat with less than two seasons of history)
+    and each calendar month adds its average deviation from the mean (none
+    with less than one season).
+    """
+    if len(monthly) == 0:
+        return pd.DataFrame(columns=monthly.columns, dtype=float)
+    future = pd.period_range(monthly.index[-1] + 1, periods=horizon, freq="M")
+    values = monthly.astype(float)
+    recent = values.iloc[-season:]
+    level = recent.mean()
+    if len(values) >= 2 * season:
+        slope = (level - values.iloc[-2 * season:-season].mean()) / season
+    else:
+        slope = level * 0.0
+    if len(values) >= season:
+        offsets = values.groupby(values.index.month).mean() - values.mean()
+        seasonal = offsets.reindex(future.month).fillna(0.0).to_numpy()
+    else:
+        seasonal = np.zeros((horizon, len(values.columns)))
+    # The level sits in the middle of the last season, so step h is (season - 1) / 2 + h months on
+    steps = (season - 1) / 2 + np.arange(1, horizon + 1)
+    forecast = level.to_numpy() + np.outer(steps, slope.to_numpy()) + seasonal
+    return pd.DataFrame(forecast, index=future, columns=monthly.columns)
+
+
+# --- Monte Carlo projection ---
+
+PROJECTION_PERCENTILES = (5, 25, 50, 75, 95)
+PROJECTION_MIN_SAMPLES = 3  # past months needed per calendar month to draw by season
+
+
+def project_balance(flows, start, months=120, paths=10_000, percentiles=PROJECTION_PERCENTILES, seed=None):
+    """Percentile bands of future balances, bootstrapped from past months.
+
+    flows is a monthly Series (PeriodIndex, no gaps) of balance changes.
+    Every path draws a whole past month for each future month, from the
+    same calendar month when every calendar month has at least
+    PROJECTION_MIN_SAMPLES past months (keeps seasonality; with fewer,
+    every path would replay the same year), else from any past month.
+    The balance is start + the running sum. All paths are one
+    (paths x months) array: no per-path loop.
+    Returns (bands with one row per percentile, share of paths that dip below 0).
+    """
+    values = flows.to_numpy(dtype=float)
+    rng = np.random.default_rng(seed)
+    future = pd.period_range(flows.index[-1] + 1, periods=months, freq="M")
+    calendar_month = flows.index.month.to_numpy() - 1
+    counts = np.bincount(calendar_month, minlength=12)
+    if counts.min() >= PROJECTION_MIN_SAMPLES:
+        # Rows sorted by calendar month; draw an offset inside each future month's block
+        order = np.argsort(calendar_month, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        target = future.month.to_numpy() - 1
+        offsets = (rng.random((paths, months)) * counts[target]).astype(np.int64)
+        draws = order[starts[target] + offsets]
+    else:
+        draws = rng.integers(0, len(values), size=(paths, months))
+    balances = np.cumsum(values[draws], axis=1)
+    balances += start
+    bands = np.percentile(balances, percentiles, axis=0)
+    shortfall = float((balances.min(axis=1) < 0).mean())
+    return pd.DataFrame(bands.T, index=future, columns=[f"p{p}" for p in percentiles]), shortfall
+
+
+# --- Quantile sketches ---
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+SpendSketches = namedtuple("SpendSketches", "sizes daily day_totals day_updates")
+
+
+class QuantileSketch:
+    """Mergeable streaming quantile sketch with relative-error buckets.
+
+    Values land in log-spaced buckets (bucket k covers gamma^(k-1)..gamma^k),
+    so any quantile is within ACCURACY of the true value. Merging adds
+    bucket counts and a value can be taken out again with count=-1, which
+    is how a day's running total is replaced. Values <= 0 count as 0.
+    """
+    __slots__ = ("counts", "zeros", "n")
+    ACCURACY = 0.01
+    GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+    ZERO = -(2 ** 31)  # bucket key used for values <= 0
+
+    def __init__(self):
+        self.counts = {}
+        self.zeros = 0
+        self.n = 0
+
+    @classmethod
+    def keys(cls, values):
+        """Bucket keys for an array of values (ZERO for values <= 0)"""
+        values = np.asarray(values, dtype=float)
+        keys = np.full(values.shape, cls.ZERO, dtype=np.int64)
+        positive = values > 0
+        keys[positive] = np.ceil(np.log(values[positive]) / cls.LOG_GAMMA)
+        return keys
+
+    @classmethod
+    def from_buckets(cls, keys, counts):
+        """Sketch holding counts[i] values in bucket keys[i]"""
+        sketch = cls()
+        sketch.counts = dict(zip(keys, counts))
+        sketch.zeros = sketch.counts.pop(cls.ZERO, 0)
+        sketch.n = sum(counts)
+        return sketch
+
+    def add_key(self, key, count=1):
+        if key == self.ZERO:
+            self.zeros += count
+        else:
+            left = self.counts.get(key, 0) + count
+            if left:
+                self.counts[key] = left
+            else:
+                del self.counts[key]
+        self.n += count
+
+    def add(self, value, count=1):
+        if value != value: # NaN
+            return
+        self.add_key(math.ceil(math.log(value) / self.LOG_GAMMA) if value > 0 else self.ZERO, count)
+
+    def merge(self, other):
+        counts = self.counts
+        for key, count in other.counts.items():
+            counts[key] = counts.get(key, 0) + count
+        self.zeros += other.zeros
+        self.n += other.n
+        return self
+
+    def quantiles(self, qs=QUANTILES):
+        """Values at each quantile in qs (NaN when empty)"""
+        if self.n <= 0:
+            return [float("nan")] * len(qs)
+        keys = sorted(self.counts)
+        cumulative = np.cumsum([self.counts[k] for k in keys]) + self.zeros
+        result = []
+        for q in qs:
+            rank = q * (self.n - 1)
+            if rank < self.zeros:
+                result.append(0.0)
+                continue
+            key = keys[min(int(np.searchsorted(cumulative, rank, side="right")), len(keys) - 1)]
+            # Middle of the bucket, in relative terms
+            result.append(2 * self.GAMMA ** key / (self.GAMMA + 1))
+        return result
+
+
+# --- Investment performance ---
+
+def xirr(groups, years, amounts, n_groups, lo=-0.99, hi=10.0, tol=1e-9, max_iter=100):
+    """Annual money-weighted return of every group of cash flows at once.
+
+    Flow i of group groups[i] is amounts[i] (negative = paid in) at years[i]
+    years after the group's start. Solves NPV(rate) = 0 for all groups
+    together: a Newton step where it stays inside the bracket, bisection
+    where it doesn't. NaN where NPV has no sign change in [lo, hi] (e.g.
+    nothing returned yet).
+    """
+    groups = np.asarray(groups)
+    years = np.asarray(years, dtype=float)
+    amounts = np.asarray(amounts, dtype=float)
+
+    def npv(rate):
+        discount = (1.0 + rate[groups]) ** -years
+        value = np.bincount(groups, amounts * discount, n_groups)
+        slope = np.bincount(groups, -years * amounts * discount / (1.0 + rate[groups]), n_groups)
+        return value, slope
+
+    lo = np.full(n_groups, lo)
+    hi = np.full(n_groups, hi)
+    f_lo, _ = npv(lo)
+    f_hi, _ = npv(hi)
+    solvable = np.sign(f_lo) * np.sign(f_hi) < 0
+    rate = np.where(solvable, 0.1, np.nan)
+    active = solvable.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        value, slope = npv(np.where(active, rate, 0.0))
+        # Keep the root bracketed
+        below = np.sign(value) == np.sign(f_lo)
+        lo = np.where(active & below, rate, lo)
+        f_lo = np.where(active & below, value, f_lo)
+        hi = np.where(active & ~below, rate, hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = rate - value / slope
+        inside = np.isfinite(step) & (step > lo) & (step < hi)
+        new = np.where(inside, step, (lo + hi) / 2)
+        done = active & ((np.abs(new - rate) < tol) | (value == 0))
+        rate = np.where(active, new, rate)
+        active &= ~done
+    return rate
+
+
+def queued_while_loading(method):
+    """Defer a DataManager write until a background load has finished.
+
+    Writing while only part of the ledger is in memory would save partial
+    years and stale balances, so the call is recorded and replayed in order
+    by finish_loading().
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.loading:
+            self.pending_writes.append((method.__name__, args, kwargs))
+            return None
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def index_label(value):
+    """Normalise a category value for the indexes (None/NaN from CSV -> '')"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return value
+
+
+def read_export_file(filepath):
+    """Records from a FinMan export (finance_data JSON or the combined CSV).
+
+    Returns a dict shaped like the JSON files: income / expenses /
+    investments lists, plus categories and balances when the file has them.
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == ".json":
+        with open(filepath, 'r') as f:
+            content = json.load(f)
+        if not isinstance(content, dict):
+            raise ValueError("Not a FinMan export: expected a JSON object")
+        for key in ("income", "expenses", "investments"):
+            records = content.setdefault(key, [])
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                raise ValueError(f"'{key}' must be a list of records")
+        return content
+    if extension != ".csv":
+        raise ValueError(f"Unsupported file type: {extension}")
+
+    df = pd.read_csv(filepath)
+    exp_df = df[df["Record Type"] == "Expense"].rename(columns={
+        "Region": "region", "Category": "category", "Subcategory": "subcategory",
+        "Sub Subcategory": "subsubcategory", "Amount Local": "amount_local", "Rate": "rate",
+        "Amount EUR": "amount_eur", "Date": "date"})
+    inc_df = df[df["Record Type"] == "Income"].rename(columns={"Source": "source", "Amount EUR": "amount", "Date": "date"})
+    inv_df = df[df["Record Type"] == "Investment"].rename(columns={
+        "Type": "type", "Category": "category", "Amount EUR": "amount", "Date": "date",
+        "Description": "description", "Name": "name", "Address": "address"})
+    inv_df = inv_df.assign(name=inv_df["name"].fillna(""), address=inv_df["address"].fillna(""))
+    return {
+        "expenses": exp_df[["region", "category", "subcategory", "subsubcategory",
+                            "amount_local", "rate", "amount_eur", "date"]].to_dict("records"),
+        "income": inc_df[["source", "amount", "date"]].assign(type="EUR").to_dict("records"),
+        "investments": inv_df[["type", "category", "amount", "date", "description",
+                               "name", "address"]].to_dict("records"),
+    }
+
+
+# ==========================================
+# Search
+# ==========================================
+
+# Spelling variants folded together before indexing, so "Müller"/"Mueller"
+# and "Qarze hasanah"/"Karje hasana" meet on the same key. German first,
+# then common Bengali romanisation variants.
+TRANSLITERATION_RULES = [
+    ("ae", "a"), ("oe", "o"), ("ue", "u"),
+    ("sh", "s"), ("kh", "k"), ("gh", "g"), ("ph", "f"), ("bh", "b"), ("th", "t"), ("dh", "d"), ("ch", "c"),
+    ("q", "k"), ("z", "j"), ("v", "b"), ("y", "i"), ("ee", "i"), ("oo", "u"),
+]
+TOKEN_RE = re.compile(r"[\w\u0980-\u09FF]+")
+
+
+def fold_token(token):
+    """Search key of one word: casefolded, accents stripped, variants folded"""
+    token = unicodedata.normalize("NFKD", token.casefold())
+    token = "".join(c for c in token if not unicodedata.combining(c))
+    for variant, key in TRANSLITERATION_RULES:
+        token = token.replace(variant, key)
+    token = re.sub(r"(.)\1+", r"\1", token)
+    if len(token) > 3 and token.endswith("h"):
+        token = token[:-1]
+    return token
+
+
+def search_keys(text):
+    return [key for key in (fold_token(t) for t in TOKEN_RE.findall(str(text or ""))) if key]
+
+
+class SearchIndex:
+    """Incremental inverted index: folded word -> documents containing it.
+
+    Prefix matches come from the sorted vocabulary (bisect), one-typo
+    matches from a table of every word with one letter deleted, so a lookup
+    never scans the vocabulary.
+    """
+    MAX_PREFIX_KEYS = 200
+
+    def __init__(self):
+        self.postings = {}   # key -> set of doc ids
+        self.docs = {}       # doc id -> indexed text
+        self.vocab = []      # sorted keys
+        self.deletes = {}    # key with one letter removed -> keys
+
+    def add(self, doc, text):
+        if doc in self.docs:
+            return
+        self.docs[doc] = text
+        for key in search_keys(text):
+            if key not in self.postings:
+                self.postings[key] = set()
+                bisect.insort(self.vocab, key)
+                for variant in self.deletions(key):
+                    self.deletes.setdefault(variant, set()).add(key)
+            self.postings[key].add(doc)
+
+    @staticmethod
+    def deletions(key):
+        return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+    def expand(self, term):
+        """{key: score} for a query word: exact 3, prefix 2, one typo 1"""
+        found = {}
+        i = bisect.bisect_left(self.vocab, term)
+        end = min(len(self.vocab), i + self.MAX_PREFIX_KEYS)
+        while i < end and self.vocab[i].startswith(term):
+            found[self.vocab[i]] = 3 if self.vocab[i] == term else 2
+            i += 1
+        if len(term) >= 3:
+            for variant in self.deletions(term):
+                for key in self.deletes.get(variant, ()):
+                    found.setdefault(key, 1)
+        return found
+
+    def search(self, text, limit=50):
+        """Doc ids matching every word of text, best first"""
+        scores = None
+        for term in search_keys(text):
+            hits = {}
+            for key, score in self.expand(term).items():
+                for doc in self.postings[key]:
+                    if hits.get(doc, 0) < score:
+                        hits[doc] = score
+            scores = hits if scores is None else {d: scores[d] + sc for d, sc in hits.items() if d in scores}
+            if not scores:
+                return []
+        return sorted(scores, key=scores.get, reverse=True)[:limit] if scores else []
+
+
+# Fields that identify a record when ingesting exports (see ingest_exports)
+RECORD_KEYS = {
+    "income": ("source", "amount", "date"),
+    "expenses": ("region", "category", "subcategory", "subsubcategory", "amount_local", "date"),
+    "investments": ("type", "category", "amount", "date", "description", "name"),
+}
+
+
+def expense_path(entry):
+    return tuple(index_label(entry.get(f)) for f in ("region", "category", "subcategory", "subsubcategory"))
+
+
+def record_key(kind, item):
+    key = []
+    for field in RECORD_KEYS[kind]:
+        value = index_label(item.get(field))
+        if field.startswith("amount"):
+            try:
+                value = round(float(value), 2)
+            except (TypeError, ValueError):
+                pass
+        elif field == "date":
+            value = str(value)[:10]
+        key.append(value)
+    return tuple(key)
+
+
+# ==========================================
+# Bank Statement Import
+# ==========================================
+
+# Column layouts of the bank CSV exports we know about. Extra or changed
+# layouts can be added in finman_bank_profiles.json (same shape, keyed by name).
+# "amount" is a signed column; banks that split money out/in use "debit"/"credit".
+BANK_PROFILES = {
+    "DKB (GER)": {
+        "region": "GER", "sep": ";", "decimal": ",", "thousands": ".", "encoding": "utf-8-sig",
+        "date_format": "%d.%m.%y",
+        "columns": {"date": "Buchungsdatum", "amount": "Betrag (€)",
+                    "payee": "Zahlungsempfänger*in", "description": "Verwendungszweck"},
+    },
+    "Sparkasse (GER)": {
+        "region": "GER", "sep": ";", "decimal": ",", "thousands": ".", "encoding": "latin-1",
+        "date_format": "%d.%m.%y",
+        "columns": {"date": "Buchungstag", "amount": "Betrag",
+                    "payee": "Beguenstigter/Zahlungspflichtiger", "description": "Verwendungszweck"},
+    },
+    "ING (GER)": {
+        "region": "GER", "sep": ";", "decimal": ",", "thousands": ".", "encoding": "latin-1",
+        "date_format": "%d.%m.%Y",
+        "columns": {"date": "Buchung", "amount": "Betrag",
+                    "payee": "Auftraggeber/Empfänger", "description": "Verwendungszweck"},
+    },
+    "BRAC Bank (BD)": {
+        "region": "BD", "sep": ",", "decimal": ".", "thousands": ",", "encoding": "utf-8-sig",
+        "date_format": "%d-%b-%Y",
+        "columns": {"date": "Transaction Date", "debit": "Withdrawal", "credit": "Deposit",
+                    "description": "Description"},
+    },
+    "Dutch-Bangla Bank (BD)": {
+        "region": "BD", "sep": ",", "decimal": ".", "thousands": ",", "encoding": "utf-8-sig",
+        "date_format": "%d/%m/%Y",
+        "columns": {"date": "Date", "debit": "Debit", "credit": "Credit", "description": "Particulars"},
+    },
+}
+
+BANK_PROFILES_FILE = "finman_bank_profiles.json"
+IMPORT_RULES_FILE = "finman_import_rules.json"
+REVIEW_QUEUE_FILE = "finman_review_queue.json"
+BUDGETS_FILE = "finman_budgets.json"
+
+
+def load_json_file(path, default):
+    """Contents of a small settings file, default if it is missing or broken"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json_file(path, content):
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f, indent=4, ensure_ascii=False, default=str)
+    except OSError as e:
+        print(f"Error saving {path}: {e}")
+
+
+def bank_profiles():
+    """Built-in profiles plus the user's own from finman_bank_profiles.json"""
+    profiles = dict(BANK_PROFILES)
+    profiles.update(load_json_file(BANK_PROFILES_FILE, {}))
+    return profiles
+
+
+class CategoryMatcher:
+    """Keyword rules -> category path, matched with one compiled alternation.
+
+    Every rule pattern is a plain keyword (case-insensitive). They are all
+    joined into a single regex, so a column of payee/description texts is
+    categorized by one str.extract pass instead of trying each rule on each
+    row. The leftmost keyword in a text wins; at the same position the
+    longer keyword wins.
+    """
+
+    def __init__(self, rules):
+        self.rules = {}
+        for rule in rules:
+            key = str(rule.get("pattern", "")).strip().lower()
+            if key:
+                self.rules.setdefault(key, rule)
+        keys = sorted(self.rules, key=len, reverse=True)
+        self.regex = re.compile("(" + "|".join(map(re.escape, keys)) + ")", re.IGNORECASE) if keys else None
+
+    def match(self, text):
+        """Rule for one text, None if no keyword occurs in it"""
+        found = self.regex.search(text) if self.regex and text else None
+        return self.rules[found.group(1).lower()] if found else None
+
+    def match_series(self, texts):
+        """Matched keyword (the rules key) per text, NaN where nothing matched"""
+        if self.regex is None:
+            return pd.Series(np.nan, index=texts.index, dtype=object)
+        return texts.str.extract(self.regex, expand=False).str.lower()
+
+
+def find_header_row(filepath, profile, limit=50):
+    """Line number of the column header (some exports start with account info lines)"""
+    date_col = profile["columns"]["date"]
+    with open(filepath, "r", encoding=profile.get("encoding", "utf-8"), errors="replace") as f:
+        for i, line in enumerate(f):
+            if i >= limit:
+                break
+            if date_col in line.split(profile.get("sep", ",")) or f'"{date_col}"' in line:
+                return i
+    return 0
+
+
+def parse_statement_amounts(col, profile):
+    """Bank amount strings ("1.234,56", "-12,50 €") -> floats, NaN if unreadable"""
+    col = col.fillna("").astype(str).str.replace(r"[^\d,.\-+]", "", regex=True)
+    if profile.get("thousands"):
+        col = col.str.replace(profile["thousands"], "", regex=False)
+    if profile.get("decimal", ".") != ".":
+        col = col.str.replace(profile["decimal"], ".", regex=False)
+    return pd.to_numeric(col, errors="coerce")
+
+
+def statement_frame(chunk, profile):
+    """Normalise one chunk of a bank CSV to date / amount / payee / description / text"""
+    cols = profile["columns"]
+    out = pd.DataFrame(index=chunk.index)
+    out["date"] = pd.to_datetime(chunk[cols["date"]].str.strip(), format=profile.get("date_format"), errors="coerce")
+    if "amount" in cols:
+        out["amount"] = parse_statement_amounts(chunk[cols["amount"]], profile)
+    else:
+        credit = parse_statement_amounts(chunk[cols["credit"]], profile).fillna(0)
+        debit = parse_statement_amounts(chunk[cols["debit"]], profile).fillna(0)
+        out["amount"] = (credit - debit.abs()).where(chunk[cols["credit"]].str.strip().astype(bool) | chunk[cols["debit"]].str.strip().astype(bool))
+    for key in ("payee", "description"):
+        out[key] = chunk[cols[key]].fillna("").str.strip() if key in cols else ""
+    out["text"] = out["payee"] + " " + out["description"]
+    return out
+
+
+def format_budget_alert(alert):
+    currency = "Tk" if alert["region"] == "BD" else "EUR"
+    path = " > ".join(alert["path"]) or "All categories"
+    return (f"{path} ({alert['region']}, {alert['month']}): {alert['spent'] / alert['budget']:.0%} of the "
+            f"{alert['budget']:.2f} {currency} budget used ({alert['threshold']:.0%} alert)")
+
+
 class DataManager:
 
         # ==========================================
     # UPDATED Data Manager Methods (Flat File Structure)
     # ==========================================
 
-    def __init__(self):
+    def __init__(self, autoload=True):
         self.DEFAULT_RATE = 140.0
         
         self.defaults = {
@@ -36,100 +1179,84 @@ class DataManager:
         }
         
         # Start with defaults
-        self.data = self.defaults.copy()
+        self.data = copy.deepcopy(self.defaults)
+        
+        # Bumped on every change, lets views cache anything derived from the data
+        self.version = 0
+        
+        # (year, month, region) -> {category: {subcategory: {subsubcategory: None}}}
+        # Dicts are used as ordered sets so dropdowns keep first-seen order.
+        self.category_index = {}
+        
+        # Full-text search, built on the first search and then kept up to date
+        self.search_index = None
+        
+        # Derived DataFrames, dropped whenever the version changes
+        self.frame_cache = {}
+        self.month_views = OrderedDict()
+        
+        # Background loading state (see start_background_load)
+        self.loading = False
+        self.pending_writes = []
+        self.load_queue = None
+        
+        # save_data calls inside batched_saves() only collect their years
+        self.save_depth = 0
+        self.deferred_saves = []
+        
+        # Bank import: keyword rules and rows waiting for a category
+        self.import_rules = load_json_file(IMPORT_RULES_FILE, [])
+        self.review_queue = load_json_file(REVIEW_QUEUE_FILE, [])
+        
+        # Budgets and month-to-date spend: (region, (year, month), path prefix)
+        # -> amount_local, prefixes from () (whole region) down to the full
+        # category path. Built on first use, then kept in step by index_expense.
+        self.budgets = load_json_file(BUDGETS_FILE, {"thresholds": [0.8, 1.0], "budgets": []})
+        self.budget_lookup = self.index_budgets(self.budgets["budgets"])
+        self.spend_counters = None
+        self.budget_alerts = []
+        # Quantile sketches of expense sizes and daily spend, also built on first use
+        self.spend_sketches = None
         
         # Load existing data from current directory
-        self.load_data()
+        if autoload:
+            self.load_data()
+    
+    def touch(self):
+        """Mark the in-memory data as changed (invalidates view caches)"""
+        self.version += 1
     
+    @instrumented
     def migrate_old_file(self, filepath):
         try:
             if not os.path.exists(filepath):
                 return False, "File not found."
     
-            extension = os.path.splitext(filepath)[1].lower()
+            old_data = read_export_file(filepath)
             count = 0
     
-            if extension == ".json":
-                with open(filepath, 'r') as f:
-                    old_data = json.load(f)
-    
-                # Merge Income
-                old_income = old_data.get("income", [])
-                self.data["income"].extend(old_income)
-                count += len(old_income)
+            # Merge Income, Expenses, Investments
+            for key in ("income", "expenses", "investments"):
+                self.data[key].extend(old_data[key])
+                count += len(old_data[key])
     
-                # Merge Expenses
-                old_expenses = old_data.get("expenses", [])
-                self.data["expenses"].extend(old_expenses)
-                count += len(old_expenses)
-    
-                # Merge Investments
-                old_investments = old_data.get("investments", [])
-                self.data["investments"].extend(old_investments)
-                count += len(old_investments)
-    
-                # Merge Categories (Update existing structure)
-                if "categories" in old_data:
-                    for region in old_data["categories"]:
-                        if region not in self.data["categories"]:
-                            self.data["categories"][region] = {}
-                        self.data["categories"][region].update(old_data["categories"][region])
+            # Merge Categories (Update existing structure)
+            self.merge_categories(old_data.get("categories", {}))
                 
-                # Update Initial Balance if present
-                if "initial_balance_eur" in old_data:
-                    self.data["initial_balance_eur"] = old_data["initial_balance_eur"]
+            # Update Initial Balance if present
+            if "initial_balance_eur" in old_data:
+                self.data["initial_balance_eur"] = old_data["initial_balance_eur"]
                 
-                # --- ADD THIS: Update Current Balances ---
-                if "current_balance_bd" in old_data:
-                    self.data["current_balance_bd"] = old_data["current_balance_bd"]
-                if "current_balance_eur" in old_data:
-                    self.data["current_balance_eur"] = old_data["current_balance_eur"]
-                # ---------------------------------------
-    
-            elif extension == ".csv":
-                df = pd.read_csv(filepath)
-    
-                # Process Expenses
-                exp_df = df[df["Record Type"] == "Expense"]
-                for _, row in exp_df.iterrows():
-                    self.data["expenses"].append({
-                        "region": row["Region"],
-                        "category": row["Category"],
-                        "subcategory": row["Subcategory"],
-                        "subsubcategory": row["Sub Subcategory"],
-                        "amount_local": row["Amount Local"],
-                        "rate": row["Rate"],
-                        "amount_eur": row["Amount EUR"],
-                        "date": row["Date"]
-                    })
-                count += len(exp_df)
-    
-                # Process Income
-                inc_df = df[df["Record Type"] == "Income"]
-                for _, row in inc_df.iterrows():
-                    self.data["income"].append({
-                        "source": row["Source"],
-                        "amount": row["Amount EUR"],
-                        "date": row["Date"],
-                        "type": "EUR"
-                    })
-                count += len(inc_df)
-    
-                # Process Investments
-                inv_df = df[df["Record Type"] == "Investment"]
-                for _, row in inv_df.iterrows():
-                    self.data["investments"].append({
-                        "type": row["Type"],
-                        "category": row["Category"],
-                        "amount": row["Amount EUR"],
-                        "date": row["Date"],
-                        "description": row["Description"],
-                        "name": row["Name"] if pd.notnull(row["Name"]) else "",
-                        "address": row["Address"] if pd.notnull(row["Address"]) else ""
-                    })
-                count += len(inv_df)
+            # --- ADD THIS: Update Current Balances ---
+            if "current_balance_bd" in old_data:
+                self.data["current_balance_bd"] = old_data["current_balance_bd"]
+            if "current_balance_eur" in old_data:
+                self.data["current_balance_eur"] = old_data["current_balance_eur"]
+            # ---------------------------------------
     
             # After merging data into memory, call save_data() to split by year
+            self.rebuild_indexes()
+            self.touch()
             self.save_data()
             return True, f"Successfully migrated {count} records. Data split by year and saved."
     
@@ -137,6 +1264,12 @@ class DataManager:
             print(f"Migration error: {e}")
             return False, f"Error during migration: {e}"
     
+    def merge_categories(self, categories):
+        for region in categories:
+            if region not in self.data["categories"]:
+                self.data["categories"][region] = {}
+            self.data["categories"][region].update(categories[region])
+    
    
     
     def import_old_data_action(self):
@@ -158,105 +1291,196 @@ class DataManager:
                 else:
                     messagebox.showerror("Error", msg)
     
+    @instrumented
     def load_data(self):
         """Loads data from finance_data_YEAR.json or legacy files like finance_data_all.json"""
-        # Reset to defaults
-        self.data = self.defaults.copy()
+        files = self.list_data_files()
+        self.begin_loading(files)
+    
+        for filename in files:
+            try:
+                self.merge_loaded_file(filename, self.read_data_file(filename))
+            except Exception as e:
+                print(f"Skipping file {filename} due to error: {e}")
         
+        self.finish_loading()
+
+    def list_data_files(self):
         # Find files matching the pattern finance_data*.json
         files = []
         for f in os.listdir('.'):
             if f.startswith("finance_data") and f.endswith(".json"):
                 files.append(f)
         
-        # Sort files so we load chronologically
+        # Sort files so we merge chronologically
         files.sort()
-        
-        loaded_years = []
-    
-        for filename in files:
+        return files
+
+    @staticmethod
+    def file_year(filename):
+        """Year from finance_data_YEAR.json, None for legacy files"""
+        last_part = filename.split('_')[-1].replace('.json', '')
+        return int(last_part) if last_part.isdigit() else None
+
+    def read_data_file(self, filename):
+        # Pure read, safe to call from the loader thread
+        with open(filename, 'r') as f:
+            return json.load(f)
+
+    def begin_loading(self, files):
+        # Reset to defaults
+        self.data = copy.deepcopy(self.defaults)
+        self.category_index = {}
+        self.spend_counters = None
+        self.spend_sketches = None
+        self.search_index = None
+        self.loading = True
+        self.load_files = files
+        self.loaded_chunks = {}
+        # Which file (by chronological rank) last set a balance / category,
+        # so files merged out of order still resolve like a chronological load
+        self.merge_ranks = {}
+
+    def merge_loaded_file(self, filename, loaded_year_data):
+        """Merge one parsed data file. Files may arrive in any order."""
+        rank = self.load_files.index(filename)
+
+        def newer(key):
+            if rank >= self.merge_ranks.get(key, -1):
+                self.merge_ranks[key] = rank
+                return True
+            return False
+
+        # Merge Categories
+        if "categories" in loaded_year_data:
+            for region, cats in loaded_year_data["categories"].items():
+                if region not in self.data["categories"]:
+                    self.data["categories"][region] = {}
+                for cat, subs in cats.items():
+                    if newer(("categories", region, cat)):
+                        self.data["categories"][region][cat] = subs
+
+        # --- Load Balances ---
+        # The latest file (chronologically) holds the most up-to-date balance.
+        for key in ("initial_balance_eur", "current_balance_bd", "current_balance_eur"):
+            if key in loaded_year_data and newer(key):
+                self.data[key] = loaded_year_data[key]
+
+        # Lists stay in chronological file order whatever order files arrive in
+        last_rank = max(self.loaded_chunks) if self.loaded_chunks else -1
+        self.loaded_chunks[rank] = loaded_year_data
+        for key in ("income", "expenses", "investments"):
+            if rank > last_rank:
+                self.data[key].extend(loaded_year_data.get(key, []))
+            else:
+                self.data[key] = [rec for r in sorted(self.loaded_chunks) for rec in self.loaded_chunks[r].get(key, [])]
+                self.search_index = None  # positions moved
+
+        for entry in loaded_year_data.get("expenses", []):
+            self.index_expense(entry)
+        self.touch()
+
+    def finish_loading(self):
+        """End a load and replay writes queued meanwhile; returns how many"""
+        self.loading = False
+        self.loaded_chunks = {}
+        self.search_index = None
+        self.touch()
+        
+        pending, self.pending_writes = self.pending_writes, []
+        for name, args, kwargs in pending:
             try:
-                # Attempt to parse the year from the filename
-                if "_" in filename:
-                    parts = filename.split('_')
-                    last_part = parts[-1].replace('.json', '')
-                    
-                    if last_part.isdigit():
-                        loaded_years.append(int(last_part))
-                
-                # Load the JSON content
-                with open(filename, 'r') as f:
-                    loaded_year_data = json.load(f)
-    
-                # Merge Categories
-                if "categories" in loaded_year_data:
-                    for region in loaded_year_data["categories"]:
-                        if region not in self.data["categories"]:
-                            self.data["categories"][region] = {}
-                        self.data["categories"][region].update(loaded_year_data["categories"][region])
-    
-                # Extend Lists
-                if "income" in loaded_year_data:
-                    self.data["income"].extend(loaded_year_data["income"])
-                if "expenses" in loaded_year_data:
-                    self.data["expenses"].extend(loaded_year_data["expenses"])
-                if "investments" in loaded_year_data:
-                    self.data["investments"].extend(loaded_year_data["investments"])
-                
-                # --- Load Balances ---
-                # We overwrite these. Since files are sorted, the last file (latest year)
-                # will contain the most up-to-date balance.
-                if "initial_balance_eur" in loaded_year_data:
-                    self.data["initial_balance_eur"] = loaded_year_data["initial_balance_eur"]
-                
-                if "current_balance_bd" in loaded_year_data:
-                    self.data["current_balance_bd"] = loaded_year_data["current_balance_bd"]
-                
-                if "current_balance_eur" in loaded_year_data:
-                    self.data["current_balance_eur"] = loaded_year_data["current_balance_eur"]
-                
+                getattr(self, name)(*args, **kwargs)
+            except Exception as e:
+                print(f"Queued {name} failed: {e}")
+        return len(pending)
+
+    def start_background_load(self):
+        """Read the data files in a worker thread, most recent year first.
+
+        Parsed files are queued; the caller merges them on its own thread with
+        apply_loaded_files(), so views never see a half-merged file. Writes
+        made before loading finishes are queued (see queued_while_loading).
+        """
+        files = self.list_data_files()
+        self.begin_loading(files)
+        self.load_queue = queue.Queue()
+        order = sorted(files, key=lambda f: (self.file_year(f) is None, -(self.file_year(f) or 0)))
+
+        def worker():
+            for filename in order:
+                try:
+                    self.load_queue.put((filename, self.read_data_file(filename), None))
+                except Exception as e:
+                    self.load_queue.put((filename, None, e))
+            self.load_queue.put(None)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    @instrumented
+    def apply_loaded_files(self):
+        """Merge the files the loader has read so far.
+
+        Returns (merged filenames, replayed write count or None while loading).
+        """
+        merged = []
+        while True:
+            try:
+                item = self.load_queue.get_nowait()
+            except queue.Empty:
+                return merged, None
+            if item is None:
+                return merged, self.finish_loading()
+            filename, content, error = item
+            try:
+                if error is not None:
+                    raise error
+                self.merge_loaded_file(filename, content)
+                merged.append(filename)
             except Exception as e:
                 print(f"Skipping file {filename} due to error: {e}")
    
 
-    def save_data(self):
-        """Saves data to finance_data_YEAR.json and finance_data_YEAR.csv in current directory"""
-        # 1. Determine which years have data
-        years = set()
-        
-        # Helper to extract year safely
-        def get_year(date_str):
-            try:
-                return datetime.strptime(date_str, "%Y-%m-%d").year
-            except:
-                return None
+    def save_data(self, years=None):
+        """Saves data to finance_data_YEAR.json and finance_data_YEAR.csv in current directory.
 
-        for item in self.data["income"]:
-            y = get_year(item["date"])
-            if y: years.add(y)
-            
-        for item in self.data["expenses"]:
-            y = get_year(item["date"])
-            if y: years.add(y)
-            
-        for item in self.data["investments"]:
-            y = get_year(item["date"])
-            if y: years.add(y)
+        years limits the rewrite to those years. The latest year is always
+        rewritten too, since load_data takes the balances from that file.
+        """
+        if self.save_depth:
+            # Inside batched_saves(): remember what to write (None = everything)
+            self.deferred_saves.append(None if years is None else set(years))
+            return
+        self.write_year_files(years)
+
+    @instrumented
+    def write_year_files(self, years=None):
+        """The writing half of save_data(), timed only when files are written"""
+        # 1. Bucket records by year in a single pass
+        buckets = {}
+        for key in ("income", "expenses", "investments"):
+            for item in self.data[key]:
+                y = record_year(item["date"])
+                if y:
+                    buckets.setdefault(y, {"income": [], "expenses": [], "investments": []})[key].append(item)
             
         # If no transactions exist yet, default to current year
-        if not years:
-            years.add(datetime.now().year)
+        if not buckets:
+            buckets[datetime.now().year] = {"income": [], "expenses": [], "investments": []}
+
+        targets = set(buckets) if years is None else {y for y in years if y} | {max(buckets)}
 
         # 2. Loop through years and save
-        for year in years:
+        for year in sorted(targets):
             # Construct filenames: finance_data_2024.json
             json_filename = f"finance_data_{year}.json"
             csv_filename = f"finance_data_{year}.csv"
 
-            # --- Filter Data for this Year ---
-            year_income = [i for i in self.data["income"] if get_year(i["date"]) == year]
-            year_expenses = [e for e in self.data["expenses"] if get_year(e["date"]) == year]
-            year_investments = [inv for inv in self.data["investments"] if get_year(inv["date"]) == year]
+            # --- Data for this Year ---
+            bucket = buckets.get(year, {"income": [], "expenses": [], "investments": []})
+            year_income = bucket["income"]
+            year_expenses = bucket["expenses"]
+            year_investments = bucket["investments"]
 
             # --- Prepare JSON Content ---
             year_json_content = {
@@ -280,6 +1504,18 @@ class DataManager:
             # --- Save CSV ---
             self._save_csv_content(csv_filename, year_income, year_expenses, year_investments)
 
+    @contextlib.contextmanager
+    def batched_saves(self):
+        """Write once at the end of the block instead of on every add_*/bulk call"""
+        self.save_depth += 1
+        try:
+            yield
+        finally:
+            self.save_depth -= 1
+            if not self.save_depth and self.deferred_saves:
+                saves, self.deferred_saves = self.deferred_saves, []
+                self.save_data(years=None if None in saves else set().union(*saves))
+
     # Keep the helper method from the previous step
     def _save_csv_content(self, filepath, income_list, expense_list, investment_list):
         rows = []
@@ -410,28 +1646,41 @@ class DataManager:
             if files_exist:
                 self.save_data()
     
+    @queued_while_loading
     def set_initial_balance(self, amount_eur):
         self.data["initial_balance_eur"] = float(amount_eur)
+        self.touch()
         self.save_data() 
         # Removed self.save_data_csv()
     
+    @queued_while_loading
     def update_category_structure(self, region, new_structure):
         self.data["categories"][region] = new_structure
+        self.touch()
         self.save_data()
         # Removed self.save_data_csv()
     
+    @queued_while_loading
+    @instrumented
     def add_income(self, source, amount, date, type="EUR"):
         entry = {"source": source, "amount": float(amount), "date": date, "type": type}
         self.data["income"].append(entry)
+        self.index_records("income", len(self.data["income"]) - 1)
         self.data["current_balance_eur"] += float(amount)
-        self.save_data()
+        self.touch()
+        self.save_data(years={record_year(date)})
         # Removed self.save_data_csv()
     
+    @queued_while_loading
+    @instrumented
     def add_bd_deposit(self, amount_tk):
         self.data["current_balance_bd"] += amount_tk
-        self.save_data()
+        self.touch()
+        self.save_data(years=())  # balances live in the latest year file
         # Removed self.save_data_csv()
     
+    @queued_while_loading
+    @instrumented
     def add_expense(self, region, cat, sub, subsub, amount_local, rate, date):
         amount_local = float(amount_local)
         
@@ -455,15 +1704,22 @@ class DataManager:
             "amount_eur": amount_eur,
             "date": date
         }
+        if self.budget_lookup:
+            self.spend_index() # so this entry is counted (and checked) incrementally
         self.data["expenses"].append(entry)
+        self.index_expense(entry, self.budget_alerts)
+        self.index_records("expenses", len(self.data["expenses"]) - 1)
         
         if region == "BD":
             self.data["current_balance_bd"] -= amount_local
         else:
             self.data["current_balance_eur"] -= amount_local
-        self.save_data()
+        self.touch()
+        self.save_data(years={record_year(date)})
         # Removed self.save_data_csv()
     
+    @queued_while_loading
+    @instrumented
     def add_investment(self, inv_type, category, amount, date, description, name=None, address=None):
         entry = {
             "type": inv_type, 
@@ -475,15 +1731,648 @@ class DataManager:
             "address": address
         }
         self.data["investments"].append(entry)
+        self.index_records("investments", len(self.data["investments"]) - 1)
         self.data["current_balance_eur"] -= float(amount)
-        self.save_data()
+        self.touch()
+        self.save_data(years={record_year(date)})
         # Removed self.save_data_csv()
     
-    def get_categories(self, region):
-        return self.data["categories"].get(region, {})
+    # --- Bulk entry ---
+    # Same records as the single add_* methods, but validated and converted
+    # column-wise, balances moved once and the touched years saved once.
+    
+    @staticmethod
+    def records_frame(records, required, defaults):
+        """DataFrame from a DataFrame or iterable of dicts, checked for required columns"""
+        df = records.copy() if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+        missing = [c for c in required if c not in df.columns]
+        if missing and not df.empty:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        for col, default in defaults.items():
+            if col not in df.columns:
+                df[col] = default
+            else:
+                df[col] = df[col].where(df[col].notna(), default)
+        return df.reset_index(drop=True)
+
+    @staticmethod
+    def validate_bulk(df, numeric_cols):
+        """Numeric columns as floats and dates as YYYY-MM-DD; raises ValueError on bad rows"""
+        bad = pd.Series(False, index=df.index)
+        for col in numeric_cols:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+            bad |= df[col].isna()
+        dates = pd.to_datetime(df["date"].astype(str), errors="coerce")
+        bad |= dates.isna()
+        if bad.any():
+            rows = bad[bad].index.tolist()
+            raise ValueError(f"{len(rows)} invalid rows (amount/date), first: {rows[:10]}")
+        df["date"] = dates.dt.strftime("%Y-%m-%d")
+        return df
+
+    # list -> (required columns, defaults, numeric columns) of its bulk records
+    BULK_SPECS = {
+        "income": (["amount", "date"], {"source": "", "type": "EUR"}, ["amount"]),
+        "expenses": (["region", "category", "amount_local", "date"],
+                     {"subcategory": "", "subsubcategory": "", "rate": 0.0}, ["amount_local", "rate"]),
+        "investments": (["type", "category", "amount", "date"],
+                        {"description": "", "name": None, "address": None}, ["amount"]),
+    }
+
+    def bulk_frame(self, key, records):
+        """Bulk records for one list as a validated DataFrame; raises ValueError on bad rows.
+
+        Nothing is booked, so callers can check several lists before adding any.
+        """
+        required, defaults, numeric = self.BULK_SPECS[key]
+        df = self.records_frame(records, required, defaults)
+        if df.empty:
+            return df
+        if key == "investments":
+            bad_type = ~df["type"].isin(["Investment", "Return"])
+            if bad_type.any():
+                raise ValueError(f"type must be Investment or Return, first bad rows: {bad_type[bad_type].index.tolist()[:10]}")
+        return self.validate_bulk(df, numeric)
+
+    def _commit_bulk(self, key, entries):
+        self.data[key].extend(entries)
+        self.index_records(key, len(self.data[key]) - len(entries))
+        self.touch()
+        self.save_data(years={record_year(e["date"]) for e in entries})
+
+    @queued_while_loading
+    @instrumented
+    def add_expenses_bulk(self, records):
+        """Add many expenses at once. Returns the number added."""
+        df = self.bulk_frame("expenses", records)
+        if df.empty: return 0
+        
+        # Same conversion as add_expense: GER is already EUR, BD falls back to DEFAULT_RATE
+        is_ger = df["region"] == "GER"
+        rate = df["rate"].where(df["rate"] != 0, self.DEFAULT_RATE).where(~is_ger, 1.0)
+        amount_eur = (df["amount_local"] / rate).where(rate > 0, 0.0).where(~is_ger, df["amount_local"])
+        
+        entries = pd.DataFrame({
+            "region": df["region"],
+            "category": df["category"],
+            "subcategory": df["subcategory"],
+            "subsubcategory": df["subsubcategory"],
+            "amount_local": df["amount_local"],
+            "rate": rate,
+            "amount_eur": amount_eur,
+            "date": df["date"],
+        }).to_dict("records")
+        
+        is_bd = df["region"] == "BD"
+        self.data["current_balance_bd"] -= float(df.loc[is_bd, "amount_local"].sum())
+        self.data["current_balance_eur"] -= float(df.loc[~is_bd, "amount_local"].sum())
+        if self.budget_lookup:
+            self.spend_index()
+        for entry in entries:
+            self.index_expense(entry, self.budget_alerts)
+        self._commit_bulk("expenses", entries)
+        return len(entries)
+
+    @queued_while_loading
+    @instrumented
+    def add_incomes_bulk(self, records):
+        """Add many income records at once. Returns the number added."""
+        df = self.bulk_frame("income", records)
+        if df.empty: return 0
+        entries = df[["source", "amount", "date", "type"]].to_dict("records")
+        self.data["current_balance_eur"] += float(df["amount"].sum())
+        self._commit_bulk("income", entries)
+        return len(entries)
+
+    @queued_while_loading
+    @instrumented
+    def add_investments_bulk(self, records):
+        """Add many investment/return records at once. Returns the number added."""
+        df = self.bulk_frame("investments", records)
+        if df.empty: return 0
+        entries = df[["type", "category", "amount", "date", "description", "name", "address"]].astype(object)
+        entries = entries.where(entries.notna(), None).to_dict("records")
+        # Like add_investment, both investments and returns are booked against the EUR balance
+        self.data["current_balance_eur"] -= float(df["amount"].sum())
+        self._commit_bulk("investments", entries)
+        return len(entries)
+
+    # --- Bank statement import ---
+    
+    @instrumented
+    def import_bank_statement(self, filepath, profile_name, chunksize=20000):
+        """Import a bank CSV export through the bulk entry path.
+
+        Money out becomes expenses, categorized by the keyword rules; rows no
+        rule matches go to the review queue. Money in becomes income (EUR
+        banks) or a BD deposit (BD banks). The file is read in chunks so
+        large exports don't have to fit in memory at once.
+        Returns counts: expenses, income, review, invalid.
+        """
+        profile = bank_profiles()[profile_name]
+        region = profile.get("region", "GER")
+        matcher = CategoryMatcher([r for r in self.import_rules if r.get("region", region) == region])
+        counts = {"expenses": 0, "income": 0, "review": 0, "invalid": 0}
+        
+        reader = pd.read_csv(filepath, sep=profile.get("sep", ","), encoding=profile.get("encoding", "utf-8"),
+                             skiprows=find_header_row(filepath, profile), dtype=str, keep_default_na=False,
+                             chunksize=chunksize)
+        # One save for the whole file; the queue is written even if a later
+        # chunk fails, so rows of the chunks already booked are not lost.
+        try:
+            with self.batched_saves():
+                for chunk in reader:
+                    frame = statement_frame(chunk, profile)
+                    valid = frame["date"].notna() & frame["amount"].notna() & (frame["amount"] != 0)
+                    counts["invalid"] += int((~valid).sum())
+                    frame = frame[valid]
+                    frame["date"] = frame["date"].dt.strftime("%Y-%m-%d")
+            
+                    # Money out -> expenses
+                    out = frame[frame["amount"] < 0]
+                    keys = matcher.match_series(out["text"])
+                    matched = out[keys.notna()]
+                    if not matched.empty:
+                        paths = pd.DataFrame([matcher.rules[k] for k in keys.dropna()], index=matched.index)
+                        counts["expenses"] += self.add_expenses_bulk(pd.DataFrame({
+                            "region": region,
+                            "category": paths["category"],
+                            "subcategory": paths.get("subcategory", ""),
+                            "subsubcategory": paths.get("subsubcategory", ""),
+                            "amount_local": -matched["amount"],
+                            "date": matched["date"],
+                        })) or 0
+                    unmatched = out[keys.isna()]
+                    if not unmatched.empty:
+                        items = unmatched[["date", "amount", "payee", "description"]].assign(
+                            amount=-unmatched["amount"], region=region, file=os.path.basename(filepath))
+                        self.review_queue.extend(items.to_dict("records"))
+                        counts["review"] += len(items)
+            
+                    # Money in -> income / BD deposit
+                    inc = frame[frame["amount"] > 0]
+                    if not inc.empty:
+                        if region == "BD":
+                            self.add_bd_deposit(float(inc["amount"].sum()))
+                            counts["income"] += len(inc)
+                        else:
+                            source = inc["payee"].where(inc["payee"] != "", inc["description"])
+                            counts["income"] += self.add_incomes_bulk(pd.DataFrame(
+                                {"source": source, "amount": inc["amount"], "date": inc["date"]})) or 0
+        finally:
+            save_json_file(REVIEW_QUEUE_FILE, self.review_queue)
+        return counts
+    
+    def add_import_rule(self, pattern, region, cat, sub="", subsub=""):
+        """Remember keyword -> category path for future imports"""
+        pattern = pattern.strip()
+        self.import_rules = [r for r in self.import_rules
+                             if not (r["pattern"].lower() == pattern.lower() and r.get("region") == region)]
+        self.import_rules.append({"pattern": pattern, "region": region, "category": cat,
+                                  "subcategory": sub, "subsubcategory": subsub})
+        save_json_file(IMPORT_RULES_FILE, self.import_rules)
+    
+    def resolve_review_items(self, positions, cat, sub="", subsub=""):
+        """Book queued rows as expenses under the given category and drop them from the queue"""
+        positions = set(positions)
+        picked = [item for i, item in enumerate(self.review_queue) if i in positions]
+        if not picked:
+            return 0
+        # Items from different statements can have different regions
+        df = pd.DataFrame(picked)
+        added = self.add_expenses_bulk(pd.DataFrame({
+            "region": df["region"], "category": cat, "subcategory": sub, "subsubcategory": subsub,
+            "amount_local": df["amount"], "date": df["date"]}))
+        self.review_queue = [item for i, item in enumerate(self.review_queue) if i not in positions]
+        save_json_file(REVIEW_QUEUE_FILE, self.review_queue)
+        return added or 0
+
+    def ingest_exports(self, contents):
+        """Book the records of several export files with one save at the end.
+
+        Records already in the ledger are skipped. Duplicates are counted, so
+        overlapping exports don't double-book, but two identical purchases on
+        the same day in one file are both kept. Records go through the bulk
+        entry path, so balances move by their amounts.
+        All lists are validated before any is booked, so a bad row (ValueError)
+        leaves the ledger untouched. Returns the number of records added per list.
+        """
+        frames = {}
+        for key in ("income", "expenses", "investments"):
+            seen = Counter(record_key(key, item) for item in self.data[key])
+            new = []
+            for content in contents:
+                in_file = Counter()
+                for item in content.get(key, []):
+                    k = record_key(key, item)
+                    in_file[k] += 1
+                    if in_file[k] > seen[k]:
+                        seen[k] += 1
+                        new.append(item)
+            frames[key] = self.bulk_frame(key, new)
+
+        added = {}
+        with self.batched_saves():
+            for key, add_bulk in (("income", self.add_incomes_bulk), ("expenses", self.add_expenses_bulk),
+                                  ("investments", self.add_investments_bulk)):
+                added[key] = (add_bulk(frames[key]) or 0) if len(frames[key]) else 0
+            
+            categories = [content["categories"] for content in contents if content.get("categories")]
+            if categories:
+                for cats in categories:
+                    self.merge_categories(cats)
+                self.touch()
+                self.save_data(years=())
+        return added
+
+    def get_categories(self, region):
+        return self.data["categories"].get(region, {})
+
+    # --- Cached views ---
+    def frame(self, kind="expenses"):
+        """Records of one kind as a DataFrame with parsed date/year/month/day (cached per version)"""
+        cached = self.frame_cache.get(kind)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        df = pd.DataFrame(self.data[kind])
+        if not df.empty:
+            df['date'] = pd.to_datetime(df['date'])
+            df['year'] = df['date'].dt.year
+            df['month'] = df['date'].dt.month
+            df['day'] = df['date'].dt.day
+            for col in ("amount", "amount_eur"):
+                if col in df:
+                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        self.frame_cache[kind] = (self.version, df)
+        return df
+
+    def expenses_frame(self):
+        return self.frame("expenses")
+
+    def partition_index(self, kind="expenses"):
+        """(year, month) -> row positions in frame(kind), cached per version"""
+        key = ("partitions", kind)
+        cached = self.frame_cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        df = self.frame(kind)
+        parts = {} if df.empty else {(int(y), int(m)): pos for (y, m), pos in df.groupby(["year", "month"]).indices.items()}
+        self.frame_cache[key] = (self.version, parts)
+        return parts
+
+    def date_sorted(self, kind="expenses"):
+        """(frame(kind) sorted by date, its dates as datetime64), cached per version"""
+        key = ("by_date", kind)
+        cached = self.frame_cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        df = self.frame(kind)
+        if not df.empty:
+            df = df.iloc[np.argsort(df["date"].to_numpy(), kind="stable")]
+        result = (df, df["date"].to_numpy() if not df.empty else np.empty(0, dtype="datetime64[ns]"))
+        self.frame_cache[key] = (self.version, result)
+        return result
+
+    def date_slice(self, kind="expenses", date_range=(None, None)):
+        """Records inside an inclusive date range, in date order.
+
+        Two binary searches on the date-sorted frame, then one contiguous
+        slice: O(log n + k) for k matching records.
+        """
+        df, dates = self.date_sorted(kind)
+        start, stop = range_bounds(date_range)
+        lo = 0 if start is None else np.searchsorted(dates, start, side="left")
+        hi = len(dates) if stop is None else np.searchsorted(dates, stop, side="left")
+        return df.iloc[lo:hi]
+
+    def query(self, kind="expenses", query=Query()):
+        """Rows of frame(kind) matching query.
+
+        A date range (with any year/month folded into it) is a binary-search
+        slice of the date index; a plain year/month filter is answered from
+        the partition index. Either way only those rows are touched, and the
+        remaining fields are ANDed into one mask.
+        """
+        df = self.frame(kind)
+        fields = query.active(kind)
+        if df.empty or not fields:
+            return df
+        if "date_range" in fields:
+            date_range = fields.pop("date_range")
+            if "year" in fields:
+                date_range = intersect_ranges(date_range, month_bounds(fields.pop("year"), fields.pop("month", None)))
+            df = self.date_slice(kind, date_range)
+        elif "year" in fields:
+            year = int(fields.pop("year"))
+            month = fields.pop("month", None)
+            parts = self.partition_index(kind)
+            keys = [(year, int(month))] if month is not None else [k for k in parts if k[0] == year]
+            positions = [parts[k] for k in keys if k in parts]
+            df = df.iloc[np.sort(np.concatenate(positions))] if positions else df.iloc[0:0]
+        return apply_query(df, query, kind, fields)
+
+    def month_view(self, region, year, month):
+        """MonthView for (region, year, month), shared until the data changes.
+
+        Anomaly marks are only added once anomalies() has run for this
+        version; the full-history scan is never started from here.
+        """
+        key = (self.version, region, int(year), int(month))
+        view = self.month_views.get(key)
+        found = self.cached_anomalies()
+        if view is None or (not view.flagged and found is not None):
+            df = self.query("expenses", Query(region=region, year=key[2], month=key[3]))
+            day_flags = None
+            if not df.empty and found is not None:
+                df = df.assign(anomaly=(found.entry_z.reindex(df.index, fill_value=0.0) > ANOMALY_Z).to_numpy())
+                start, end = month_bounds(key[2], key[3])
+                days = found.day_z.get(region if region in ("GER", "BD") else "All", pd.Series(dtype=float))
+                days = days.reindex(pd.date_range(start, end), fill_value=0.0)
+                day_flags = (days > ANOMALY_Z).to_numpy()
+            view = MonthView(df, key[2], key[3], day_flags, flagged=df.empty or found is not None)
+            self.month_views[key] = view
+            while len(self.month_views) > 24:
+                self.month_views.popitem(last=False)
+        else:
+            self.month_views.move_to_end(key)
+        return view
+
+    def year_matrix(self, region, year, level="category"):
+        """YearMatrix of one year's expenses (year partition, one pivot), cached per version"""
+        key = ("year_matrix", region, int(year), level)
+        cached = self.frame_cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        df = self.query("expenses", Query(region=region, year=int(year)))
+        result = build_year_matrix(df, level, int(year))
+        self.frame_cache[key] = (self.version, result)
+        return result
+
+    def anomalies(self):
+        """Robust z-scores over the whole history, cached per version.
+
+        entry_z: each expense against its subsubcategory's usual amount
+        (aligned to frame("expenses")). day_z: each day's total against the
+        same weekday, per region and for "All" (indexed by region, date).
+        """
+        cached = self.cached_anomalies()
+        if cached is not None:
+            return cached
+        df = self.frame("expenses")
+        if df.empty:
+            empty = pd.Series(dtype=float)
+            result = Anomalies(empty, empty, empty, empty)
+        else:
+            paths = df[["region", "category", "subcategory", "subsubcategory"]].fillna("")
+            entry_z, entry_typical = robust_z(df["amount_eur"], [paths[c] for c in paths.columns])
+            by_region = df.groupby(["region", "date"])["amount_eur"].sum()
+            overall = df.groupby("date")["amount_eur"].sum()
+            daily = pd.concat([by_region, pd.concat({"All": overall}, names=["region"])])
+            dates = daily.index.get_level_values("date")
+            day_z, day_typical = robust_z(daily, [daily.index.get_level_values("region"), dates.dayofweek])
+            result = Anomalies(entry_z, entry_typical, day_z, day_typical)
+        self.frame_cache["anomalies"] = (self.version, result)
+        return result
+
+    def cached_anomalies(self):
+        """anomalies() if already computed for this version, else None"""
+        cached = self.frame_cache.get("anomalies")
+        return cached[1] if cached is not None and cached[0] == self.version else None
+
+    # --- Distinct-value index for dropdowns ---
+    def index_expense(self, entry, alerts=None):
+        """Add one expense to the category index and the month-to-date counters.
+
+        With alerts (a list), budget thresholds the entry crosses are appended to it.
+        """
+        ym = parse_year_month(entry.get("date"))
+        if ym is None: return
+        region = entry.get("region")
+        path = (index_label(entry.get("category")), index_label(entry.get("subcategory")), index_label(entry.get("subsubcategory")))
+        cats = self.category_index.setdefault((ym[0], ym[1], region), {})
+        cats.setdefault(path[0], {}).setdefault(path[1], {})[path[2]] = None
+        if self.spend_counters is not None:
+            self.count_spend(region, ym, path, entry.get("amount_local"), alerts)
+        if self.spend_sketches is not None:
+            self.sketch_spend(region, entry.get("date"), path, entry.get("amount_eur"))
+
+    def rebuild_indexes(self):
+        self.category_index = {}
+        self.spend_counters = None
+        self.spend_sketches = None
+        for entry in self.data["expenses"]:
+            self.index_expense(entry)
+        self.search_index = None
+
+    # --- Full-text search ---
+    # Documents are ("income", position), ("investments", position) and
+    # ("path", (region, category, subcategory, subsubcategory)); the lists
+    # are append-only, so positions stay valid until the next full load.
+    
+    def index_records(self, key, first=0):
+        """Add self.data[key][first:] to the search index (if it's built)"""
+        index = self.search_index
+        if index is None:
+            return
+        records = self.data[key]
+        if key == "expenses":
+            for path in dict.fromkeys(expense_path(e) for e in records[first:]):
+                index.add(("path", path), " ".join(path))
+        elif key == "income":
+            for pos in range(first, len(records)):
+                index.add(("income", pos), index_label(records[pos].get("source")))
+        else:
+            for pos in range(first, len(records)):
+                e = records[pos]
+                text = " ".join(str(index_label(e.get(f))) for f in ("category", "description", "name", "address"))
+                index.add(("investments", pos), text)
+
+    def search(self, text, limit=50):
+        """Records matching text (prefix and one-typo matches included), best first.
+
+        Empty while a background load runs: the lists are still being
+        rebuilt then, so positions indexed now would point at other records.
+        """
+        if self.loading:
+            return []
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            for key in ("income", "investments", "expenses"):
+                self.index_records(key)
+        results = []
+        for doc in self.search_index.search(text, limit):
+            kind, ref = doc
+            if kind == "path":
+                results.append({"doc": doc, "kind": "Category", "date": "", "text": " > ".join(p for p in ref if p), "amount": ""})
+                continue
+            e = self.data[kind][ref]
+            if kind == "income":
+                label, shown = "Income", e.get("source", "")
+            else:
+                label = "Karje hasana" if e.get("category") == "Karje hasana" else e.get("type", "Investment")
+                shown = " / ".join(str(v) for v in (e.get("category"), e.get("name"), e.get("address"), e.get("description")) if index_label(v))
+            results.append({"doc": doc, "kind": label, "date": e.get("date", ""), "text": shown, "amount": e.get("amount", "")})
+        return results
+
+    def distinct_values(self, region="All", year="All", month=None, category=None, subcategory=None):
+        """Distinct categories present in the data for the filters.
+
+        With category given returns its subcategories, with category and
+        subcategory its subsubcategories. "All"/None means no filter.
+        """
+        year = None if year in (None, "All", "") else int(year)
+        month = None if month in (None, "All", "") else int(month)
+        region = None if region in (None, "All", "") else region
+        
+        # Fully specified -> a single dict lookup, otherwise union the matching keys
+        if year is not None and month is not None and region is not None:
+            buckets = [self.category_index.get((year, month, region), {})]
+        else:
+            buckets = [cats for (y, m, r), cats in self.category_index.items()
+                       if (year is None or y == year) and (month is None or m == month) and (region is None or r == region)]
+        
+        result = {}
+        for level in buckets:
+            if category is not None:
+                level = level.get(category, {})
+                if subcategory is not None:
+                    level = level.get(subcategory, {})
+            result.update(dict.fromkeys(level))
+        return list(result)
 
    
 
+    # --- Budgets ---
+    # finman_budgets.json: {"thresholds": [0.8, 1.0], "budgets": [{"region": "GER",
+    # "path": ["Food", "Groceries"], "month": "2025-03" or "*", "amount": 300.0}]}.
+    # Amounts are in the region's currency (EUR / Tk); a month-specific
+    # budget overrides the "*" (every month) one for the same path.
+
+    @staticmethod
+    def index_budgets(budgets):
+        return {(b["region"], tuple(b["path"]), b.get("month", "*")): float(b["amount"]) for b in budgets}
+
+    @staticmethod
+    def budget_path(path):
+        """Category path without trailing blanks: ("Food", "", "") -> ("Food",)"""
+        path = tuple(index_label(p) for p in path)
+        while path and not path[-1]:
+            path = path[:-1]
+        return path
+
+    def set_budget(self, region, path, amount, month="*"):
+        """Set (or with a falsy amount remove) the budget for a category path"""
+        path = self.budget_path(path)
+        key = (region, path, month)
+        self.budgets["budgets"] = [b for b in self.budgets["budgets"]
+                                   if (b["region"], tuple(b["path"]), b.get("month", "*")) != key]
+        if amount:
+            self.budgets["budgets"].append({"region": region, "path": list(path), "month": month, "amount": float(amount)})
+        self.budget_lookup = self.index_budgets(self.budgets["budgets"])
+        save_json_file(BUDGETS_FILE, self.budgets)
+
+    def set_budget_thresholds(self, thresholds):
+        """Fractions of a budget that raise an alert, e.g. [0.8, 1.0]"""
+        self.budgets["thresholds"] = sorted(float(t) for t in thresholds)
+        save_json_file(BUDGETS_FILE, self.budgets)
+
+    def budget_for(self, region, path, ym):
+        """Budget for exactly this path in month ym=(year, month), None if unset"""
+        key = (region, tuple(path))
+        amount = self.budget_lookup.get(key + (f"{ym[0]:04d}-{ym[1]:02d}",))
+        return self.budget_lookup.get(key + ("*",)) if amount is None else amount
+
+    def spend_index(self):
+        """The month-to-date counters, built with one groupby the first time"""
+        if self.spend_counters is None:
+            self.spend_counters = {}
+            df = self.frame("expenses")
+            if not df.empty:
+                cols = ["region", "year", "month", "category", "subcategory", "subsubcategory"]
+                amounts = pd.to_numeric(df["amount_local"], errors="coerce")
+                sums = amounts.groupby([df[c] for c in cols if c in df], dropna=False).sum()
+                for (region, y, m, *path), total in sums.items():
+                    path = tuple(index_label(p) for p in path)
+                    self.count_spend(region, (int(y), int(m)), path, float(total))
+        return self.spend_counters
+
+    def month_spend(self, region, ym, path=()):
+        """Month-to-date spend (local currency) for a category path prefix"""
+        return self.spend_index().get((region, ym, tuple(path)), 0.0)
+
+    def count_spend(self, region, ym, path, amount, alerts=None):
+        """Add amount to the counters of the path tuple and each of its ancestors: O(depth)"""
+        if type(amount) is not float:
+            try:
+                amount = float(amount)
+            except (TypeError, ValueError):
+                return
+        if amount != amount: # NaN
+            return
+        counters = self.spend_counters
+        check = alerts is not None and bool(self.budget_lookup)
+        depth = len(path)
+        while depth and not path[depth - 1]:
+            depth -= 1
+        for d in range(depth + 1):
+            key = (region, ym, path[:d])
+            before = counters.get(key, 0.0)
+            counters[key] = before + amount
+            if check:
+                self.check_budget(key, before, before + amount, alerts)
+
+    def check_budget(self, key, before, after, alerts):
+        """Append an alert if spend on key went past a threshold (only the highest one crossed)"""
+        region, ym, path = key
+        budget = self.budget_for(region, path, ym)
+        if not budget:
+            return
+        for t in reversed(self.budgets.get("thresholds", [1.0])):
+            if before < t * budget <= after:
+                alerts.append({"region": region, "month": f"{ym[0]:04d}-{ym[1]:02d}", "path": path,
+                               "threshold": t, "budget": budget, "spent": after})
+                return
+
+    def budget_status(self, region, ym, path):
+        """Budget of path or its nearest budgeted ancestor, None if there is none"""
+        if not self.budget_lookup:
+            return None
+        path = self.budget_path(path)
+        for depth in range(len(path), -1, -1):
+            budget = self.budget_for(region, path[:depth], ym)
+            if budget is not None:
+                spent = self.month_spend(region, ym, path[:depth])
+                return {"path": path[:depth], "budget": budget, "spent": spent, "remaining": budget - spent}
+        return None
+
+    def budget_table(self, region, year, month):
+        """Budget vs actual for one month: every budgeted path plus unbudgeted top-level categories"""
+        ym = (int(year), int(month))
+        regions = ["GER", "BD"] if region in (None, "All", "") else [region]
+        month_key = f"{ym[0]:04d}-{ym[1]:02d}"
+        paths = {}
+        for (r, path, m) in self.budget_lookup:
+            if r in regions and m in ("*", month_key):
+                paths[(r, path)] = None
+        for (r, key_ym, path) in self.spend_index():
+            if r in regions and key_ym == ym and len(path) == 1:
+                paths.setdefault((r, path), None)
+        rows = []
+        for r, path in sorted(paths):
+            budget = self.budget_for(r, path, ym)
+            spent = self.month_spend(r, ym, path)
+            rows.append({
+                "Region": r,
+                "Category": " > ".join(path) if path else "(all)",
+                "Level": len(path),
+                "Budget": budget,
+                "Actual": spent,
+                "Remaining": budget - spent if budget is not None else None,
+                "Used %": 100 * spent / budget if budget else None,
+            })
+        return pd.DataFrame(rows, columns=["Region", "Category", "Level", "Budget", "Actual", "Remaining", "Used %"])
+
+    @instrumented
     def get_summary_df(self):
         # Helper for Analysis tab
         inc_df = pd.DataFrame(self.data["income"])
@@ -524,9 +2413,269 @@ class DataManager:
 
         return inc_grp, exp_grp_eur, exp_grp_bd_local, exp_grp_bd_eur, inv_grp, ret_grp
 
+    # --- Report tables (shared by the GUI views and the report CLI) ---
+    SUMMARY_COLUMNS = ["Income", "GER Exp", "BD Exp", "BD Exp EUR", "Investment", "Return", "Net Inv", "Balance"]
+
+    @instrumented
+    def monthly_summary(self, query=Query()):
+        """Month-by-month rows of the Input tab summary, indexed by month period.
+
+        BD Exp is in Tk, everything else in EUR. Net Inv = Returns - Investments
+        and Balance = Income - GER Exp - BD Exp EUR - Net Inv.
+        """
+        frames = {}
+        for key in ("income", "expenses", "investments"):
+            df = self.query(key, query)
+            frames[key] = df.assign(month=df["date"].dt.to_period("M")) if not df.empty else df
+
+        def monthly(key, value, column=None, match=None):
+            df = frames[key]
+            if df.empty:
+                return None
+            if column is not None:
+                df = df[df[column] == match]
+            return df.groupby("month")[value].sum()
+
+        parts = {
+            "Income": monthly("income", "amount"),
+            "GER Exp": monthly("expenses", "amount_eur", "region", "GER"),
+            "BD Exp": monthly("expenses", "amount_local", "region", "BD"),
+            "Investment": monthly("investments", "amount", "type", "Investment"),
+            "Return": monthly("investments", "amount", "type", "Return"),
+        }
+        parts = {k: v for k, v in parts.items() if v is not None and len(v)}
+        table = pd.DataFrame(parts).reindex(columns=["Income", "GER Exp", "BD Exp", "Investment", "Return"]).fillna(0.0).sort_index()
+        table["BD Exp EUR"] = table["BD Exp"] / self.DEFAULT_RATE
+        table["Net Inv"] = table["Return"] - table["Investment"]
+        table["Balance"] = table["Income"] - table["GER Exp"] - table["BD Exp EUR"] - table["Net Inv"]
+        return table[self.SUMMARY_COLUMNS]
+
+    # --- Spend distributions ---
+    def sketch_index(self):
+        """SpendSketches of expense sizes and daily spend (EUR), built in one pass the first time.
+
+        sizes[(region, path)] and daily[(region, path)] map (year, month) to a
+        QuantileSketch, for every path prefix (() = the whole region); daily
+        also has the region "All". The day totals behind the daily sketches
+        are kept so sketch_spend() can replace one: day_totals[depth] is a
+        Series indexed by (region, day, *path) as built, day_updates a dict
+        (region, path, day) -> total of the days changed since.
+        """
+        if self.spend_sketches is None:
+            sizes, daily, day_totals = {}, {}, []
+
+            def fill(store, counts):
+                # counts: (region, yyyymm, *path, bucket key) -> n, grouped so each sketch's buckets are adjacent
+                index = counts.index
+                starts = np.zeros(len(index), dtype=bool)
+                starts[0] = True
+                for codes in index.codes[:-1]:
+                    starts[1:] |= codes[1:] != codes[:-1]
+                bounds = np.append(np.flatnonzero(starts), len(index)).tolist()
+                keys, n = index.get_level_values(-1).tolist(), counts.tolist()
+                for start, end, (region, month, *prefix, _) in zip(bounds, bounds[1:], index[bounds[:-1]]):
+                    store.setdefault((region, tuple(prefix)), {})[divmod(int(month), 100)] = QuantileSketch.from_buckets(keys[start:end], n[start:end])
+
+            df = self.frame("expenses")
+            if not df.empty:
+                labels = df[["category", "subcategory", "subsubcategory"]].fillna("")
+                # Path depth without empty trailing labels, as in count_spend
+                depth = np.select([labels["subsubcategory"] != "", labels["subcategory"] != "", labels["category"] != ""], [3, 2, 1], 0)
+                amounts = df["amount_eur"].astype(float)
+                months = df["year"] * 100 + df["month"]
+                days = df["date"].dt.normalize()
+                size_keys = pd.Series(QuantileSketch.keys(amounts), index=df.index)
+                for d in range(4):
+                    rows = depth >= d
+                    path = [labels[c][rows] for c in labels.columns[:d]]
+                    fill(sizes, size_keys[rows].groupby([df["region"][rows], months[rows], *path, size_keys[rows]]).size())
+                    region = df["region"][rows]
+                    totals = pd.concat([amounts[rows].groupby([region, days[rows], *path]).sum(),
+                                        amounts[rows].groupby([pd.Series("All", index=region.index), days[rows], *path]).sum()])
+                    day_totals.append(totals)
+                    day = totals.index.get_level_values(1)
+                    keys = pd.Series(QuantileSketch.keys(totals.to_numpy()), index=totals.index)
+                    levels = [totals.index.get_level_values(i) for i in range(2, d + 2)]
+                    fill(daily, keys.groupby([totals.index.get_level_values(0), day.year * 100 + day.month, *levels, keys.to_numpy()]).size())
+            self.spend_sketches = SpendSketches(sizes, daily, day_totals, {})
+        return self.spend_sketches
+
+    def sketch_spend(self, region, date, path, amount):
+        """Add one expense to the sketches of its month for the path and each ancestor: O(depth)"""
+        try:
+            amount = float(amount)
+            day = pd.Timestamp(date).normalize()
+        except (TypeError, ValueError):
+            return
+        if amount != amount: # NaN
+            return
+        sketches = self.spend_sketches
+        ym = (day.year, day.month)
+        depth = len(path)
+        while depth and not path[depth - 1]:
+            depth -= 1
+        for d in range(depth + 1):
+            prefix = tuple(path[:d])
+            sketches.sizes.setdefault((region, prefix), {}).setdefault(ym, QuantileSketch()).add(amount)
+            for r in (region, "All"):
+                sketch = sketches.daily.setdefault((r, prefix), {}).setdefault(ym, QuantileSketch())
+                key = (r, prefix, day)
+                before = sketches.day_updates.get(key)
+                if before is None and d < len(sketches.day_totals):
+                    try:
+                        before = float(sketches.day_totals[d].loc[(r, day, *prefix)])
+                    except KeyError:
+                        pass
+                if before is not None:
+                    sketch.add(before, -1)
+                else:
+                    before = 0.0
+                sketches.day_updates[key] = before + amount
+                sketch.add(before + amount)
+
+    def spend_sketch(self, region, path=(), years=(None, None), measure="size"):
+        """One QuantileSketch merged from the monthly sketches of an inclusive year range (None = open end)"""
+        sketches = self.sketch_index()
+        store = sketches.daily if measure == "daily" else sketches.sizes
+        regions = [region] if region in ("GER", "BD") or measure == "daily" else ["GER", "BD"]
+        first, last = years
+        merged = QuantileSketch()
+        for r in regions:
+            for (year, month), sketch in store.get((r, tuple(path)), {}).items():
+                if (first is None or year >= first) and (last is None or year <= last):
+                    merged.merge(sketch)
+        return merged
+
+    def distribution_table(self, region="All", path=(), years=(None, None), measure="size"):
+        """Count and QUANTILES of expense sizes (or daily spend) for a path and each child path"""
+        sketches = self.sketch_index()
+        store = sketches.daily if measure == "daily" else sketches.sizes
+        path = tuple(path)
+        while path and not path[-1]:
+            path = path[:-1]
+        regions = {region} if region in ("GER", "BD") or measure == "daily" else {"GER", "BD"}
+        children = sorted({p for r, p in store if r in regions and len(p) == len(path) + 1 and p[:len(path)] == path})
+        rows = []
+        for p in [path] + children:
+            sketch = self.spend_sketch(region, p, years, measure)
+            if sketch.n > 0:
+                rows.append([" > ".join(p) or "(all)", sketch.n, *sketch.quantiles(QUANTILES)])
+        return pd.DataFrame(rows, columns=["Category", "Days" if measure == "daily" else "Count",
+                                           *(f"p{q * 100:g}" for q in QUANTILES)])
+
+    def cash_flow(self, query=Query()):
+        """monthly_summary for every month in range (gaps filled with 0) plus
+        total Expense (EUR), Savings = Income - Expense and Savings Rate"""
+        table = fill_months(self.monthly_summary(query))
+        table["Expense"] = table["GER Exp"] + table["BD Exp EUR"]
+        table["Savings"] = table["Income"] - table["Expense"]
+        table["Savings Rate"] = (table["Savings"] / table["Income"].where(table["Income"] != 0)).astype(float)
+        return table
+
+    def balance_projection(self, months=120, paths=10_000, lookback=None, seed=None):
+        """Monte Carlo fan of the Total Balance (initial balance + monthly Balance) for the next months.
+
+        lookback limits the months resampled to the most recent ones (None = all history).
+        Returns (bands, shortfall, start balance) as project_balance, or None without history.
+        """
+        flows = self.cash_flow()["Balance"] if self.data["expenses"] or self.data["income"] else pd.Series(dtype=float)
+        if flows.empty:
+            return None
+        start = float(self.data.get("initial_balance_eur", 0.0)) + float(flows.sum())
+        if lookback:
+            flows = flows.iloc[-lookback:]
+        bands, shortfall = project_balance(flows, start, months, paths, seed=seed)
+        return bands, shortfall, start
+
+    def monthly_paths(self, level="category", query=Query()):
+        """Month x (region, category, ...) expense totals in EUR, one column per path.
+
+        One groupby for the whole level; months without spending are 0.
+        """
+        depth = ["category", "subcategory", "subsubcategory"].index(level) + 1
+        df = self.query("expenses", query)
+        if df.empty:
+            return pd.DataFrame()
+        keys = ["region", "category", "subcategory", "subsubcategory"][:depth + 1]
+        paths = df[keys].fillna("")
+        totals = df["amount_eur"].groupby([df["date"].dt.to_period("M")] + [paths[k] for k in keys]).sum()
+        return fill_months(totals.unstack(keys, fill_value=0.0).sort_index(axis=1))
+
+    def db_expenses(self, query=Query()):
+        """Expenses behind the Database tab tables, with a month period column"""
+        df = self.query("expenses", query)
+        if df.empty:
+            return df
+        return df.assign(month=df["date"].dt.to_period("M")).sort_values("month", kind="stable")
+
+    @staticmethod
+    def expense_pivot(df, column="category", region="All"):
+        """Month x category/subcategory/subsubcategory totals (Tk for BD, EUR otherwise)"""
+        val_col = "amount_local" if region == "BD" else "amount_eur"
+        return df.pivot_table(index="month", columns=column, values=val_col, aggfunc="sum", fill_value=0)
+
+    def investment_pivot(self, query=Query()):
+        """Month x investment category totals, empty DataFrame if nothing matches"""
+        inv_df = self.query("investments", query)
+        if inv_df.empty:
+            return pd.DataFrame()
+        inv_df = inv_df.assign(month=inv_df["date"].dt.to_period("M"))
+        pivot = inv_df.pivot_table(index="month", columns="category", values="amount", aggfunc="sum", fill_value=0)
+        return pivot[sorted(pivot.columns)]
+
+    def investment_performance(self, by="category"):
+        """Cash-on-cash, XIRR and breakeven for each investment category (or holding), over all history.
+
+        A holding is a category plus the record's name (Karje hasana gives
+        one per person); records without a name form the category's own
+        holding. Only realised cash flows count, so an open position's XIRR
+        stays negative (or NaN) until enough has come back.
+        """
+        columns = ["Holding" if by == "holding" else "Category", "Invested", "Returned", "Net", "Cash on Cash",
+                   "XIRR", "First", "Breakeven", "Months to Breakeven"]
+        df = self.frame("investments")
+        if df.empty:
+            # Same dtypes as a filled table, so callers can use .dt on the dates
+            return pd.DataFrame(columns=columns).astype(
+                {**{c: float for c in columns[1:6]}, "First": "datetime64[ns]", "Breakeven": "datetime64[ns]",
+                 "Months to Breakeven": float})
+        key = df["category"].fillna("").astype(str)
+        if by == "holding" and "name" in df:
+            name = df["name"].fillna("").astype(str)
+            key = key.where(name == "", key + " / " + name)
+        is_return = df["type"] == "Return"
+
+        # One row per (group, day) with money paid in and received, in date order within each group
+        flows = pd.DataFrame({"paid": df["amount"].where(~is_return, 0.0), "got": df["amount"].where(is_return, 0.0)})
+        flows = flows.groupby([key.rename("key"), df["date"]]).sum().reset_index()
+        codes, labels = pd.factorize(flows["key"], sort=True)
+        amounts = (flows["got"] - flows["paid"]).to_numpy()
+        first = flows.groupby(codes)["date"].min()
+        years = (flows["date"] - first.to_numpy()[codes]).dt.days.to_numpy() / 365.0
+        rates = xirr(codes, years, amounts, len(labels))
+
+        invested = np.bincount(codes, flows["paid"].to_numpy(), len(labels))
+        returned = np.bincount(codes, flows["got"].to_numpy(), len(labels))
+        # Breakeven: first day the running net is back to >= 0 after money went in
+        running = pd.Series(amounts).groupby(codes).cumsum().to_numpy()
+        paid_in = flows["paid"].groupby(codes).cumsum().to_numpy() > 0
+        even = (running >= -1e-9) & paid_in
+        breakeven = flows.loc[even, "date"].groupby(codes[even]).min().reindex(range(len(labels)))
+        months = (breakeven - first).dt.days / 30.4375
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cash_on_cash = np.where(invested > 0, returned / invested, np.nan)
+        return pd.DataFrame({
+            columns[0]: labels, "Invested": invested, "Returned": returned, "Net": returned - invested,
+            "Cash on Cash": cash_on_cash, "XIRR": rates, "First": first.to_numpy(),
+            "Breakeven": breakeven.to_numpy(), "Months to Breakeven": months.to_numpy(),
+        })[columns]
+
+    @instrumented
     def get_kh_details(self):
         kh_list = []
         kh_df = pd.DataFrame(self.data["investments"])
+        if kh_df.empty: return kh_list
         kh_df = kh_df[kh_df["category"] == "Karje hasana"]
         
         groups = kh_df.groupby("name")
@@ -545,10 +2694,333 @@ class DataManager:
                 })
         return kh_list
 
+    # --- Memory accounting ---
+    def memory_usage(self):
+        """(group, component, bytes, detail) rows for the ledger, caches and indexes.
+
+        Strings shared between records (category names, repeated dates) are
+        counted once, with the first record that holds them.
+        """
+        rows = []
+        seen = set()
+        for key in ("income", "expenses", "investments"):
+            records = self.data[key]
+            by_year = {}
+            for item in records:
+                size = sys.getsizeof(item)
+                for v in item.values():
+                    if id(v) not in seen:
+                        seen.add(id(v))
+                        size += sys.getsizeof(v)
+                bucket = by_year.setdefault(record_year(item.get("date")), [0, 0])
+                bucket[0] += size
+                bucket[1] += 1
+            seen.update(map(id, records))
+            for year in sorted(by_year, key=lambda y: y or 0):
+                size, count = by_year[year]
+                rows.append(("Records", f"{year or 'no date'} {key}", size, f"{count} records"))
+            rows.append(("Records", f"{key} list", sys.getsizeof(records), f"{len(records)} slots"))
+        rows.append(("Records", "categories", deep_sizeof(self.data["categories"], seen), ""))
+
+        for key, (version, value) in list(self.frame_cache.items()):
+            stale = "" if version == self.version else ", stale"
+            rows.append(("Caches", f"frame {key}", deep_sizeof(value, seen), f"version {version}{stale}"))
+        rows.append(("Caches", "month views", deep_sizeof(list(self.month_views.values()), seen), f"{len(self.month_views)} months"))
+        rows.append(("Caches", "import rules / review queue", deep_sizeof([self.import_rules, self.review_queue], seen),
+                     f"{len(self.review_queue)} rows to review"))
+
+        rows.append(("Indexes", "category index", deep_sizeof(self.category_index, seen), f"{len(self.category_index)} (year, month, region) keys"))
+        counters = self.spend_counters
+        rows.append(("Indexes", "budget counters", deep_sizeof(counters, seen) if counters is not None else 0,
+                     f"{len(counters)} (region, month, path) keys" if counters is not None else "not built"))
+        sketches = self.spend_sketches
+        rows.append(("Indexes", "spend sketches", deep_sizeof(sketches, seen) if sketches is not None else 0,
+                     f"{sum(map(len, sketches.sizes.values())) + sum(map(len, sketches.daily.values()))} month sketches, "
+                     f"{sum(map(len, sketches.day_totals)) + len(sketches.day_updates)} day totals" if sketches is not None else "not built"))
+        index = self.search_index
+        rows.append(("Indexes", "search index", deep_sizeof(index, seen) if index else 0,
+                     f"{len(index.vocab)} terms" if index else "not built"))
+        return rows
+
+# ==========================================
+# Inbox Ingestion (headless)
+# ==========================================
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class InboxWatcher:
+    """Ingests FinMan export files (JSON/CSV) dropped into a folder.
+
+    Each file is ingested once: the manifest in the folder maps the SHA-256
+    of every processed file to its result, so renamed or re-dropped copies
+    are skipped too. Files that arrived since the last scan are ingested
+    together in one batched, deduplicated write.
+    """
+    MANIFEST = ".finman_manifest.json"
+    EXTENSIONS = (".json", ".csv")
+
+    def __init__(self, dm, folder, settle=2.0):
+        self.dm = dm
+        self.folder = folder
+        self.settle = settle  # seconds a file must be unchanged before we read it
+        self.manifest_path = os.path.join(folder, self.MANIFEST)
+        self.manifest = load_json_file(self.manifest_path, {})
+        # (name, size, mtime) -> digest, so unchanged files aren't re-hashed every poll
+        self.known = {(e["file"], e["size"], e["mtime"]): d for d, e in self.manifest.items()}
+
+    def pending_files(self):
+        """[(path, digest, stat)] of settled files not in the manifest yet"""
+        pending = []
+        now = time.time()
+        for name in sorted(os.listdir(self.folder)):
+            path = os.path.join(self.folder, name)
+            if name == self.MANIFEST or not name.lower().endswith(self.EXTENSIONS) or not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            if self.settle and now - st.st_mtime < self.settle:
+                continue
+            stamp = (name, st.st_size, st.st_mtime)
+            digest = self.known.get(stamp) or file_digest(path)
+            self.known[stamp] = digest
+            if digest not in self.manifest and digest not in {d for _, d, _ in pending}:
+                pending.append((path, digest, st))
+        return pending
+
+    def record(self, path, digest, st, **result):
+        self.manifest[digest] = dict(file=os.path.basename(path), size=st.st_size, mtime=st.st_mtime,
+                                     ingested=datetime.now().isoformat(timespec="seconds"), **result)
+
+    def scan(self):
+        """Ingest everything pending. Returns {filename: manifest entry}"""
+        parsed, failed = [], []
+        for path, digest, st in self.pending_files():
+            try:
+                parsed.append((path, digest, st, read_export_file(path)))
+            except Exception as e:
+                self.record(path, digest, st, error=str(e))
+                failed.append((path, digest))
+        
+        if parsed:
+            try:
+                added = self.dm.ingest_exports([content for *_, content in parsed])
+                for path, digest, st, content in parsed:
+                    self.record(path, digest, st, records=sum(len(content[k]) for k in RECORD_KEYS), batch_added=added)
+            except ValueError:
+                # A bad row rejects the whole batch; retry file by file to isolate it
+                for path, digest, st, content in parsed:
+                    try:
+                        added = self.dm.ingest_exports([content])
+                        self.record(path, digest, st, records=sum(len(content[k]) for k in RECORD_KEYS), batch_added=added)
+                    except ValueError as e:
+                        self.record(path, digest, st, error=str(e))
+        
+        if parsed or failed:
+            # Only after the ledger is saved, so a crash re-ingests (and dedups) instead of losing files
+            save_json_file(self.manifest_path, self.manifest)
+        return {os.path.basename(p): self.manifest[d] for p, d in failed + [(p, d) for p, d, _, _ in parsed]}
+
+    def run(self, interval=5.0, once=False):
+        while True:
+            for name, result in self.scan().items():
+                status = result.get("error") or f"{result['records']} records"
+                print(f"{name}: {status}", flush=True)
+            alerts, self.dm.budget_alerts = self.dm.budget_alerts, []
+            for alert in alerts:
+                print(f"Budget: {format_budget_alert(alert)}", flush=True)
+            if once:
+                return
+            time.sleep(interval)
+
 # ==========================================
 # GUI Application
 # ==========================================
 
+# --- Chart Helpers ---
+# The charts keep their artists alive between refreshes and only swap data,
+# so a refresh never pays for ax.clear() + rebuilding every artist.
+
+@functools.lru_cache(maxsize=256)
+def weekend_segments(year, month):
+    """Vertical marker segments (x in data, y in axes coords) for Sat/Sun of a month"""
+    meta = month_day_meta(year, month)
+    return tuple(((day, 0.0), (day, 1.0)) for day, weekend in zip(meta.days, meta.weekend) if weekend)
+
+
+def nice_ceiling(value):
+    """Round up to the next 1-2-2.5-5 step so neighbouring months share a y-axis"""
+    if not value or value <= 0 or not math.isfinite(value):
+        return 1.0
+    base = 10 ** math.floor(math.log10(value))
+    for step in (1, 2, 2.5, 5, 10):
+        if step * base >= value:
+            return step * base
+    return 10 * base
+
+
+class ChartBlitter:
+    """Blit manager for one canvas.
+
+    Registered artists are animated, so a full draw only renders the static
+    background (axes, grid, ticks). The background is captured on every full
+    draw; data-only updates restore it and redraw just the animated artists.
+    """
+
+    def __init__(self, canvas, artists=()):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        for art in artists:
+            self.add_artist(art)
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def add_artist(self, art):
+        art.set_animated(True)
+        self.artists.append(art)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        fig = self.canvas.figure
+        for art in self.artists:
+            fig.draw_artist(art)
+
+    def update(self, full=False):
+        # Limits/ticks changed -> the background is stale, schedule a full draw
+        if full or self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
+class ChartCache:
+    """Bounded LRU of rendered charts for one canvas.
+
+    Each entry holds the chart state (what the artists were set to) and the
+    bitmap of the full draw that rendered it, keyed by the caller's filter key
+    plus the canvas size. A hit re-applies the state to the artists, so later
+    redraws stay consistent, and blits the bitmap instead of rendering.
+    """
+
+    def __init__(self, canvas, maxsize=16):
+        self.canvas = canvas
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.current = None # (key, state) the artists currently show
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def size(self):
+        bbox = self.canvas.figure.bbox
+        return (int(bbox.width), int(bbox.height))
+
+    def on_draw(self, event):
+        # Every full draw renders the current state, remember its bitmap
+        if self.current is None:
+            return
+        key, state = self.current
+        full_key = (key, self.size())
+        self.entries[full_key] = (state, self.canvas.copy_from_bbox(self.canvas.figure.bbox))
+        self.entries.move_to_end(full_key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def has(self, key):
+        return (key, self.size()) in self.entries
+
+    def show(self, key, apply_state):
+        """Blit a cached render of key; returns False on a miss"""
+        full_key = (key, self.size())
+        entry = self.entries.get(full_key)
+        if entry is None:
+            return False
+        self.entries.move_to_end(full_key)
+        state, bitmap = entry
+        apply_state(state)
+        self.current = (key, state)
+        self.canvas.restore_region(bitmap)
+        self.canvas.blit(self.canvas.figure.bbox)
+        return True
+
+    def render(self, key, state, apply_state, offscreen=False):
+        apply_state(state)
+        self.current = (key, state)
+        if offscreen:
+            # Render into the Agg buffer only (fires draw_event), no Tk blit
+            mpl_backend_agg.FigureCanvasAgg.draw(self.canvas)
+        else:
+            self.canvas.draw_idle()
+
+
+def sync_bar_pool(ax, pool, xs, heights, width, color):
+    """Reuse Rectangle patches from pool for the given bars; extras are hidden"""
+    while len(pool) < len(xs):
+        rect = mpl_patches.Rectangle((0, 0), width, 0, facecolor=color)
+        ax.add_patch(rect)
+        pool.append(rect)
+    for i, rect in enumerate(pool):
+        if i < len(xs):
+            h = heights[i]
+            h = 0.0 if h is None or not math.isfinite(h) else h
+            rect.set_x(xs[i] - width / 2)
+            rect.set_width(width)
+            rect.set_y(min(h, 0.0))
+            rect.set_height(abs(h))
+            rect.set_visible(True)
+        else:
+            rect.set_visible(False)
+
+
+class RangeFilter:
+    """"Dates:" dropdown with the DATE_PRESETS plus a custom range.
+
+    get() returns the Query date_range for the current choice (None for all dates).
+    """
+    CUSTOM = "Custom..."
+
+    def __init__(self, parent, on_change=None):
+        self.on_change = on_change
+        self.custom = None
+        self.labels = {label: key for key, label in DATE_PRESETS.items()}
+        ttk.Label(parent, text="Dates:").pack(side="left", padx=5)
+        self.combo = ttk.Combobox(parent, values=list(self.labels) + [self.CUSTOM], width=22, state="readonly")
+        self.combo.current(0)
+        self.combo.pack(side="left", padx=5)
+        self.combo.bind("<<ComboboxSelected>>", self.on_select)
+
+    def on_select(self, event=None):
+        if self.combo.get() == self.CUSTOM:
+            start = simpledialog.askstring("Custom Range", "From (YYYY-MM-DD):")
+            end = simpledialog.askstring("Custom Range", "To (YYYY-MM-DD):") if start else None
+            try:
+                if not start or not end: raise ValueError("cancelled")
+                pd.Timestamp(start), pd.Timestamp(end)
+            except ValueError as e:
+                if str(e) != "cancelled":
+                    messagebox.showerror("Error", "Dates must look like 2025-04-01")
+                self.custom = None
+                self.combo.current(0)
+            else:
+                self.custom = (start, end)
+                self.combo.set(f"{start} to {end}")
+        if self.on_change:
+            self.on_change()
+
+    def get(self):
+        label = self.combo.get()
+        if label in self.labels:
+            return preset_date_range(self.labels[label])
+        return self.custom
+
 
 class FinanceApp:
     def __init__(self, root):
@@ -557,13 +3029,18 @@ class FinanceApp:
         self.root.geometry("1450x950")
         
         # --- CHANGE THE LINE BELOW ---
-        self.dm = DataManager() 
+        # The ledger is read in the background once the window is up
+        self.dm = DataManager(autoload=False) 
         
         style = ttk.Style()
 
         style.theme_use('clam')
         # ... (existing style configs) ...
     
+        # Status bar (loading indicator), packed first so it stays at the bottom
+        self.status_label = ttk.Label(root, text="", anchor="w")
+        self.status_label.pack(side="bottom", fill="x", padx=10)
+    
         self.tabs = ttk.Notebook(root)
         self.tabs.pack(fill="both", expand=True)
         
@@ -577,41 +3054,152 @@ class FinanceApp:
         self.tabs.add(self.tab2, text="Database")
         self.tabs.add(self.tab3, text="Analysis")
         
+        # Only the Input tab is built up front. The others (and their
+        # matplotlib figures) are built the first time they are selected.
+        self.tab_builders = {
+            str(self.tab4): self.setup_tab4,
+            str(self.tab2): self.setup_tab2,
+            str(self.tab3): self.setup_tab3,
+        }
+        self.built_tabs = {str(self.tab1)}
         
         # Bind tab change
         self.tabs.bind("<<NotebookTabChanged>>", self.on_tab_change)
         
         # Setup UI
         self.setup_tab1()
-        self.setup_tab4() # <--- NEW
-        self.setup_tab2()
-        self.setup_tab3()
+        STARTUP.mark("ui_built")
         
         self.update_clock()
-        # Initial summary population
+        self.root.after(0, lambda: STARTUP.mark("window_shown"))
+        
+        # Load the ledger in the background, most recent year first
+        self.dm.start_background_load()
+        self.loaded_files = []
+        self.set_status("Loading ledger...")
+        self.root.after(30, self.poll_data_loader)
+        
+        # Initial summary population (needs pandas, which loads in the background)
+        self.when_modules_ready(self.on_modules_ready)
+
+    def set_status(self, text):
+        self.status_label.config(text=text)
+
+    def when_modules_ready(self, callback):
+        """Run callback on the Tk thread once the background imports finished"""
+        if MODULES_READY.is_set():
+            callback()
+        else:
+            self.root.after(50, lambda: self.when_modules_ready(callback))
+
+    def on_modules_ready(self):
         self.update_summary()
+        STARTUP.mark("summary_ready")
+        self.maybe_write_startup_report()
+        self.root.after_idle(self.prerender_analysis_charts)
+
+    def maybe_write_startup_report(self):
+        if "summary_ready" in STARTUP.marks and "data_loaded" in STARTUP.marks:
+            STARTUP.write_report()
+
+    def poll_data_loader(self):
+        merged, replayed = self.dm.apply_loaded_files()
+        finished = replayed is not None
+        if merged:
+            if not self.loaded_files:
+                STARTUP.mark("first_year_loaded")
+            self.loaded_files.extend(merged)
+        if merged or finished:
+            self.on_data_progress(finished, replayed)
+        if not finished:
+            self.root.after(30, self.poll_data_loader)
+
+    def on_data_progress(self, finished, replayed):
+        """Fill the views in with whatever part of the ledger is loaded so far"""
+        # Balances/categories arrive with the newest file; only touch the field
+        # when that changes the balance, so typing in it isn't overwritten
+        balance = self.dm.data['initial_balance_eur']
+        if balance != self.shown_init_bal:
+            self.shown_init_bal = balance
+            self.init_bal_entry.delete(0, tk.END)
+            self.init_bal_entry.insert(0, str(balance))
+        region = self.exp_region.get()
+        cats = list(self.dm.get_categories(region).keys())
+        if self.exp_cat.get() in cats:
+            self.exp_cat['values'] = cats
+        else:
+            self.populate_exp_cats()
+        
+        if finished:
+            STARTUP.mark("data_loaded")
+            self.maybe_write_startup_report()
+            self.set_status(f"Loaded. Saved {replayed} queued entries." if replayed else "")
+            if self.is_tab_built(self.tab2) and self.db_search.get().strip():
+                self.run_db_search()
+        else:
+            years = [str(self.dm.file_year(f) or f) for f in self.loaded_files]
+            self.set_status(f"Loading ledger... {', '.join(years)} ({len(self.loaded_files)}/{len(self.dm.load_files)} files)")
+        
+        # Views need pandas; before that on_modules_ready does the first fill
+        if MODULES_READY.is_set():
+            self.refresh_all_tabs(status=False)
+
+    def ensure_tab_built(self, tab):
+        key = str(tab)
+        if key in self.built_tabs:
+            return
+        self.set_status("Loading...")
+        self.root.update_idletasks()
+        self.built_tabs.add(key)
+        self.tab_builders[key]()
+        STARTUP.mark(f"built_{self.tabs.tab(tab, 'text')}")
+        self.set_status("")
+
+    def is_tab_built(self, tab):
+        return str(tab) in self.built_tabs
+
+    def selected_tab(self):
+        return self.tabs.nametowidget(self.tabs.select())
 
     def on_tab_change(self, event):
-        selected_tab = self.tabs.index(self.tabs.select())
+        tab = self.selected_tab()
+        self.ensure_tab_built(tab)
         # Auto-refresh when switching
-        if selected_tab == 1: 
+        if tab is self.tab2:
             self.generate_db_tables()
-        elif selected_tab == 2:
+        elif tab is self.tab3:
             self.plot_trend()
             self.plot_pie()
-        elif selected_tab == 3: # <--- NEW (Index 3 is the 4th tab)
+        elif tab is self.tab4:
             self.update_daily_trans_view()
 
-    def refresh_all_tabs(self):
+    def refresh_all_tabs(self, status=True):
         """Helper to refresh Summary, Database, and Analysis tabs"""
+        if status and self.dm.pending_writes:
+            self.set_status(f"Still loading: {len(self.dm.pending_writes)} entries queued, they will be saved once loading finishes.")
         self.update_summary()
-        if self.tabs.index(self.tabs.select()) == 1:
+        tab = self.selected_tab()
+        if tab is self.tab2:
             self.generate_db_tables()
-        elif self.tabs.index(self.tabs.select()) == 2:
-             self.generate_db_tables()
-        elif self.tabs.index(self.tabs.select()) == 3:
+        elif tab is self.tab3:
              self.plot_trend()
              self.plot_pie()
+        elif tab is self.tab4:
+             self.update_daily_trans_view()
+        # Data changed: warm the Analysis chart cache for the new version
+        self.root.after_idle(self.prerender_analysis_charts)
+        self.update_budget_label()
+        self.show_budget_alerts()
+
+    def show_budget_alerts(self):
+        """Warn about budget thresholds crossed by the entries since the last check"""
+        alerts, self.dm.budget_alerts = self.dm.budget_alerts, []
+        if not alerts:
+            return
+        lines = [format_budget_alert(a) for a in alerts[:10]]
+        if len(alerts) > 10:
+            lines.append(f"...and {len(alerts) - 10} more")
+        messagebox.showwarning("Budget", "\n".join(lines))
 
     def update_clock(self):
         now = datetime.now()
@@ -649,6 +3237,12 @@ class FinanceApp:
         
         # --- ADD BUTTON HERE ---
         ttk.Button(lbl_frame, text="Import Old Data (JSON/CSV)", command=self.import_old_data_action).pack(anchor="w", pady=(0, 5))
+        bank_frame = ttk.Frame(lbl_frame)
+        bank_frame.pack(anchor="w", pady=(0, 5))
+        ttk.Button(bank_frame, text="Import Bank Statement (CSV)", command=self.import_bank_statement_action).pack(side="left")
+        ttk.Button(bank_frame, text="Review Unmatched", command=self.open_review_queue).pack(side="left", padx=5)
+        ttk.Button(bank_frame, text="Diagnostics", command=self.open_diagnostics).pack(side="left")
+        ttk.Button(bank_frame, text="Memory", command=self.open_memory_report).pack(side="left", padx=5)
     
         ttk.Separator(lbl_frame, orient="horizontal").pack(fill="x", pady=5)
 
@@ -690,7 +3284,8 @@ class FinanceApp:
         # Independent Initial Balance
         ttk.Label(left_frame, text="Initial Balance (EUR):").grid(row=5, column=0, sticky="w", padx=5)
         self.init_bal_entry = ttk.Entry(left_frame)
-        self.init_bal_entry.insert(0, str(self.dm.data['initial_balance_eur']))
+        self.shown_init_bal = self.dm.data['initial_balance_eur']
+        self.init_bal_entry.insert(0, str(self.shown_init_bal))
         self.init_bal_entry.grid(row=5, column=1, padx=5, pady=2)
         ttk.Button(left_frame, text="Update Initial", command=self.update_initial_bal).grid(row=6, column=0, columnspan=2, pady=2)
         
@@ -716,6 +3311,7 @@ class FinanceApp:
         self.cat_region.current(0)
         self.cat_region.grid(row=0, column=0, padx=5, pady=5)
         ttk.Button(cat_mgmt_frame, text="Manage Categories", command=self.open_category_manager).grid(row=0, column=1, padx=5)
+        ttk.Button(cat_mgmt_frame, text="Budgets", command=self.open_budgets).grid(row=0, column=2, padx=5)
 
         # Center: Expenditure
         center_frame = ttk.LabelFrame(mid_frame, text="Add Expenditure")
@@ -740,6 +3336,7 @@ class FinanceApp:
         ttk.Label(center_frame, text="Sub-Subcategory:").grid(row=3, column=0, sticky="w", padx=5)
         self.exp_subsub = ttk.Combobox(center_frame, state="readonly")
         self.exp_subsub.grid(row=3, column=1, sticky="ew", padx=5)
+        self.exp_subsub.bind("<<ComboboxSelected>>", self.update_budget_label)
         
         self.exp_amt_frame = ttk.Frame(center_frame)
         self.exp_amt_frame.grid(row=4, column=0, columnspan=2, pady=5)
@@ -759,8 +3356,13 @@ class FinanceApp:
         self.exp_date = ttk.Entry(center_frame)
         self.exp_date.insert(0, today)
         self.exp_date.grid(row=7, column=1, sticky="ew", padx=5)
+        self.exp_date.bind("<FocusOut>", self.update_budget_label)
         
         ttk.Button(center_frame, text="Save Expense", command=self.add_expense_action).grid(row=8, column=0, columnspan=2, pady=10)
+        
+        # Remaining budget for the selected category path and month
+        self.lbl_budget = ttk.Label(center_frame, text="", wraplength=260)
+        self.lbl_budget.grid(row=9, column=0, columnspan=2, sticky="w", padx=5)
 
         # Right: Investment
         right_frame = ttk.LabelFrame(mid_frame, text="Investment / Return")
@@ -823,6 +3425,7 @@ class FinanceApp:
         self.summary_year_filter.current(0)
         self.summary_year_filter.pack(side="left", padx=5)
         self.summary_year_filter.bind("<<ComboboxSelected>>", lambda e: self.update_summary())
+        self.summary_range = RangeFilter(sum_ctrl_frame, on_change=self.update_summary)
         
         self.summary_tree = ttk.Treeview(bot_frame, style="Summary.Treeview", show="headings")
         self.summary_tree.pack(fill="both", expand=True)
@@ -866,6 +3469,8 @@ class FinanceApp:
         )
         
         if file_path:
+            if self.dm.loading:
+                return messagebox.showinfo("Please wait", "Your data is still loading. Try the import again in a moment.")
             confirm = messagebox.askyesno("Confirm", "This will merge data from the old file into your current data and re-save it by year. Continue?")
             if confirm:
                 success, msg = self.dm.migrate_old_file(file_path)
@@ -877,6 +3482,300 @@ class FinanceApp:
                 else:
                     messagebox.showerror("Error", msg)
 
+    def import_bank_statement_action(self):
+        file_path = filedialog.askopenfilename(
+            title="Select bank statement",
+            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")]
+        )
+        if not file_path: return
+        if self.dm.loading:
+            return messagebox.showinfo("Please wait", "Your data is still loading. Try the import again in a moment.")
+        
+        win = tk.Toplevel(self.root)
+        win.title("Bank Statement Import")
+        ttk.Label(win, text=f"File: {os.path.basename(file_path)}").pack(anchor="w", padx=10, pady=5)
+        ttk.Label(win, text="Bank format:").pack(anchor="w", padx=10)
+        profiles = list(bank_profiles())
+        profile_cb = ttk.Combobox(win, values=profiles, state="readonly", width=30)
+        profile_cb.current(0)
+        profile_cb.pack(anchor="w", padx=10, pady=5)
+        
+        def on_import():
+            profile = profile_cb.get()
+            win.destroy()
+            try:
+                counts = self.dm.import_bank_statement(file_path, profile)
+            except (KeyError, ValueError, OSError) as e:
+                return messagebox.showerror("Error", f"Could not import {os.path.basename(file_path)} as {profile}: {e}")
+            self.update_summary()
+            self.refresh_all_tabs()
+            msg = (f"Expenses: {counts['expenses']}\nIncome: {counts['income']}\n"
+                   f"Needs a category: {counts['review']}\nSkipped (unreadable): {counts['invalid']}")
+            if counts["review"] and messagebox.askyesno("Import Done", msg + "\n\nReview unmatched rows now?"):
+                self.open_review_queue()
+            elif not counts["review"]:
+                messagebox.showinfo("Import Done", msg)
+        
+        ttk.Button(win, text="Import", command=on_import).pack(pady=10)
+
+    def open_review_queue(self):
+        """Assign categories to imported rows no rule matched"""
+        win = tk.Toplevel(self.root)
+        win.title("Review Unmatched Imports")
+        win.geometry("800x450")
+        
+        cols = ("Date", "Region", "Amount", "Payee", "Description")
+        tree = ttk.Treeview(win, columns=cols, show="headings")
+        for c, w in zip(cols, (90, 60, 80, 200, 340)):
+            tree.heading(c, text=c)
+            tree.column(c, width=w, anchor="w")
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        def refresh():
+            tree.delete(*tree.get_children())
+            for i, item in enumerate(self.dm.review_queue):
+                tree.insert("", "end", iid=str(i), values=(item["date"], item["region"], f"{item['amount']:.2f}",
+                                                            item.get("payee", ""), item.get("description", "")))
+        refresh()
+        
+        form = ttk.Frame(win)
+        form.pack(fill="x", padx=10, pady=5)
+        cat_cb = ttk.Combobox(form, state="readonly", width=15)
+        sub_cb = ttk.Combobox(form, state="readonly", width=15)
+        subsub_cb = ttk.Combobox(form, state="readonly", width=15)
+        keyword = ttk.Entry(form, width=20)
+        remember = tk.BooleanVar(value=True)
+        for i, (label, widget) in enumerate([("Category:", cat_cb), ("Sub:", sub_cb), ("Sub-Sub:", subsub_cb), ("Keyword:", keyword)]):
+            ttk.Label(form, text=label).grid(row=0, column=2 * i, padx=2)
+            widget.grid(row=0, column=2 * i + 1, padx=2)
+        ttk.Checkbutton(form, text="Remember keyword", variable=remember).grid(row=1, column=6, columnspan=2, sticky="w")
+        
+        def selected_region():
+            sel = tree.selection()
+            return self.dm.review_queue[int(sel[0])]["region"] if sel else "GER"
+        
+        def fill(combo, values):
+            combo['values'] = [""] + list(values)
+            combo.set("")
+        
+        def on_select(event=None):
+            sel = tree.selection()
+            fill(cat_cb, self.dm.get_categories(selected_region()).keys())
+            fill(sub_cb, [])
+            fill(subsub_cb, [])
+            if sel:
+                item = self.dm.review_queue[int(sel[0])]
+                keyword.delete(0, tk.END)
+                keyword.insert(0, item.get("payee") or item.get("description", "")[:30])
+        
+        def on_cat(event=None):
+            fill(sub_cb, self.dm.get_categories(selected_region()).get(cat_cb.get(), {}).keys())
+            fill(subsub_cb, [])
+        
+        def on_sub(event=None):
+            cats = self.dm.get_categories(selected_region())
+            fill(subsub_cb, cats.get(cat_cb.get(), {}).get(sub_cb.get(), {}).keys())
+        
+        tree.bind("<<TreeviewSelect>>", on_select)
+        cat_cb.bind("<<ComboboxSelected>>", on_cat)
+        sub_cb.bind("<<ComboboxSelected>>", on_sub)
+        
+        def on_assign():
+            sel = tree.selection()
+            if not sel or not cat_cb.get():
+                return messagebox.showerror("Error", "Select rows and a category")
+            region = selected_region()
+            if remember.get() and keyword.get().strip():
+                self.dm.add_import_rule(keyword.get(), region, cat_cb.get(), sub_cb.get(), subsub_cb.get())
+            self.dm.resolve_review_items([int(i) for i in sel], cat_cb.get(), sub_cb.get(), subsub_cb.get())
+            refresh()
+            self.update_summary()
+            self.refresh_all_tabs()
+        
+        ttk.Button(form, text="Assign", command=on_assign).grid(row=0, column=8, padx=5)
+
+    def open_diagnostics(self):
+        """Timings recorded by INSTRUMENTS: per-operation stats and the slowest recent calls"""
+        win = tk.Toplevel(self.root)
+        win.title("Diagnostics")
+        win.geometry("900x560")
+        
+        ctrl = ttk.Frame(win)
+        ctrl.pack(fill="x", padx=10, pady=5)
+        enabled = tk.BooleanVar(value=INSTRUMENTS.enabled)
+        
+        def on_toggle():
+            INSTRUMENTS.enabled = enabled.get()
+        
+        ttk.Checkbutton(ctrl, text="Record timings", variable=enabled, command=on_toggle).pack(side="left")
+        status = ttk.Label(ctrl, text="")
+        status.pack(side="left", padx=10)
+        
+        ttk.Label(win, text="Per operation", font=("Arial", 10, "bold")).pack(anchor="w", padx=10)
+        op_cols = ("Operation", "Calls", "Mean ms", "Max ms", "Total ms", "Histogram")
+        op_tree = ttk.Treeview(win, columns=op_cols, show="headings", height=10)
+        for c, w in zip(op_cols, (240, 60, 80, 80, 90, 320)):
+            op_tree.heading(c, text=c)
+            op_tree.column(c, width=w, anchor="w" if c in ("Operation", "Histogram") else "center")
+        op_tree.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        ttk.Label(win, text="Slowest recent calls", font=("Arial", 10, "bold")).pack(anchor="w", padx=10)
+        slow_cols = ("Time", "Operation", "ms")
+        slow_tree = ttk.Treeview(win, columns=slow_cols, show="headings", height=10)
+        for c, w in zip(slow_cols, (120, 300, 90)):
+            slow_tree.heading(c, text=c)
+            slow_tree.column(c, width=w, anchor="w" if c == "Operation" else "center")
+        slow_tree.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        labels = INSTRUMENTS.bucket_labels()
+        
+        def refresh():
+            op_tree.delete(*op_tree.get_children())
+            for op, s in INSTRUMENTS.summary().items():
+                hist = " ".join(f"{label}:{n}" for label, n in zip(labels, s["histogram"]) if n)
+                op_tree.insert("", "end", values=(op, s["count"], f"{s['mean_ms']:.1f}", f"{s['max_ms']:.1f}", f"{s['total_ms']:.0f}", hist))
+            slow_tree.delete(*slow_tree.get_children())
+            for t, op, ms in INSTRUMENTS.slowest():
+                slow_tree.insert("", "end", values=(datetime.fromtimestamp(t).strftime("%H:%M:%S"), op, f"{ms:.1f}"))
+            status.config(text=f"{len(INSTRUMENTS.recent)} calls in buffer" if INSTRUMENTS.enabled else "Recording is off")
+        
+        def on_clear():
+            INSTRUMENTS.clear()
+            refresh()
+        
+        def on_save():
+            path = filedialog.asksaveasfilename(title="Save timings", defaultextension=".json",
+                                                initialfile="finman_timings.json", filetypes=[("JSON Files", "*.json")])
+            if not path:
+                return
+            try:
+                INSTRUMENTS.dump(path)
+            except OSError as e:
+                return messagebox.showerror("Error", f"Could not save timings: {e}")
+            messagebox.showinfo("Saved", f"Timings saved to {path}")
+        
+        ttk.Button(ctrl, text="Save JSON...", command=on_save).pack(side="right")
+        ttk.Button(ctrl, text="Clear", command=on_clear).pack(side="right", padx=5)
+        ttk.Button(ctrl, text="Refresh", command=refresh).pack(side="right")
+        refresh()
+
+    def memory_usage(self):
+        """DataManager rows plus the charts and widgets of the built tabs"""
+        rows = self.dm.memory_usage()
+        for name, fig_attr, cache_attr in (("Trend", "fig_top", "trend_cache"), ("Pie", "fig_bot", "pie_cache"), ("Daily", "fig_dt", None), ("Heatmap", "fig_heat", None)):
+            fig = getattr(self, fig_attr, None)
+            if fig is None:
+                continue
+            # Agg keeps one RGBA buffer the size of the canvas
+            w, h = fig.canvas.get_width_height()
+            rows.append(("Charts", f"{name} figure", w * h * 4, f"{len(fig.findobj())} artists"))
+            cache = getattr(self, cache_attr, None) if cache_attr else None
+            if cache is not None:
+                bitmaps = sum(cw * ch * 4 for (_, (cw, ch)) in cache.entries)
+                rows.append(("Charts", f"{name} cache bitmaps", bitmaps, f"{len(cache.entries)}/{cache.maxsize} cached views"))
+
+        # Widgets live in Tcl/Tk's own memory, so these are counts only
+        widgets, trees, tree_rows, cells = 0, 0, 0, 0
+        stack = [self.root]
+        while stack:
+            w = stack.pop()
+            widgets += 1
+            stack.extend(w.winfo_children())
+            if isinstance(w, ttk.Treeview):
+                trees += 1
+                n = len(w.get_children())
+                tree_rows += n
+                cells += n * len(w["columns"])
+        rows.append(("Widgets", "Tk widgets", None, f"{widgets} widgets"))
+        rows.append(("Widgets", "Treeview rows", None, f"{trees} trees, {tree_rows} rows, {cells} cells"))
+        return rows
+
+    def open_memory_report(self):
+        """Memory held by the ledger, caches, indexes, charts and widgets"""
+        win = tk.Toplevel(self.root)
+        win.title("Memory")
+        win.geometry("900x600")
+
+        ctrl = ttk.Frame(win)
+        ctrl.pack(fill="x", padx=10, pady=5)
+        tracing = tk.BooleanVar(value=tracemalloc.is_tracing())
+        sampling = tk.BooleanVar(value=False)
+        sampler = MemorySampler()
+
+        cols = ("Group", "Component", "Size", "Detail")
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=16)
+        for c, w in zip(cols, (90, 260, 100, 360)):
+            tree.heading(c, text=c)
+            tree.column(c, width=w, anchor="e" if c == "Size" else "w")
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+
+        ttk.Label(win, text="Top allocations (tracemalloc)", font=("Arial", 10, "bold")).pack(anchor="w", padx=10)
+        top_tree = ttk.Treeview(win, columns=("Where", "Size", "Blocks"), show="headings", height=6)
+        for c, w in zip(("Where", "Size", "Blocks"), (560, 100, 80)):
+            top_tree.heading(c, text=c)
+            top_tree.column(c, width=w, anchor="w" if c == "Where" else "e")
+        top_tree.pack(fill="both", expand=True, padx=10, pady=5)
+
+        summary = ttk.Label(win, text="")
+        summary.pack(anchor="w", padx=10)
+        growth = ttk.Label(win, text="", foreground="red")
+        growth.pack(anchor="w", padx=10, pady=(0, 5))
+        state = {"report": None}
+
+        def refresh():
+            report = memory_report(self.memory_usage())
+            state["report"] = report
+            tree.delete(*tree.get_children())
+            for r in report["rows"]:
+                tree.insert("", "end", values=(r["group"], r["component"], format_bytes(r["bytes"]), r["detail"]))
+            top_tree.delete(*top_tree.get_children())
+            text = f"Accounted: {format_bytes(report['accounted_bytes'])}"
+            if report["tracemalloc"]:
+                tm = report["tracemalloc"]
+                text += f"   Traced: {format_bytes(tm['current_bytes'])} (peak {format_bytes(tm['peak_bytes'])})"
+                for s in tm["top"]:
+                    top_tree.insert("", "end", values=(s["where"], format_bytes(s["bytes"]), s["blocks"]))
+            else:
+                top_tree.insert("", "end", values=("Start tracing (or set FINMAN_TRACEMALLOC=1 before launch) to see allocations", "", ""))
+            if report["peak_rss_bytes"]:
+                text += f"   Peak RSS: {format_bytes(report['peak_rss_bytes'])}"
+            summary.config(text=text)
+            return report
+
+        def sample():
+            if not sampling.get() or not win.winfo_exists():
+                return
+            grown = sampler.sample(refresh())
+            if grown:
+                msg = "; ".join(f"{c} {format_bytes(b)} -> {format_bytes(a)}" for _, c, b, a in grown)
+                growth.config(text=f"{datetime.now():%H:%M:%S} grew: {msg}")
+                print(f"Memory growth: {msg}")
+            win.after(30000, sample)
+
+        def on_tracing():
+            if tracing.get():
+                tracemalloc.start()
+            else:
+                tracemalloc.stop()
+            refresh()
+
+        def on_sampling():
+            if sampling.get():
+                sampler.last = None
+                sample()
+
+        def on_save():
+            path = filedialog.asksaveasfilename(title="Save memory report", defaultextension=".json",
+                                                initialfile="finman_memory.json", filetypes=[("JSON Files", "*.json")])
+            if path:
+                save_json_file(path, state["report"] or refresh())
+
+        ttk.Checkbutton(ctrl, text="Trace allocations", variable=tracing, command=on_tracing).pack(side="left")
+        ttk.Checkbutton(ctrl, text="Sample every 30 s", variable=sampling, command=on_sampling).pack(side="left", padx=10)
+        ttk.Button(ctrl, text="Save JSON...", command=on_save).pack(side="right")
+        ttk.Button(ctrl, text="Refresh", command=refresh).pack(side="right", padx=5)
+        refresh()
+
     def open_category_manager(self):
         win = tk.Toplevel(self.root)
         win.title("Category Manager")
@@ -973,6 +3872,146 @@ class FinanceApp:
         ttk.Button(btn_frame, text="Delete", command=on_delete).pack(side="left", padx=2)
         ttk.Button(btn_frame, text="Save & Close", command=on_save).pack(side="right", padx=2)
 
+    def open_budgets(self):
+        """Set budgets for category paths and compare them with a month's spending"""
+        win = tk.Toplevel(self.root)
+        win.title("Budgets")
+        win.geometry("820x520")
+
+        top = ttk.Frame(win)
+        top.pack(fill="x", padx=10, pady=5)
+        ttk.Label(top, text="Region:").pack(side="left")
+        view_region = ttk.Combobox(top, values=["All", "GER", "BD"], state="readonly", width=6)
+        view_region.current(0)
+        view_region.pack(side="left", padx=5)
+        ttk.Label(top, text="Month (YYYY-MM):").pack(side="left", padx=(10, 0))
+        view_month = ttk.Entry(top, width=8)
+        view_month.insert(0, datetime.now().strftime("%Y-%m"))
+        view_month.pack(side="left", padx=5)
+
+        cols = ("Region", "Category", "Budget", "Actual", "Remaining", "Used %")
+        tree = ttk.Treeview(win, columns=cols, show="headings")
+        for c, w in zip(cols, (60, 300, 100, 100, 100, 70)):
+            tree.heading(c, text=c)
+            tree.column(c, width=w, anchor="w" if c == "Category" else "center")
+        tree.tag_configure("warn", background="#ffe5b4")
+        tree.tag_configure("over", background="#ffb3b3")
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+        rows = {}
+
+        def fmt(v):
+            return "" if v is None or (isinstance(v, float) and math.isnan(v)) else f"{v:.2f}"
+
+        def refresh(event=None):
+            ym = parse_year_month(view_month.get().strip() + "-01")
+            if ym is None:
+                return messagebox.showerror("Error", "Month must be YYYY-MM")
+            table = self.dm.budget_table(view_region.get(), *ym)
+            warn = (self.dm.budgets.get("thresholds") or [1.0])[0] * 100
+            tree.delete(*tree.get_children())
+            rows.clear()
+            for i, r in enumerate(table.itertuples(index=False)):
+                used = r[6]
+                tag = () if used is None or math.isnan(used) else ("over",) if used >= 100 else ("warn",) if used >= warn else ()
+                tree.insert("", "end", iid=str(i), values=(r.Region, r.Category, fmt(r.Budget), fmt(r.Actual), fmt(r.Remaining), fmt(used)), tags=tag)
+                rows[str(i)] = r
+
+        ttk.Button(top, text="Show", command=refresh).pack(side="left", padx=5)
+        view_region.bind("<<ComboboxSelected>>", refresh)
+
+        # --- Set / remove a budget ---
+        form = ttk.LabelFrame(win, text="Budget")
+        form.pack(fill="x", padx=10, pady=5)
+        region_cb = ttk.Combobox(form, values=["GER", "BD"], state="readonly", width=6)
+        region_cb.current(0)
+        cat_cb = ttk.Combobox(form, state="readonly", width=15)
+        sub_cb = ttk.Combobox(form, state="readonly", width=15)
+        subsub_cb = ttk.Combobox(form, state="readonly", width=15)
+        amount = ttk.Entry(form, width=10)
+        every_month = tk.BooleanVar(value=True)
+        for i, (label, widget) in enumerate([("Region:", region_cb), ("Category:", cat_cb), ("Sub:", sub_cb),
+                                             ("Sub-Sub:", subsub_cb), ("Amount:", amount)]):
+            ttk.Label(form, text=label).grid(row=0, column=2 * i, padx=2)
+            widget.grid(row=0, column=2 * i + 1, padx=2, pady=2)
+        ttk.Checkbutton(form, text="Every month (otherwise only the month shown)", variable=every_month).grid(row=1, column=0, columnspan=6, sticky="w")
+
+        def fill(combo, values, value=""):
+            combo['values'] = [""] + list(values)
+            combo.set(value)
+
+        def cats():
+            return self.dm.get_categories(region_cb.get())
+
+        def on_region(event=None):
+            fill(cat_cb, cats().keys())
+            on_cat()
+
+        def on_cat(event=None):
+            fill(sub_cb, cats().get(cat_cb.get(), {}).keys())
+            on_sub()
+
+        def on_sub(event=None):
+            fill(subsub_cb, cats().get(cat_cb.get(), {}).get(sub_cb.get(), {}).keys())
+
+        region_cb.bind("<<ComboboxSelected>>", on_region)
+        cat_cb.bind("<<ComboboxSelected>>", on_cat)
+        sub_cb.bind("<<ComboboxSelected>>", on_sub)
+        on_region()
+
+        def on_select(event=None):
+            sel = tree.selection()
+            if not sel:
+                return
+            r = rows[sel[0]]
+            path = [] if r.Category == "(all)" else r.Category.split(" > ")
+            path += [""] * (3 - len(path))
+            region_cb.set(r.Region)
+            fill(cat_cb, cats().keys(), path[0])
+            fill(sub_cb, cats().get(path[0], {}).keys(), path[1])
+            fill(subsub_cb, cats().get(path[0], {}).get(path[1], {}).keys(), path[2])
+            amount.delete(0, tk.END)
+            amount.insert(0, fmt(r.Budget))
+
+        tree.bind("<<TreeviewSelect>>", on_select)
+
+        def save(value):
+            month = "*" if every_month.get() else view_month.get().strip()
+            if month != "*" and parse_year_month(month + "-01") is None:
+                return messagebox.showerror("Error", "Month must be YYYY-MM")
+            self.dm.set_budget(region_cb.get(), (cat_cb.get(), sub_cb.get(), subsub_cb.get()), value, month)
+            refresh()
+            self.update_budget_label()
+
+        def on_set():
+            try:
+                value = float(amount.get())
+            except ValueError:
+                return messagebox.showerror("Error", "Amount must be a number")
+            save(value)
+
+        ttk.Button(form, text="Set", command=on_set).grid(row=0, column=10, padx=5)
+        ttk.Button(form, text="Remove", command=lambda: save(None)).grid(row=0, column=11, padx=2)
+
+        # --- Alert thresholds ---
+        alert_frame = ttk.Frame(win)
+        alert_frame.pack(fill="x", padx=10, pady=(0, 10))
+        ttk.Label(alert_frame, text="Alert at (% of budget):").pack(side="left")
+        thresholds = ttk.Entry(alert_frame, width=15)
+        thresholds.insert(0, ", ".join(f"{t * 100:g}" for t in self.dm.budgets.get("thresholds", [])))
+        thresholds.pack(side="left", padx=5)
+
+        def on_thresholds():
+            try:
+                values = [float(t) / 100 for t in thresholds.get().replace(";", ",").split(",") if t.strip()]
+            except ValueError:
+                return messagebox.showerror("Error", "Enter percentages like 80, 100")
+            self.dm.set_budget_thresholds(values)
+            refresh()
+            self.update_budget_label()
+
+        ttk.Button(alert_frame, text="Save", command=on_thresholds).pack(side="left")
+        refresh()
+
     def populate_exp_cats(self, event=None):
         region = self.exp_region.get()
         cats = list(self.dm.get_categories(region).keys())
@@ -1013,6 +4052,23 @@ class FinanceApp:
             self.exp_subsub['values'] = subsubs
             if subsubs: self.exp_subsub.current(0)
             else: self.exp_subsub.set('')
+        self.update_budget_label()
+
+    def update_budget_label(self, event=None):
+        """Live remaining budget for the expense form's category path"""
+        region = self.exp_region.get()
+        ym = parse_year_month(self.exp_date.get().strip()) or (datetime.now().year, datetime.now().month)
+        status = self.dm.budget_status(region, ym, (self.exp_cat.get(), self.exp_sub.get(), self.exp_subsub.get()))
+        if status is None:
+            self.lbl_budget.config(text="No budget set", foreground="gray")
+            return
+        currency = "Tk" if region == "BD" else "EUR"
+        path = " > ".join(status["path"]) or "All categories"
+        used = status["spent"] / status["budget"] if status["budget"] else 1.0
+        warn = (self.dm.budgets.get("thresholds") or [1.0])[0]
+        color = "red" if used >= 1.0 else "darkorange" if used >= warn else "darkgreen"
+        self.lbl_budget.config(text=f"Budget left: {status['remaining']:.2f} of {status['budget']:.2f} {currency} "
+                                    f"({path}, {ym[0]}-{ym[1]:02d})", foreground=color)
 
     def add_expense_action(self):
         region = self.exp_region.get()
@@ -1059,6 +4115,7 @@ class FinanceApp:
         self.update_summary()
         self.refresh_all_tabs()
 
+    @instrumented
     def update_summary(self):
         # 1. Get Filter
         try:
@@ -1066,52 +4123,10 @@ class FinanceApp:
         except:
             year_val = "All"
 
-        # 2. Prepare Dataframes (Load all, then filter)
-        inc_df = pd.DataFrame(self.dm.data["income"])
-        exp_df = pd.DataFrame(self.dm.data["expenses"])
-        inv_df = pd.DataFrame(self.dm.data["investments"])
-        
-        if not inc_df.empty:
-            inc_df["month_dt"] = pd.to_datetime(inc_df["date"])
-            inc_df["month"] = inc_df["month_dt"].dt.to_period("M")
-            inc_df["year"] = inc_df["month_dt"].dt.year
-        
-        if not exp_df.empty:
-            exp_df["month_dt"] = pd.to_datetime(exp_df["date"])
-            exp_df["month"] = exp_df["month_dt"].dt.to_period("M")
-            exp_df["year"] = exp_df["month_dt"].dt.year
-            exp_df["amount_eur"] = pd.to_numeric(exp_df["amount_eur"], errors='coerce').fillna(0)
-            
-        if not inv_df.empty:
-            inv_df["month_dt"] = pd.to_datetime(inv_df["date"])
-            inv_df["month"] = inv_df["month_dt"].dt.to_period("M")
-            inv_df["year"] = inv_df["month_dt"].dt.year
-
-        # 3. Apply Year Filter
-        if year_val != "All":
-            target_year = int(year_val)
-            if not inc_df.empty: inc_df = inc_df[inc_df["year"] == target_year]
-            if not exp_df.empty: exp_df = exp_df[exp_df["year"] == target_year]
-            if not inv_df.empty: inv_df = inv_df[inv_df["year"] == target_year]
-
-        # 4. Group Data
-        inc_grp = inc_df.groupby("month")["amount"].sum().reset_index() if not inc_df.empty else pd.DataFrame(columns=["month", "amount"])
-        
-        exp_grp_eur = exp_df[exp_df["region"] == "GER"].groupby("month")["amount_eur"].sum().reset_index() if not exp_df.empty else pd.DataFrame(columns=["month", "amount_eur"])
-        exp_grp_bd_local = exp_df[exp_df["region"] == "BD"].groupby("month")["amount_local"].sum().reset_index() if not exp_df.empty else pd.DataFrame(columns=["month", "amount_local"])
-        # Note: Recalculate BD EUR using filtered DF
-        if not exp_df.empty:
-            exp_grp_bd_eur = exp_df[exp_df["region"] == "BD"].groupby("month")["amount_local"].sum().reset_index()
-            exp_grp_bd_eur["amount_eur"] = exp_grp_bd_eur["amount_local"] / self.dm.DEFAULT_RATE
-        else:
-            exp_grp_eur = pd.DataFrame(columns=["month", "amount_eur"])
-            exp_grp_bd_local = pd.DataFrame(columns=["month", "amount_local"])
-            exp_grp_bd_eur = pd.DataFrame(columns=["month", "amount_eur"])
-            
-        inv_grp = inv_df[inv_df["type"] == "Investment"].groupby("month")["amount"].sum().reset_index() if not inv_df.empty else pd.DataFrame(columns=["month", "amount"])
-        ret_grp = inv_df[inv_df["type"] == "Return"].groupby("month")["amount"].sum().reset_index() if not inv_df.empty else pd.DataFrame(columns=["month", "amount"])
+        # 2. Month-by-month figures (shared with the report CLI)
+        summary = self.dm.monthly_summary(Query(year=year_val, date_range=self.summary_range.get()))
 
-        # 5. Populate Tree
+        # 3. Populate Tree
         self.summary_tree.delete(*self.summary_tree.get_children())
         
         cols = ["Month", "Income", "GER Exp", "BD Exp", "Net Inv", "Balance"]
@@ -1124,48 +4139,15 @@ class FinanceApp:
         
         totals = {k: 0.0 for k in cols[1:]}
         
-        # Determine months from filtered data
-        months = set()
-        if not inc_grp.empty: months.update(inc_grp["month"].tolist())
-        if not exp_grp_eur.empty: months.update(exp_grp_eur["month"].tolist())
-        if not exp_grp_bd_local.empty: months.update(exp_grp_bd_local["month"].tolist())
-        if not inv_grp.empty: months.update(inv_grp["month"].tolist())
-        if not ret_grp.empty: months.update(ret_grp["month"].tolist())
-        months = sorted(list(months))
-        
-        # FIX: Corrected Equation Logic
-        # Net Inv should be "Investments - Returns".
-        # We calculate net_inv as (Returns - Investments).
-        # If Returns > Investments, Net Inv is positive (Add to Balance).
-        # If Investments > Returns, Net Inv is negative (Subtract from Balance).
-        # Equation: Balance = Income - Expenses + Net Inv.
-        
-        for m in months:
-            inc = inc_grp[inc_grp["month"] == m]["amount"].sum() if not inc_grp.empty else 0
-            ret = ret_grp[ret_grp["month"] == m]["amount"].sum() if not ret_grp.empty else 0
-            exp_e = exp_grp_eur[exp_grp_eur["month"] == m]["amount_eur"].sum() if not exp_grp_eur.empty else 0
-            exp_b_tk = exp_grp_bd_local[exp_grp_bd_local["month"] == m]["amount_local"].sum() if not exp_grp_bd_local.empty else 0
-            exp_b_eur = exp_grp_bd_eur[exp_grp_bd_eur["month"] == m]["amount_eur"].sum() if not exp_grp_bd_eur.empty else 0
-            inv = inv_grp[inv_grp["month"] == m]["amount"].sum() if not inv_grp.empty else 0
-            
-            # Net Inv = Returns - Investments
-            net_inv = ret - inv
-            
-            # Balance = Income - Expenses + Net Inv
-            # If net_inv is positive (Returns > Inv), we add to balance.
-            # If net_inv is negative (Inv > Ret), we subtract from balance.
-            # This is correct.
-            bal = inc - exp_e - exp_b_eur - net_inv
-            
+        # Net Inv = Returns - Investments, Balance = Income - Expenses - Net Inv
+        # (see DataManager.monthly_summary)
+        months = list(summary.index)
+        for m, row in summary.iterrows():
             month_str = m.strftime('%B %Y') if hasattr(m, 'strftime') else str(m)
-            
-            self.summary_tree.insert("", "end", values=(month_str, f"{inc:.2f}", f"{exp_e:.2f}", f"{exp_b_tk:.2f}", f"{net_inv:.2f}", f"{bal:.2f}"))
-            
-            totals["Income"] += inc
-            totals["GER Exp"] += exp_e
-            totals["BD Exp"] += exp_b_tk
-            totals["Net Inv"] += net_inv
-            totals["Balance"] += bal
+            self.summary_tree.insert("", "end", values=(month_str, f"{row['Income']:.2f}", f"{row['GER Exp']:.2f}", f"{row['BD Exp']:.2f}", f"{row['Net Inv']:.2f}", f"{row['Balance']:.2f}"))
+        
+        for k in totals:
+            totals[k] = float(summary[k].sum())
             
         # Total Row
         self.summary_tree.insert("", "end", values=("TOTAL", *[f"{v:.2f}" for v in totals.values()]), tags=("total",))
@@ -1208,8 +4190,27 @@ class FinanceApp:
         self.db_filter.current(0)
         self.db_filter.pack(side="left", padx=5)
         
+        self.db_range = RangeFilter(ctrl_frame)
+        
         ttk.Button(ctrl_frame, text="Generate Tables", command=self.generate_db_tables).pack(side="left", padx=20)
         
+        # Search (results appear below the controls while there is a query)
+        self.db_search = ttk.Entry(ctrl_frame, width=28)
+        self.db_search.pack(side="right", padx=5)
+        ttk.Label(ctrl_frame, text="Search:").pack(side="right")
+        self.db_search.bind("<KeyRelease>", self.schedule_db_search)
+        self.db_search_job = None
+        
+        self.db_search_frame = ttk.LabelFrame(self.tab2, text="Search Results (double-click to open)")
+        self.db_search_tree = ttk.Treeview(self.db_search_frame, columns=("Type", "Date", "Match", "Amount"), show="headings", height=6)
+        for c, w in zip(self.db_search_tree["columns"], (100, 90, 500, 90)):
+            self.db_search_tree.heading(c, text=c)
+            self.db_search_tree.column(c, width=w, anchor="w")
+        self.db_search_tree.pack(fill="x", expand=True)
+        self.db_search_tree.bind("<Double-1>", self.open_search_result)
+        self.db_search_docs = {}
+        self.db_search_anchor = ctrl_frame
+        
         # Middle Frame (Expense Tables)
         self.db_top_frame = ttk.LabelFrame(self.tab2, text="Expense Database")
         self.db_top_frame.pack(fill="both", expand=True, padx=5, pady=5)
@@ -1243,14 +4244,72 @@ class FinanceApp:
         self.inv_tab_ret = ttk.Frame(self.db_tabs_inv)
         self.inv_tab_kh = ttk.Frame(self.db_tabs_inv)
         self.inv_tab_pivot = ttk.Frame(self.db_tabs_inv)
+        self.inv_tab_perf = ttk.Frame(self.db_tabs_inv)
         
         self.db_tabs_inv.add(self.inv_tab_list, text="Investments")
         self.db_tabs_inv.add(self.inv_tab_ret, text="Returns")
         self.db_tabs_inv.add(self.inv_tab_kh, text="Karje Hasana")
         self.db_tabs_inv.add(self.inv_tab_pivot, text="Inv/Ret Pivot")
+        self.db_tabs_inv.add(self.inv_tab_perf, text="Performance")
         
         self.setup_investment_section()
 
+    def schedule_db_search(self, event=None):
+        # Search once typing pauses instead of on every key
+        if self.db_search_job is not None:
+            self.root.after_cancel(self.db_search_job)
+        self.db_search_job = self.root.after(150, self.run_db_search)
+
+    def run_db_search(self):
+        self.db_search_job = None
+        text = self.db_search.get().strip()
+        tree = self.db_search_tree
+        tree.delete(*tree.get_children())
+        self.db_search_docs = {}
+        if not text:
+            self.db_search_frame.pack_forget()
+            return
+        if not self.db_search_frame.winfo_ismapped():
+            self.db_search_frame.pack(fill="x", padx=5, pady=5, after=self.db_search_anchor)
+        for i, hit in enumerate(self.dm.search(text)):
+            amount = f"{hit['amount']:.2f}" if isinstance(hit["amount"], (int, float)) else hit["amount"]
+            tree.insert("", "end", iid=str(i), values=(hit["kind"], hit["date"], hit["text"], amount))
+            self.db_search_docs[str(i)] = hit["doc"]
+        if not self.db_search_docs:
+            tree.insert("", "end", values=("", "", "Still loading..." if self.dm.loading else "No matches", ""))
+
+    def open_search_result(self, event=None):
+        """Show the record behind a search hit in the Database tab"""
+        doc = self.db_search_docs.get(self.db_search_tree.focus())
+        if doc is None: return
+        kind, ref = doc
+        
+        if kind == "path":
+            # Expense category: show that region's tables, Table 1 has the categories
+            self.db_filter.set(ref[0] if ref[0] in ("GER", "BD") else "All")
+            self.generate_db_tables()
+            self.db_tabs_exp.select(self.db_tab1)
+            return
+        
+        e = self.dm.data[kind][ref]
+        if kind == "income":
+            # Income has no table here; show the record itself
+            return messagebox.showinfo("Income", f"Date: {e.get('date')}\nSource: {e.get('source')}\nAmount: {e.get('amount')} EUR")
+        
+        if not self.tree_inv.get_children() and not self.tree_ret.get_children():
+            self.generate_db_tables()
+        if e.get("category") == "Karje hasana" and e.get("name"):
+            tab, tree, iid = self.inv_tab_kh, self.tree_kh, f"kh:{e.get('name')}"
+        elif e.get("type") == "Return":
+            tab, tree, iid = self.inv_tab_ret, self.tree_ret, f"investments:{ref}"
+        else:
+            tab, tree, iid = self.inv_tab_list, self.tree_inv, f"investments:{ref}"
+        self.db_tabs_inv.select(tab)
+        if tree.exists(iid):
+            tree.selection_set(iid)
+            tree.focus(iid)
+            tree.see(iid)
+
     def setup_investment_section(self):
         # Create Investment Trees
         self.tree_inv = ttk.Treeview(self.inv_tab_list, columns=("Month", "Category", "Amount", "Desc"), show="headings")
@@ -1284,7 +4343,25 @@ class FinanceApp:
         self.pivot_filter.pack(side="left", padx=5)
         self.pivot_filter.bind("<<ComboboxSelected>>", self.generate_db_tables)
 
+        # --- Performance (all history, realised cash flows) ---
+        perf_ctrl = ttk.Frame(self.inv_tab_perf)
+        perf_ctrl.pack(fill="x", padx=5, pady=5)
+        ttk.Label(perf_ctrl, text="By:").pack(side="left")
+        self.perf_by = ttk.Combobox(perf_ctrl, values=["Category", "Holding"], width=10, state="readonly")
+        self.perf_by.current(0)
+        self.perf_by.pack(side="left", padx=5)
+        self.perf_by.bind("<<ComboboxSelected>>", self.generate_performance_table)
+        ttk.Label(perf_ctrl, text="XIRR and breakeven use only money paid in and returned so far").pack(side="left", padx=10)
+
+        perf_cols = ("Name", "Invested", "Returned", "Net", "Cash on Cash", "XIRR", "First", "Breakeven", "Months")
+        self.tree_perf = ttk.Treeview(self.inv_tab_perf, columns=perf_cols, show="headings")
+        for c in perf_cols:
+            self.tree_perf.heading(c, text=c)
+            self.tree_perf.column(c, width=200 if c == "Name" else 100, anchor="w" if c == "Name" else "center")
+        self.tree_perf.pack(fill="both", expand=True)
+
     # --- Tab 1 Logic Helpers ---
+    @instrumented
     def generate_db_tables(self, event=None):
         # Clear Expense Tables
         for t in [self.t1_container, self.t2_container, self.t3_container]:
@@ -1306,21 +4383,12 @@ class FinanceApp:
         year = self.db_year.get()
         filter_type = self.db_filter.get()
         
-        df = pd.DataFrame(self.dm.data["expenses"])
-        if df.empty: 
+        if not self.dm.data["expenses"]: 
             ttk.Label(self.t1_container, text="No Data").pack()
             return
         
-        df["month"] = pd.to_datetime(df["date"]).dt.to_period("M")
-        df["year"] = pd.to_datetime(df["date"]).dt.year
-        df = df.sort_values("month")
-        
-        if year != "All":
-            df = df[df["year"] == int(year)]
-            
-        if filter_type in ["GER", "BD"]:
-            df = df[df["region"] == filter_type]
-        
+        query = Query(year=year, region=filter_type, date_range=self.db_range.get())
+        df = self.dm.db_expenses(query)
         if df.empty:
             ttk.Label(self.t1_container, text="No Data for Filter").pack()
             return
@@ -1365,14 +4433,13 @@ class FinanceApp:
             tree.insert("", "end", values=("Total",) + tuple(totals) + (f"{df_pivot.sum().sum():.2f}",), tags=("total",))
             tree.tag_configure("total", background="#ccc")
 
-        val_col = "amount_local" if filter_type == "BD" else "amount_eur"
-
-        t1 = df.pivot_table(index="month", columns="category", values=val_col, aggfunc="sum", fill_value=0)
+        t1 = self.dm.expense_pivot(df, "category", filter_type)
         make_table(self.t1_container, t1)
         
         t2_ctrl = ttk.Frame(self.t2_container)
         t2_ctrl.pack(fill="x")
-        sel_cat = ttk.Combobox(t2_ctrl, values=list(df["category"].unique()), state="readonly")
+        db_cats = self.dm.distinct_values(region=filter_type, year=year)
+        sel_cat = ttk.Combobox(t2_ctrl, values=db_cats, state="readonly")
         sel_cat.pack(side="left", padx=5)
         if not df.empty: sel_cat.current(0)
         
@@ -1381,9 +4448,9 @@ class FinanceApp:
         
         def update_t2(event):
             c = sel_cat.get()
-            sub_df = df[df["category"] == c]
+            sub_df = apply_query(df, Query(category=c))
             if not sub_df.empty:
-                t2 = sub_df.pivot_table(index="month", columns="subcategory", values=val_col, aggfunc="sum", fill_value=0)
+                t2 = self.dm.expense_pivot(sub_df, "subcategory", filter_type)
                 for w in t2_tree_area.winfo_children(): w.destroy()
                 make_table(t2_tree_area, t2)
         
@@ -1392,7 +4459,7 @@ class FinanceApp:
         
         t3_ctrl = ttk.Frame(self.t3_container)
         t3_ctrl.pack(fill="x")
-        sel_cat3 = ttk.Combobox(t3_ctrl, values=list(df["category"].unique()), state="readonly")
+        sel_cat3 = ttk.Combobox(t3_ctrl, values=db_cats, state="readonly")
         sel_cat3.pack(side="left", padx=5)
         sel_sub3 = ttk.Combobox(t3_ctrl, state="readonly")
         sel_sub3.pack(side="left", padx=5)
@@ -1402,7 +4469,7 @@ class FinanceApp:
         
         def update_cat3(event):
             c = sel_cat3.get()
-            subs = df[df["category"] == c]["subcategory"].unique().tolist()
+            subs = self.dm.distinct_values(region=filter_type, year=year, category=c)
             sel_sub3['values'] = subs
             if subs: sel_sub3.current(0)
             update_t3(None)
@@ -1410,9 +4477,9 @@ class FinanceApp:
         def update_t3(event):
             c = sel_cat3.get()
             s = sel_sub3.get()
-            sub_df = df[(df["category"] == c) & (df["subcategory"] == s)]
+            sub_df = apply_query(df, Query(category=c, subcategory=s))
             if not sub_df.empty:
-                t3 = sub_df.pivot_table(index="month", columns="subsubcategory", values=val_col, aggfunc="sum", fill_value=0)
+                t3 = self.dm.expense_pivot(sub_df, "subsubcategory", filter_type)
                 for w in t3_tree_area.winfo_children(): w.destroy()
                 make_table(t3_tree_area, t3)
         
@@ -1423,77 +4490,80 @@ class FinanceApp:
             update_cat3(None)
 
         # --- Generate Investment Lists ---
-        inv_df = pd.DataFrame(self.dm.data["investments"])
-        if not inv_df.empty:
-            inv_df["month"] = pd.to_datetime(inv_df["date"]).dt.to_period("M")
-            
-            df_inv = inv_df[inv_df["type"] == "Investment"]
+        if self.dm.data["investments"]:
+            df_inv = self.dm.query("investments", Query(inv_type="Investment"))
             self.tree_inv.delete(*self.tree_inv.get_children())
-            for _, row in df_inv.iterrows():
-                self.tree_inv.insert("", "end", values=(row["month"], row["category"], row["amount"], row["description"]))
+            for idx, row in df_inv.iterrows():
+                self.tree_inv.insert("", "end", iid=f"investments:{idx}", values=(row["date"].strftime("%Y-%m"), row["category"], row["amount"], row["description"]))
                 
-            df_ret = inv_df[inv_df["type"] == "Return"]
+            df_ret = self.dm.query("investments", Query(inv_type="Return"))
             self.tree_ret.delete(*self.tree_ret.get_children())
-            for _, row in df_ret.iterrows():
-                self.tree_ret.insert("", "end", values=(row["month"], row["category"], row["amount"], row["description"]))
+            for idx, row in df_ret.iterrows():
+                self.tree_ret.insert("", "end", iid=f"investments:{idx}", values=(row["date"].strftime("%Y-%m"), row["category"], row["amount"], row["description"]))
                 
             kh_data = self.dm.get_kh_details()
             self.tree_kh.delete(*self.tree_kh.get_children())
             for item in kh_data:
-                self.tree_kh.insert("", "end", values=(item["Date"], item["Name/Org"], item["Address"], item["Amount (Given)"], item["Return"], item["To Be Return"]))
+                self.tree_kh.insert("", "end", iid=f"kh:{item['Name/Org']}", values=(item["Date"], item["Name/Org"], item["Address"], item["Amount (Given)"], item["Return"], item["To Be Return"]))
             
             # --- Generate Pivot Table ---
             self.generate_pivot_table()
+            self.generate_performance_table()
 
     # --- Tab 1 Logic Helpers ---
+    @instrumented
     def generate_pivot_table(self, event=None):
         year = self.pivot_year.get()
         filter_piv = self.pivot_filter.get()
         
-        inv_df = pd.DataFrame(self.dm.data["investments"])
-        
         # Clear Pivot Tree Safely
         if hasattr(self.tree_inv_pivot, 'delete'):
             self.tree_inv_pivot.delete(*self.tree_inv_pivot.get_children())
         
-        if not inv_df.empty:
-            inv_df["month"] = pd.to_datetime(inv_df["date"]).dt.to_period("M")
-            inv_df["year"] = pd.to_datetime(inv_df["date"]).dt.year
+        if not self.dm.data["investments"]:
+            return
+        
+        # Year filter + type filter (the dropdown says Investments/Returns, records say Investment/Return)
+        inv_type = {"Investments": "Investment", "Returns": "Return"}.get(filter_piv, filter_piv)
+        pivot = self.dm.investment_pivot(Query(year=year, inv_type=inv_type, date_range=self.db_range.get()))
+        if not pivot.empty:
+            cols_p = list(pivot.columns)
             
-            # Apply Year Filter
-            if year != "All":
-                inv_df = inv_df[inv_df["year"] == int(year)]
-                
-            # Apply Type Filter (Investments/Return/All)
-            if filter_piv != "All":
-                inv_df = inv_df[inv_df["type"] == filter_piv]
+            # Add Total column
+            cols_final = ["Month"] + cols_p + ["Total"]
             
-            if not inv_df.empty:
-                pivot = inv_df.pivot_table(index="month", columns="category", values="amount", aggfunc="sum", fill_value=0)
-                
-                cols_p = list(pivot.columns)
-                cols_p = sorted(cols_p)
-                
-                # Add Total column
-                cols_final = ["Month"] + cols_p + ["Total"]
-                
-                self.tree_inv_pivot["columns"] = cols_final
-                
-                # Apply anchor='center'
-                self.tree_inv_pivot.column("#0", width=0)
-                for c in cols_final:
-                    self.tree_inv_pivot.heading(c, text=c)
-                    self.tree_inv_pivot.column(c, width=120, minwidth=120, anchor="center", stretch=False)
-                
-                for idx, row in pivot.iterrows():
-                    month_p = idx.strftime('%B %Y') if hasattr(idx, 'strftime') else str(idx)
-                    # Calculate row total for display
-                    row_sum = row.sum()
-                    vals = [month_p] + [f"{v:.2f}" for v in row.values] + [f"{row_sum:.2f}"]
-                    self.tree_inv_pivot.insert("", "end", values=vals)
-            else:
-                # Insert placeholder if no data
-                self.tree_inv_pivot.insert("", "end", values=("No Data for Filter", ""))
+            self.tree_inv_pivot["columns"] = cols_final
+            
+            # Apply anchor='center'
+            self.tree_inv_pivot.column("#0", width=0)
+            for c in cols_final:
+                self.tree_inv_pivot.heading(c, text=c)
+                self.tree_inv_pivot.column(c, width=120, minwidth=120, anchor="center", stretch=False)
+            
+            for idx, row in pivot.iterrows():
+                month_p = idx.strftime('%B %Y') if hasattr(idx, 'strftime') else str(idx)
+                # Calculate row total for display
+                row_sum = row.sum()
+                vals = [month_p] + [f"{v:.2f}" for v in row.values] + [f"{row_sum:.2f}"]
+                self.tree_inv_pivot.insert("", "end", values=vals)
+        else:
+            # Insert placeholder if no data
+            self.tree_inv_pivot.insert("", "end", values=("No Data for Filter", ""))
+
+    @instrumented
+    def generate_performance_table(self, event=None):
+        self.tree_perf.delete(*self.tree_perf.get_children())
+        table = self.dm.investment_performance(self.perf_by.get().lower())
+
+        def fmt(value, pattern):
+            return "" if pd.isna(value) else pattern.format(value)
+
+        for r in table.itertuples(index=False):
+            self.tree_perf.insert("", "end", values=(
+                r[0], f"{r.Invested:.2f}", f"{r.Returned:.2f}", f"{r.Net:.2f}", fmt(r[4], "{:.2f}x"), fmt(r.XIRR, "{:.1%}"),
+                fmt(r.First, "{:%Y-%m-%d}"), fmt(r.Breakeven, "{:%Y-%m-%d}"), fmt(r[8], "{:.1f}")))
+        if table.empty:
+            self.tree_perf.insert("", "end", values=("No Data",))
 
     # ==========================================
     # TAB 3: ANALYSIS
@@ -1508,12 +4578,33 @@ class FinanceApp:
         self.ana_year = ttk.Combobox(ctrl_top, values=["All"] + list(range(2020, 2030)), width=5, state="readonly")
         self.ana_year.current(0)
         self.ana_year.pack(side="left", padx=5)
+        # Applies to both charts of the tab
+        self.ana_range = RangeFilter(ctrl_top, on_change=lambda: (self.plot_trend(), self.plot_pie()))
+        ttk.Label(ctrl_top, text="Overlay:").pack(side="left", padx=(10, 0))
+        self.trend_overlay = ttk.Combobox(ctrl_top, values=["None"] + [f"{w}-mo {stat}" for stat in ("mean", "median") for w in ROLLING_WINDOWS],
+                                          width=12, state="readonly")
+        self.trend_overlay.current(0)
+        self.trend_overlay.pack(side="left", padx=5)
+        self.trend_overlay.bind("<<ComboboxSelected>>", lambda e: self.plot_trend())
+        ttk.Label(ctrl_top, text="of").pack(side="left")
+        # Total draws Income/Expense; a region or region > category draws that spending
+        self.trend_overlay_of = ttk.Combobox(ctrl_top, values=["Total"], width=18, state="readonly",
+                                             postcommand=self.fill_trend_overlay_targets)
+        self.trend_overlay_of.current(0)
+        self.trend_overlay_of.pack(side="left", padx=5)
+        self.trend_overlay_of.bind("<<ComboboxSelected>>", lambda e: self.plot_trend())
+        self.trend_forecast = tk.BooleanVar(value=False)
+        ttk.Checkbutton(ctrl_top, text="Forecast 6 months", variable=self.trend_forecast, command=self.plot_trend).pack(side="left", padx=5)
         ttk.Button(ctrl_top, text="Plot Trend", command=self.plot_trend).pack(side="left", padx=10)
+        ttk.Button(ctrl_top, text="Distribution", command=self.open_distribution).pack(side="left")
+        ttk.Button(ctrl_top, text="Projection", command=self.open_projection).pack(side="left", padx=5)
         
-        self.fig_top = plt.Figure(figsize=(5, 3), dpi=100)
+        self.fig_top = mpl_figure.Figure(figsize=(5, 3), dpi=100)
         self.ax_top = self.fig_top.add_subplot(111)
-        self.canvas_top = FigureCanvasTkAgg(self.fig_top, top_frame)
+        self.canvas_top = mpl_backend_tkagg.FigureCanvasTkAgg(self.fig_top, top_frame)
         self.canvas_top.get_tk_widget().pack(fill="both", expand=True)
+        self.init_trend_chart()
+        self.trend_cache = ChartCache(self.canvas_top)
         
         bot_frame = ttk.LabelFrame(self.tab3, text="Detailed Pie Chart Analysis")
         bot_frame.pack(fill="both", expand=True, padx=10, pady=5)
@@ -1560,10 +4651,82 @@ class FinanceApp:
         # --- PLOT PIE BUTTON: Moved to right side ---
         ttk.Button(ctrl_bot, text="Plot Pie", command=self.plot_pie).pack(side="right", padx=10)
         
-        self.fig_bot = plt.Figure(figsize=(5, 4), dpi=100)
+        self.fig_bot = mpl_figure.Figure(figsize=(5, 4), dpi=100)
         self.ax_bot = self.fig_bot.add_subplot(111)
-        self.canvas_bot = FigureCanvasTkAgg(self.fig_bot, bot_frame)
+        self.canvas_bot = mpl_backend_tkagg.FigureCanvasTkAgg(self.fig_bot, bot_frame)
         self.canvas_bot.get_tk_widget().pack(fill="both", expand=True)
+        self.init_pie_chart()
+        self.pie_cache = ChartCache(self.canvas_bot)
+
+    def init_trend_chart(self):
+        # One pool of bar patches per series, reused on every refresh
+        ax = self.ax_top
+        self.trend_series = ["Income", "GER_Exp", "BD_Exp", "Investment", "Return"]
+        self.trend_colors = {name: f"C{i}" for i, name in enumerate(self.trend_series)}
+        self.trend_bars = {name: [] for name in self.trend_series}
+        self.trend_handles = [mpl_patches.Patch(facecolor=self.trend_colors[n], label=n) for n in self.trend_series]
+        self.trend_legend = ax.legend(handles=self.trend_handles)
+        self.trend_nodata = ax.text(0.5, 0.5, "No Data", ha="center", transform=ax.transAxes, visible=False)
+        # Rolling-average overlays and the dashed forecast, hidden until switched on
+        self.trend_lines = {}
+        for name, color, style in [("Income avg", "navy", "-"), ("Expense avg", "darkred", "-"),
+                                   ("Spend avg", "darkorange", "-"),
+                                   ("Income forecast", "navy", "--"), ("Expense forecast", "darkred", "--"),
+                                   ("Balance forecast", "darkgreen", "--")]:
+            self.trend_lines[name], = ax.plot([], [], color=color, linestyle=style, linewidth=1.8, marker=".", visible=False, label=name)
+
+    def init_pie_chart(self):
+        # Same framing as Axes.pie(), set once instead of on every plot
+        ax = self.ax_bot
+        ax.set(frame_on=False, xticks=[], yticks=[], xlim=(-1.25, 1.25), ylim=(-1.25, 1.25))
+        ax.set_aspect("equal")
+        self.pie_wedges = []
+        self.pie_labels = []
+        self.pie_pcts = []
+        self.pie_nodata = ax.text(0.5, 0.5, "No Data", ha="center", transform=ax.transAxes, visible=False)
+
+    def pie_state(self, counts, title=""):
+        """Chart state for a Series of slice values: (labels, values, title)"""
+        counts = counts[counts > 0] if counts is not None else []
+        values = [float(v) for v in counts.values] if len(counts) else []
+        labels = [str(i) for i in counts.index] if len(counts) else []
+        return labels, values, title
+
+    def apply_pie_state(self, state):
+        """Update the pooled Wedge/Text artists (no drawing)"""
+        ax = self.ax_bot
+        labels, values, title = state
+        total = sum(values)
+
+        while len(self.pie_wedges) < len(values):
+            self.pie_wedges.append(ax.add_patch(mpl_patches.Wedge((0, 0), 1, 0, 0)))
+            self.pie_labels.append(ax.text(0, 0, "", va="center"))
+            self.pie_pcts.append(ax.text(0, 0, "", ha="center", va="center"))
+
+        theta1 = 0.0
+        for i, wedge in enumerate(self.pie_wedges):
+            visible = i < len(values)
+            wedge.set_visible(visible)
+            self.pie_labels[i].set_visible(visible)
+            self.pie_pcts[i].set_visible(visible)
+            if not visible:
+                continue
+            frac = values[i] / total
+            theta2 = theta1 + 360.0 * frac
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            wedge.set_facecolor(f"C{i % 10}")
+            mid = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            self.pie_labels[i].set_position((1.1 * x, 1.1 * y))
+            self.pie_labels[i].set_horizontalalignment("left" if x > 0 else "right")
+            self.pie_labels[i].set_text(labels[i])
+            self.pie_pcts[i].set_position((0.6 * x, 0.6 * y))
+            self.pie_pcts[i].set_text(f"{100 * frac:.1f}%")
+            theta1 = theta2
+
+        self.pie_nodata.set_visible(not values)
+        ax.set_title(title if values else "")
 
     # --- Tab 3 Logic Helpers ---
 
@@ -1583,28 +4746,21 @@ class FinanceApp:
     # Helper: Populate Subcategory dropdown based on selected Category
     def populate_pie_subcat_options(self, selected_cat):
         ptype = self.pie_type.get()
-        df = pd.DataFrame(self.dm.data["expenses"])
         
-        if df.empty: 
+        if not self.dm.data["expenses"]: 
             self.pie_subcat_filter['values'] = []
             self.pie_subcat_filter.set('')
             self.plot_pie()
             return
 
-        # Filter by Year
+        # Year / Type (region) / Category filters come straight from the index
         year = self.pie_year.get()
-        df["year"] = pd.to_datetime(df["date"]).dt.year
-        if year != "All": df = df[df["year"] == int(year)]
-        
-        # Filter by Type
-        if ptype in ["GER", "BD"]:
-            df = df[df["region"] == ptype]
-        
-        # Filter by Category
+        region = ptype if ptype in ["GER", "BD"] else "All"
         if selected_cat:
-            df = df[df["category"] == selected_cat]
-        
-        subs = df["subcategory"].unique().tolist()
+            subs = self.dm.distinct_values(region=region, year=year, category=selected_cat)
+        else:
+            subs = list(dict.fromkeys(sub for c in self.dm.distinct_values(region=region, year=year)
+                                      for sub in self.dm.distinct_values(region=region, year=year, category=c)))
         self.pie_subcat_filter['values'] = subs
         
         if subs:
@@ -1615,25 +4771,16 @@ class FinanceApp:
     # Helper: Populate Category dropdown
     def populate_pie_cat_options(self, ptype):
         # Modified to handle "All" type for Expense Analysis
-        df = pd.DataFrame(self.dm.data["expenses"])
-        
-        if df.empty: 
+        if not self.dm.data["expenses"]: 
             self.pie_cat_filter['values'] = []
             self.pie_cat_filter.set('')
             self.plot_pie()
             return
 
-        # Filter by Year
+        # Filter by Year and Region (ptype == "All" includes all regions)
         year = self.pie_year.get()
-        df["year"] = pd.to_datetime(df["date"]).dt.year
-        if year != "All": df = df[df["year"] == int(year)]
-        
-        # Filter by Region
-        if ptype in ["GER", "BD"]:
-            df = df[df["region"] == ptype]
-        # If ptype == "All", we include all regions
-        
-        cats = list(df["category"].unique())
+        region = ptype if ptype in ["GER", "BD"] else "All"
+        cats = self.dm.distinct_values(region=region, year=year)
         self.pie_cat_filter['values'] = cats
         
         if cats:
@@ -1696,64 +4843,64 @@ class FinanceApp:
             # Note: Similar to above, we rely on the user selecting a category 
             # to populate subcategories.
 
+    def pie_key(self, year, ptype, level, cat, sub, date_range=None):
+        """Cache key for a pie view; filters that don't apply to the level are dropped"""
+        if ptype == "Investment" or level == "category":
+            cat = sub = None
+        elif level == "subcategory":
+            sub = None
+        return (self.dm.version, "pie", year, ptype, level, cat, sub, date_range)
+
     # FIX: Updated to use dynamic filters
+    @instrumented
     def plot_pie(self, event=None):
         year = self.pie_year.get()
         ptype = self.pie_type.get()
         level = self.pie_level.get().lower()
         
-        self.ax_bot.clear()
-        
+        # Get current filter selections
+        selected_cat = self.pie_cat_filter.get()
+        selected_sub = self.pie_subcat_filter.get()
+        date_range = self.ana_range.get()
+
+        # Same view as before (and data unchanged) -> just blit the cached bitmap
+        key = self.pie_key(year, ptype, level, selected_cat, selected_sub, date_range)
+        if self.pie_cache.show(key, self.apply_pie_state):
+            return
+
+        state, warning = self.compute_pie_state(year, ptype, level, selected_cat, selected_sub, date_range)
+        if warning:
+            messagebox.showwarning("Filter Required", warning)
+            return
+        self.pie_cache.render(key, state, self.apply_pie_state)
+
+    def compute_pie_state(self, year, ptype, level, selected_cat, selected_sub, date_range=None):
+        """Returns (state, warning); warning is set when a required filter is missing"""
         # --- Investment Case ---
         if ptype == "Investment":
             # Requirement: "plot only investment/return categories"
             # If ptype is Investment, we treat it as an expense type internally? 
             # No, self.dm.data["investments"] is separate.
             
-            df = pd.DataFrame(self.dm.data["investments"])
-            if df.empty: return
-            df["year"] = pd.to_datetime(df["date"]).dt.year
-            if year != "All": df = df[df["year"] == int(year)]
-            
+            df = self.dm.query("investments", Query(year=year, inv_type="Investment", date_range=date_range))
             if df.empty:
-                self.canvas_bot.draw()
-                return
+                return self.pie_state(None), None
             
             # Requirement: "do not activate category". 
             # This is implicitly handled by toggle_pie_level (frames are hidden).
             # We just plot Investment distribution.
-            counts = df[df["type"] == "Investment"].groupby("category")["amount"].sum()
-            counts.plot(kind="pie", ax=self.ax_bot, autopct='%1.1f%%')
-            self.ax_bot.set_ylabel("")
-            self.ax_bot.set_title("Investment Distribution")
-            
-            self.canvas_bot.draw()
-            return
+            counts = df.groupby("category")["amount"].sum()
+            return self.pie_state(counts, "Investment Distribution"), None
 
         # --- Expense Case ---
-        df = pd.DataFrame(self.dm.data["expenses"])
-        if df.empty: return
-        df["year"] = pd.to_datetime(df["date"]).dt.year
-        if year != "All": df = df[df["year"] == int(year)]
-        
-        if ptype in ["GER", "BD", "All"]:
-            if ptype != "All":
-                df = df[df["region"] == ptype]
-        
-        if df.empty:
-            self.canvas_bot.draw()
-            return
+        query = Query(year=year, region=ptype, date_range=date_range)
 
         # --- Apply Dynamic Filtering ---
-        
-        # Get current filter selections
-        selected_cat = self.pie_cat_filter.get()
-        selected_sub = self.pie_subcat_filter.get()
 
         # --- Category Level ---
         if level == "category":
             # Show Category breakdown (ignoring filters)
-            self.ax_bot.set_title(f"Expense Breakdown: Category ({ptype})")
+            title = f"Expense Breakdown: Category ({ptype})"
             col = "category"
 
         # --- Subcategory Level ---
@@ -1761,11 +4908,10 @@ class FinanceApp:
             # Requirement: "activate filters to select category"
             # Enforce that a category is selected
             if not selected_cat:
-                messagebox.showwarning("Filter Required", "Please select a Category to view Subcategories.")
-                return
+                return None, "Please select a Category to view Subcategories."
 
-            df = df[df["category"] == selected_cat]
-            self.ax_bot.set_title(f"Expense Breakdown: Subcategory ({ptype}) - {selected_cat}")
+            query = query._replace(category=selected_cat)
+            title = f"Expense Breakdown: Subcategory ({ptype}) - {selected_cat}"
             col = "subcategory"
             
         # --- SubSubcategory Level ---
@@ -1773,55 +4919,328 @@ class FinanceApp:
             # Requirement: "activate filters to select category and subcategory"
             # Enforce selection
             if not selected_cat:
-                messagebox.showwarning("Filter Required", "Please select a Category.")
-                return
+                return None, "Please select a Category."
             if not selected_sub:
-                 messagebox.showwarning("Filter Required", "Please select a Subcategory.")
-                 return
+                return None, "Please select a Subcategory."
 
-            df = df[df["category"] == selected_cat]
-            if selected_sub:
-                df = df[df["subcategory"] == selected_sub]
-                self.ax_bot.set_title(f"Expense Breakdown: SubSubcategory ({ptype}) - {selected_cat} - {selected_sub}")
-            else:
-                self.ax_bot.set_title(f"Expense Breakdown: SubSubcategory ({ptype}) - {selected_cat}")
+            query = query._replace(category=selected_cat, subcategory=selected_sub)
+            title = f"Expense Breakdown: SubSubcategory ({ptype}) - {selected_cat} - {selected_sub}"
             col = "subsubcategory"
             
         # --- Plot ---
+        df = self.dm.query("expenses", query)
+        if df.empty:
+            return self.pie_state(None), None
         counts = df.groupby(col)["amount_eur"].sum()
-        counts.plot(kind="pie", ax=self.ax_bot, autopct='%1.1f%%')
-        self.ax_bot.set_ylabel("")
-        self.canvas_bot.draw()
+        return self.pie_state(counts, title), None
     
+    def open_distribution(self):
+        """p50/p90/p99 of expense sizes or daily spend per category path, merged from the monthly sketches"""
+        win = tk.Toplevel(self.root)
+        win.title("Spend Distribution")
+        win.geometry("820x640")
+
+        top = ttk.Frame(win)
+        top.pack(fill="x", padx=10, pady=5)
+        years = sorted({key[0] for key in self.dm.category_index})
+        region_cb = ttk.Combobox(top, values=["All", "GER", "BD"], state="readonly", width=6)
+        region_cb.current(0)
+        first_cb = ttk.Combobox(top, values=years, state="readonly", width=6)
+        last_cb = ttk.Combobox(top, values=years, state="readonly", width=6)
+        if years:
+            first_cb.set(years[0])
+            last_cb.set(years[-1])
+        measure_cb = ttk.Combobox(top, values=["Expense size", "Daily spend"], state="readonly", width=12)
+        measure_cb.current(0)
+        for label, widget in [("Region:", region_cb), ("From:", first_cb), ("To:", last_cb), ("Measure:", measure_cb)]:
+            ttk.Label(top, text=label).pack(side="left", padx=(10, 0))
+            widget.pack(side="left", padx=5)
+            widget.bind("<<ComboboxSelected>>", lambda e: refresh())
+
+        nav = ttk.Frame(win)
+        nav.pack(fill="x", padx=10)
+        path_lbl = ttk.Label(nav, text="")
+        path_lbl.pack(side="left")
+
+        cols = ("Category", "Count", "p50", "p90", "p99")
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=8)
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, width=320 if c == "Category" else 90, anchor="w" if c == "Category" else "center")
+        tree.pack(fill="x", padx=10, pady=5)
+
+        fig = mpl_figure.Figure(figsize=(6, 3), dpi=100)
+        ax = fig.add_subplot(111)
+        canvas = mpl_backend_tkagg.FigureCanvasTkAgg(fig, win)
+        canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=5)
+        path = []
+
+        def refresh():
+            measure = "daily" if measure_cb.get() == "Daily spend" else "size"
+            span = (int(first_cb.get()) if first_cb.get() else None, int(last_cb.get()) if last_cb.get() else None)
+            table = self.dm.distribution_table(region_cb.get(), path, span, measure)
+            tree.heading("Count", text=table.columns[1])
+            tree.delete(*tree.get_children())
+            for r in table.itertuples(index=False):
+                tree.insert("", "end", values=(r[0], r[1], *(f"{v:.2f}" for v in r[2:])))
+            path_lbl.config(text="Path: " + (" > ".join(path) or "(all)") + "   (double-click a row to drill down)")
+
+            # One row per path: a bar from p50 to p99 with p90 marked, log scale since amounts span decades
+            ax.clear()
+            if len(table):
+                ys = list(range(len(table)))[::-1]
+                p50, p90, p99 = (table[c].to_numpy() for c in table.columns[2:5])
+                ax.hlines(ys, p50, p99, color="C0", linewidth=6, alpha=0.4)
+                ax.plot(p50, ys, "o", color="C0", label="p50")
+                ax.plot(p90, ys, "|", color="C1", markersize=12, label="p90")
+                ax.plot(p99, ys, "x", color="C3", label="p99")
+                ax.set_yticks(ys)
+                ax.set_yticklabels([c.split(" > ")[-1] for c in table["Category"]], fontsize="small")
+                ax.set_xscale("log", nonpositive="clip")
+                ax.minorticks_off()
+                ax.set_xlabel("EUR per day" if measure == "daily" else "EUR per expense")
+                ax.legend(fontsize="small", loc="lower right")
+            else:
+                ax.text(0.5, 0.5, "No Data", ha="center", transform=ax.transAxes)
+            fig.tight_layout()
+            canvas.draw_idle()
+
+        def drill(event=None):
+            sel = tree.selection()
+            if not sel:
+                return
+            label = tree.item(sel[0], "values")[0]
+            if label != "(all)" and label.count(" > ") < 2:
+                path[:] = label.split(" > ")
+                refresh()
+
+        def up():
+            if path:
+                path.pop()
+                refresh()
+
+        tree.bind("<Double-1>", drill)
+        ttk.Button(nav, text="Up", command=up).pack(side="right")
+        refresh()
+
+    def open_projection(self):
+        """Monte Carlo fan chart of the Total Balance, resampled from past months"""
+        win = tk.Toplevel(self.root)
+        win.title("Balance Projection")
+        win.geometry("860x560")
+
+        top = ttk.Frame(win)
+        top.pack(fill="x", padx=10, pady=5)
+        years_cb = ttk.Combobox(top, values=[1, 2, 3, 5, 10], state="readonly", width=4)
+        years_cb.set(10)
+        paths_entry = ttk.Entry(top, width=8)
+        paths_entry.insert(0, "10000")
+        history_cb = ttk.Combobox(top, values=["All", "Last 12 months", "Last 36 months", "Last 60 months"], state="readonly", width=15)
+        history_cb.current(0)
+        for label, widget in [("Years:", years_cb), ("Paths:", paths_entry), ("Resample:", history_cb)]:
+            ttk.Label(top, text=label).pack(side="left", padx=(10, 0))
+            widget.pack(side="left", padx=5)
+        ttk.Button(top, text="Run", command=lambda: run()).pack(side="left", padx=10)
+        info = ttk.Label(win, text="")
+        info.pack(fill="x", padx=10)
+
+        fig = mpl_figure.Figure(figsize=(7, 4), dpi=100)
+        ax = fig.add_subplot(111)
+        canvas = mpl_backend_tkagg.FigureCanvasTkAgg(fig, win)
+        canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=5)
+
+        def run(event=None):
+            try:
+                paths = int(paths_entry.get())
+            except ValueError:
+                return messagebox.showerror("Error", "Paths must be a whole number")
+            history = history_cb.get()
+            lookback = None if history == "All" else int(history.split()[1])
+            result = self.dm.balance_projection(int(years_cb.get()) * 12, max(paths, 1), lookback)
+            ax.clear()
+            if result is None:
+                info.config(text="")
+                ax.text(0.5, 0.5, "No Data", ha="center", transform=ax.transAxes)
+                canvas.draw_idle()
+                return
+            bands, shortfall, start = result
+
+            # Last three years of actual balance, then the fan
+            actual = float(self.dm.data.get("initial_balance_eur", 0.0)) + self.dm.cash_flow()["Balance"].cumsum()
+            actual = actual.iloc[-36:]
+            ax.plot(actual.index.to_timestamp(), actual.to_numpy(), color="black", linewidth=1.5, label="Actual")
+            x = bands.index.to_timestamp()
+            ax.fill_between(x, bands["p5"], bands["p95"], color="C0", alpha=0.2, linewidth=0, label="5-95%")
+            ax.fill_between(x, bands["p25"], bands["p75"], color="C0", alpha=0.4, linewidth=0, label="25-75%")
+            ax.plot(x, bands["p50"], color="C0", linewidth=2, label="Median")
+            ax.axhline(0, color="grey", linewidth=0.8)
+            ax.set_ylabel("Total Balance (EUR)")
+            ax.set_title(f"{paths:,} paths x {len(bands)} months")
+            ax.legend(loc="upper left", fontsize="small")
+            end = bands.iloc[-1]
+            info.config(text=f"Now {start:,.0f} EUR. In {len(bands) // 12} years: median {end['p50']:,.0f}, "
+                             f"5-95% {end['p5']:,.0f} to {end['p95']:,.0f}. {shortfall:.1%} of paths drop below 0.")
+            fig.autofmt_xdate()
+            canvas.draw_idle()
+
+        years_cb.bind("<<ComboboxSelected>>", run)
+        history_cb.bind("<<ComboboxSelected>>", run)
+        run()
+
+    def fill_trend_overlay_targets(self):
+        targets = ["Total"]
+        for region in ("GER", "BD"):
+            targets += [region] + [f"{region} > {cat}" for cat in sorted(self.dm.get_categories(region))]
+        self.trend_overlay_of["values"] = targets
+
+    def trend_options(self):
+        """(overlay, forecast) from the trend controls.
+
+        overlay is (stat, window, target) or None; target is None for the
+        Income/Expense totals, else a (region,) or (region, category) path.
+        """
+        choice = self.trend_overlay.get()
+        overlay = None
+        if choice and choice != "None":
+            window, stat = choice.split("-mo ")
+            target = self.trend_overlay_of.get()
+            overlay = (stat, int(window), tuple(target.split(" > ")) if target and target != "Total" else None)
+        return overlay, bool(self.trend_forecast.get())
+
+    @instrumented
     def plot_trend(self):
         year = self.ana_year.get()
-        # Use DataManager helper to get data
-        inc_df, exp_eur, _, exp_bd_eur, inv_df, ret_df = self.dm.get_summary_df()
-        
-        df = pd.DataFrame({"Income": inc_df.set_index("month")["amount"]})
-        df = df.join(exp_eur.set_index("month")["amount_eur"].rename("GER_Exp"))
-        df = df.join(exp_bd_eur.set_index("month")["amount_eur"].rename("BD_Exp"))
-        df = df.join(inv_df.set_index("month")["amount"].rename("Investment"))
-        df = df.join(ret_df.set_index("month")["amount"].rename("Return"))
-        
-        if year != "All":
-            df = df[df.index.year == int(year)]
-            
-        self.ax_top.clear()
-        if not df.empty:
-            df.plot(kind="bar", ax=self.ax_top)
-            self.ax_top.set_title(f"Income vs Expense ({year})")
-            self.ax_top.set_ylabel("Amount (EUR)")
-            self.ax_top.legend()
+        date_range = self.ana_range.get()
+        overlay, forecast = self.trend_options()
+        key = (self.dm.version, "trend", year, date_range, overlay, forecast)
+        if self.trend_cache.show(key, self.apply_trend_state):
+            return
+        self.trend_cache.render(key, self.compute_trend_state(year, date_range, overlay, forecast), self.apply_trend_state)
+
+    def compute_trend_state(self, year, date_range=None, overlay=None, forecast=False):
+        # Same monthly figures as the summary table
+        summary = self.dm.monthly_summary(Query(year=year, date_range=date_range))
+        df = summary.rename(columns={"GER Exp": "GER_Exp", "BD Exp EUR": "BD_Exp"})[["Income", "GER_Exp", "BD_Exp", "Investment", "Return"]]
+        n = len(df)
+
+        values = df.astype(float).fillna(0)
+        lines, ahead_labels = {}, []
+        if n and (overlay or forecast):
+            # Whole history, so windows reach back before the months shown
+            flow = self.dm.cash_flow()
+            if overlay and overlay[2] is None:
+                stat, window, _ = overlay
+                rolled = rolling_stats(flow[["Income", "Expense"]], (window,), (stat,))[(stat, window)].reindex(summary.index)
+                lines["Income avg"] = (list(range(n)), rolled["Income"].tolist())
+                lines["Expense avg"] = (list(range(n)), rolled["Expense"].tolist())
+            elif overlay:
+                # One region or category: its column(s) of the per-path monthly totals
+                stat, window, target = overlay
+                monthly = self.dm.monthly_paths("category")
+                picked = [c for c in monthly.columns if c[:len(target)] == target]
+                spend = monthly[picked].sum(axis=1) if picked else pd.Series(0.0, index=flow.index)
+                rolled = rolling_stats(spend.to_frame("Spend"), (window,), (stat,))[(stat, window)].reindex(summary.index)
+                lines["Spend avg"] = (list(range(n)), rolled["Spend"].tolist())
+            # Only continue the chart if it runs up to the latest month
+            if forecast and summary.index[-1] == flow.index[-1]:
+                ahead = seasonal_forecast(flow[["Income", "Expense", "Balance"]], horizon=6)
+                xs = list(range(n, n + len(ahead)))
+                for col in ahead.columns:
+                    lines[f"{col} forecast"] = (xs, ahead[col].tolist())
+                ahead_labels = [f"{m}*" for m in ahead.index]
+
+        ys = values.to_numpy().ravel().tolist() + [y for _, line in lines.values() for y in line if y == y]
+        income = float(summary["Income"].sum()) if n else 0.0
+        title = f"Income vs Expense ({year})" if not date_range else f"Income vs Expense ({year}, {date_range[0] or '...'} to {date_range[1] or '...'})"
+        if income > 0:
+            saved = income - float(summary["GER Exp"].sum() + summary["BD Exp EUR"].sum())
+            title += f" - savings rate {saved / income:.0%}"
+        if overlay:
+            title += f", {overlay[1]}-mo {overlay[0]}"
+            if overlay[2]:
+                title += f" of {' > '.join(overlay[2])}"
+        return {
+            "labels": [str(m) for m in df.index],
+            "ahead_labels": ahead_labels,
+            "heights": {name: values[name].tolist() if name in values else [0.0] * len(df) for name in self.trend_series},
+            "lines": lines,
+            "ylim": (min(0.0, min(ys) * 1.05), max(max(ys) * 1.05, 1.0)) if n else (0.0, 1.0),
+            "title": title,
+        }
+
+    def apply_trend_state(self, state):
+        # Grouped bars laid out like DataFrame.plot(kind="bar"): 0.5 wide per month
+        ax = self.ax_top
+        n = len(state["labels"])
+        width = 0.5 / len(self.trend_series)
+        for i, name in enumerate(self.trend_series):
+            xs = [j - 0.25 + (i + 0.5) * width for j in range(n)]
+            sync_bar_pool(ax, self.trend_bars[name], xs, state["heights"][name], width, self.trend_colors[name])
+
+        lines = state.get("lines", {})
+        for name, line in self.trend_lines.items():
+            if name in lines:
+                line.set_data(*lines[name])
+            line.set_visible(name in lines and n > 0)
+        # The legend lists only the lines that are shown
+        handles = self.trend_handles + [line for name, line in self.trend_lines.items() if name in lines]
+        if len(handles) != len(self.trend_legend.legend_handles):
+            self.trend_legend.remove()
+            self.trend_legend = ax.legend(handles=handles, fontsize="small")
+
+        if n:
+            labels = state["labels"] + state.get("ahead_labels", [])
+            ax.set_xlim(-0.5, len(labels) - 0.5)
+            ax.set_xticks(range(len(labels)))
+            ax.set_xticklabels(labels, rotation=90)
+            ax.set_ylim(*state["ylim"])
+            ax.set_title(state["title"])
+            ax.set_ylabel("Amount (EUR)")
+            self.trend_legend.set_visible(True)
+            self.trend_nodata.set_visible(False)
         else:
-            self.ax_top.text(0.5, 0.5, "No Data", ha="center")
-        
-        self.canvas_top.draw()
+            ax.set_xticks([])
+            ax.set_title("")
+            self.trend_legend.set_visible(False)
+            self.trend_nodata.set_visible(True)
+
+    def prerender_analysis_charts(self, jobs=None, version=None):
+        """Render the current year's Analysis charts into their caches on idle.
+
+        One chart per idle tick so the UI stays responsive. Only runs while the
+        Analysis tab is hidden (the offscreen render reuses its artists) and
+        stops as soon as the data changes.
+        """
+        if jobs is None:
+            year = str(datetime.now().year)
+            jobs = [("trend", year)] + [("pie", year, ptype) for ptype in ["GER", "BD", "All", "Investment"]]
+            version = self.dm.version
+        if not jobs or version != self.dm.version or not self.is_tab_built(self.tab3):
+            return
+        if self.selected_tab() is self.tab3:
+            return
+
+        job = jobs[0]
+        if job[0] == "trend":
+            options = self.trend_options()
+            key = (version, "trend", job[1], None, *options)
+            if not self.trend_cache.has(key):
+                self.trend_cache.render(key, self.compute_trend_state(job[1], None, *options), self.apply_trend_state, offscreen=True)
+        else:
+            _, year, ptype = job
+            key = self.pie_key(year, ptype, "category", None, None)
+            if not self.pie_cache.has(key):
+                state, _ = self.compute_pie_state(year, ptype, "category", None, None)
+                self.pie_cache.render(key, state, self.apply_pie_state, offscreen=True)
+
+        self.root.after(50, lambda: self.root.after_idle(self.prerender_analysis_charts, jobs[1:], version))
 
     # ==========================================
     # TAB 4: DAILY TRANS
     # ==========================================
     def setup_tab4(self):
+        self.dt_anomaly_job = None
+        
         # --- Global Filters (Top of Tab 4) ---
         filter_frame = ttk.LabelFrame(self.tab4, text="Global Filters")
         filter_frame.pack(fill="x", padx=10, pady=5)
@@ -1870,7 +5289,7 @@ class FinanceApp:
         ttk.Label(t2_ctrl, text="Select Category:").pack(side="left")
         self.dt_t2_cat = ttk.Combobox(t2_ctrl, state="readonly", width=15)
         self.dt_t2_cat.pack(side="left", padx=5)
-        self.dt_t2_cat.bind("<<ComboboxSelected>>", lambda e: self.refresh_dt_tables(2))
+        self.dt_t2_cat.bind("<<ComboboxSelected>>", lambda e: self.refresh_dt_tables(1))
         
         self.dt_tree2_container = ttk.Frame(self.dt_tab2)
         self.dt_tree2_container.pack(fill="both", expand=True)
@@ -1889,7 +5308,7 @@ class FinanceApp:
         ttk.Label(t3_ctrl, text="Subcategory:").pack(side="left", padx=(10, 0))
         self.dt_t3_sub = ttk.Combobox(t3_ctrl, state="readonly", width=12)
         self.dt_t3_sub.pack(side="left", padx=5)
-        self.dt_t3_sub.bind("<<ComboboxSelected>>", lambda e: self.refresh_dt_tables(3))
+        self.dt_t3_sub.bind("<<ComboboxSelected>>", lambda e: self.refresh_dt_tables(2))
 
         self.dt_tree3_container = ttk.Frame(self.dt_tab3)
         self.dt_tree3_container.pack(fill="both", expand=True)
@@ -1901,63 +5320,145 @@ class FinanceApp:
         bot_frame = ttk.LabelFrame(self.tab4, text="Monthly Trend Analysis")
         bot_frame.pack(fill="both", expand=True, padx=10, pady=5)
         
-        self.fig_dt = plt.Figure(figsize=(5, 3), dpi=100)
+        self.fig_dt = mpl_figure.Figure(figsize=(5, 3), dpi=100)
         self.ax_dt = self.fig_dt.add_subplot(111)
-        self.canvas_dt = FigureCanvasTkAgg(self.fig_dt, bot_frame)
-        self.canvas_dt.get_tk_widget().pack(fill="both", expand=True)
+        self.canvas_dt = mpl_backend_tkagg.FigureCanvasTkAgg(self.fig_dt, bot_frame)
+        self.canvas_dt.get_tk_widget().pack(side="left", fill="both", expand=True)
+        self.init_daily_chart()
+
+        # Year at a glance next to the month's line chart
+        heat_frame = ttk.Frame(bot_frame)
+        heat_frame.pack(side="left", fill="both", expand=True)
+        heat_ctrl = ttk.Frame(heat_frame)
+        heat_ctrl.pack(fill="x")
+        ttk.Label(heat_ctrl, text="Year heatmap:").pack(side="left", padx=5)
+        self.dt_heat_cat = ttk.Combobox(heat_ctrl, values=["All categories"], state="readonly", width=18)
+        self.dt_heat_cat.current(0)
+        self.dt_heat_cat.pack(side="left", padx=5)
+        self.dt_heat_cat.bind("<<ComboboxSelected>>", lambda e: self.plot_year_heatmap())
+        self.fig_heat = mpl_figure.Figure(figsize=(5, 3), dpi=100)
+        self.ax_heat = self.fig_heat.add_subplot(111)
+        self.canvas_heat = mpl_backend_tkagg.FigureCanvasTkAgg(self.fig_heat, heat_frame)
+        self.canvas_heat.get_tk_widget().pack(fill="both", expand=True)
+        self.init_year_heatmap()
+
+    def init_daily_chart(self):
+        # Static parts (axes labels, grid, x range) are drawn once; the line,
+        # weekend markers and title are animated so month switches can blit.
+        ax = self.ax_dt
+        all_days = list(range(1, 32))
+        self.dt_line, = ax.plot(all_days, [0] * 31, color='teal', marker='o', linewidth=2)
+        self.dt_weekends = mpl_collections.LineCollection([], colors='red', linestyles='--', alpha=0.5, linewidths=1,
+                                          transform=ax.get_xaxis_transform())
+        ax.add_collection(self.dt_weekends, autolim=False)
+        self.dt_nodata = ax.text(0.5, 0.5, "No Data", ha="center", transform=ax.transAxes, visible=False)
+
+        ax.set_xlim(0.5, 31.5)
+        ax.set_ylim(0, 1)
+        ax.set_xticks(all_days[::2]) # Show every other day label if crowded, or all_days
+        ax.set_xlabel("Day of Month")
+        ax.set_ylabel("Amount (EUR)")
+        ax.grid(True, linestyle='-', alpha=0.3)
+        ax.set_title("Total Expense Trend") # placeholder so tight_layout reserves room for the title
+        self.fig_dt.tight_layout()
+
+        self.dt_blitter = ChartBlitter(self.canvas_dt, [self.dt_line, self.dt_weekends, self.dt_nodata, ax.title])
+
+    def init_year_heatmap(self):
+        # One image artist for the whole year; switching year/category only swaps its data
+        ax = self.ax_heat
+        # Days outside the year are NaN, which imshow leaves blank
+        self.dt_heat = ax.imshow(np.full((7, 54), np.nan), aspect="auto", cmap="YlOrRd", interpolation="nearest", vmin=0, vmax=1)
+        self.fig_heat.colorbar(self.dt_heat, ax=ax, label="EUR")
+        ax.set_yticks(range(7))
+        ax.set_yticklabels([calendar.day_abbr[d] for d in range(7)], fontsize="small")
+        ax.set_title("Daily Spend")
+        self.fig_heat.tight_layout()
+        self.dt_heat_key = None
+        self.canvas_heat.mpl_connect("button_press_event", self.on_heatmap_click)
+
+    def plot_year_heatmap(self):
+        try:
+            year = int(self.dt_year.get())
+        except ValueError:
+            return
+        region = self.dt_region.get()
+        matrix = self.dm.year_matrix(region, year)
+        self.dt_heat_cat["values"] = ["All categories"] + matrix.columns
+        category = self.dt_heat_cat.get()
+        if category not in matrix.columns:
+            category = "All categories"
+            self.dt_heat_cat.set(category)
+        key = (self.dm.version, region, year, category)
+        if key == self.dt_heat_key:
+            return
+        self.dt_heat_key = key
+
+        daily = matrix.values.sum(axis=1) if category == "All categories" else matrix.values[:, matrix.columns.index(category)]
+        grid = calendar_grid(year, daily)
+        ax = self.ax_heat
+        self.dt_heat.set_data(grid)
+        self.dt_heat.set_extent((-0.5, grid.shape[1] - 0.5, 6.5, -0.5))
+        self.dt_heat.set_clim(0, max(float(np.nanmax(grid)), 1.0))
+        ax.set_xlim(-0.5, grid.shape[1] - 0.5)
+        # Month names at the week each month starts in
+        offset = calendar.weekday(year, 1, 1)
+        starts = [(datetime(year, m, 1).timetuple().tm_yday - 1 + offset) // 7 for m in range(1, 13)]
+        ax.set_xticks(starts)
+        ax.set_xticklabels([calendar.month_abbr[m] for m in range(1, 13)], fontsize="small")
+        name = "" if category == "All categories" else f" - {category}"
+        ax.set_title(f"Daily Spend {year}{name} ({daily.sum():.0f} EUR)")
+        self.canvas_heat.draw_idle()
+
+    def on_heatmap_click(self, event):
+        # Clicking a day shows its month above
+        if event.inaxes is not self.ax_heat or event.xdata is None:
+            return
+        try:
+            year = int(self.dt_year.get())
+        except ValueError:
+            return
+        day = int(round(event.xdata)) * 7 + int(round(event.ydata)) - calendar.weekday(year, 1, 1)
+        if 0 <= day < (366 if calendar.isleap(year) else 365):
+            month = (datetime(year, 1, 1) + timedelta(days=day)).month
+            if month != self.dt_month.current() + 1:
+                self.dt_month.current(month - 1)
+                self.update_daily_trans_view()
 
     # --- Logic Helpers for Daily Trans ---
 
 
 
-    def on_dt_t3_cat_change(self, event):
+    def on_dt_t3_cat_change(self, event, refresh=True):
         # Update subcategory dropdown when category changes in Tab 3
         cat = self.dt_t3_cat.get()
         if not cat: return
         
         # Get available subcategories based on current data context (region/year/month)
-        # We use a helper to get filtered DF
-        df = self.get_filtered_daily_df()
-        if not df.empty:
-            subs = df[df['category'] == cat]['subcategory'].unique().tolist()
-            self.dt_t3_sub['values'] = subs
-            if subs: self.dt_t3_sub.current(0)
-            else: self.dt_t3_sub.set('')
-        
-        self.refresh_dt_tables(3)
-
-    def get_filtered_daily_df(self):
-        """Helper to get DF based on Global Filters (Region, Year, Month)"""
-        df = pd.DataFrame(self.dm.data["expenses"])
-        if df.empty: return df
+        subs = self.dm.distinct_values(region=self.dt_region.get(), year=self.dt_year.get(),
+                                       month=self.dt_month.current() + 1, category=cat)
+        self.dt_t3_sub['values'] = subs
+        if subs: self.dt_t3_sub.current(0)
+        else: self.dt_t3_sub.set('')
+        
+        if refresh:
+            self.refresh_dt_tables(2)
 
-        df['date'] = pd.to_datetime(df['date'])
-        df['year'] = df['date'].dt.year
-        df['month'] = df['date'].dt.month
-        df['day'] = df['date'].dt.day
-
-        region = self.dt_region.get()
-        year = int(self.dt_year.get())
-        month = self.dt_month.current() + 1 # Combobox is 0-indexed
-
-        if region != "All":
-            df = df[df['region'] == region]
-        
-        df = df[df['year'] == year]
-        df = df[df['month'] == month]
-
-        return df
+    def get_daily_view(self):
+        """MonthView for the Global Filters (Region, Year, Month), cached in DataManager"""
+        year, month = self.dt_year_month()
+        return self.dm.month_view(self.dt_region.get(), year, month)
     #----
         # --- Updated Logic Helpers for Daily Trans ---
     
+    @instrumented
     def update_daily_trans_view(self, event=None):
-        # 1. Get Filtered Data based on Global Filters
-        df = self.get_filtered_daily_df()
+        # 1. Get Filtered Data based on Global Filters (computed once, shared below)
+        view = self.get_daily_view()
         
         # 2. Update Dropdown options (Categories) for Tab 2 & 3
-        cats = []
-        if not df.empty:
-            cats = sorted(df['category'].unique().tolist())
+        cats = sorted(self.dm.distinct_values(region=self.dt_region.get(), year=self.dt_year.get(),
+                                              month=self.dt_month.current() + 1))
         
         # Preserve current selections if they are still valid
         old_t2 = self.dt_t2_cat.get()
@@ -1978,22 +5479,22 @@ class FinanceApp:
             self.dt_t3_cat.set('')
     
         # 3. Trigger subcategory update for Tab 3
-        self.on_dt_t3_cat_change(None)
+        self.on_dt_t3_cat_change(None, refresh=False)
     
         # 4. Refresh visible table
         idx = self.daily_nb.index(self.daily_nb.select())
         self.refresh_dt_tables(idx)
     
         # 5. Plot Bottom Graph
-        self.plot_daily_total(df)
+        self.plot_daily_total(view)
+        self.plot_year_heatmap()
     
     def refresh_dt_tables(self, tab_index):
-        # 1. Get the Year and Month from the global filters
-        selected_year = self.dt_year.get()
-        selected_month = self.dt_month.get()
-    
-        # 2. Get the filtered data
-        df = self.get_filtered_daily_df()
+        # Filtered month frame and its pivots are shared across sub-tabs
+        view = self.get_daily_view()
+        df = view.df
+        if not view.flagged:
+            self.schedule_dt_anomalies()
         
         # Helper to clear container
         def clear_container(container):
@@ -2004,9 +5505,7 @@ class FinanceApp:
         if tab_index == 0:
             clear_container(self.dt_tree1_container)
             if not df.empty:
-                pivot = df.pivot_table(index='day', columns='category', values='amount_eur', aggfunc='sum', fill_value=0)
-                # PASS YEAR AND MONTH HERE
-                self.make_daily_table(self.dt_tree1_container, pivot, "Category Breakdown", selected_year, selected_month)
+                self.make_daily_table(self.dt_tree1_container, view.matrix('category'), "Category Breakdown")
             else:
                 ttk.Label(self.dt_tree1_container, text="No data for selected filters").pack(pady=20)
     
@@ -2015,11 +5514,9 @@ class FinanceApp:
             clear_container(self.dt_tree2_container)
             cat = self.dt_t2_cat.get()
             if cat and not df.empty:
-                sub_df = df[df['category'] == cat]
-                if not sub_df.empty:
-                    pivot = sub_df.pivot_table(index='day', columns='subcategory', values='amount_eur', aggfunc='sum', fill_value=0)
-                    # PASS YEAR AND MONTH HERE
-                    self.make_daily_table(self.dt_tree2_container, pivot, f"Subcategory ({cat})", selected_year, selected_month)
+                matrix = view.matrix('subcategory', cat)
+                if matrix.columns:
+                    self.make_daily_table(self.dt_tree2_container, matrix, f"Subcategory ({cat})")
                 else:
                     ttk.Label(self.dt_tree2_container, text="No data for this category").pack(pady=20)
             else:
@@ -2031,15 +5528,34 @@ class FinanceApp:
             cat = self.dt_t3_cat.get()
             sub = self.dt_t3_sub.get()
             if cat and sub and not df.empty:
-                sub_df = df[(df['category'] == cat) & (df['subcategory'] == sub)]
-                if not sub_df.empty:
-                    pivot = sub_df.pivot_table(index='day', columns='subsubcategory', values='amount_eur', aggfunc='sum', fill_value=0)
-                    # PASS YEAR AND MONTH HERE
-                    self.make_daily_table(self.dt_tree3_container, pivot, f"Detail ({cat} > {sub})", selected_year, selected_month)
+                matrix = view.matrix('subsubcategory', cat, sub)
+                if matrix.columns:
+                    self.make_daily_table(self.dt_tree3_container, matrix, f"Detail ({cat} > {sub})")
                 else:
                     ttk.Label(self.dt_tree3_container, text="No data for this subcategory").pack(pady=20)
             else:
                 ttk.Label(self.dt_tree3_container, text="Select Category and Subcategory").pack(pady=20)
+
+    def schedule_dt_anomalies(self):
+        # Score the full history once the table is on screen, then mark it
+        if self.dt_anomaly_job is None and not self.dm.loading:
+            self.dt_anomaly_job = self.root.after_idle(self.flag_dt_anomalies)
+
+    def flag_dt_anomalies(self):
+        self.dt_anomaly_job = None
+        if self.dm.loading:
+            return
+        self.dm.anomalies()
+        if self.selected_tab() is self.tab4:
+            self.refresh_dt_tables(self.daily_nb.index(self.daily_nb.select()))
+
+    def dt_year_month(self):
+        """(year, month) ints from the Daily Trans global filters"""
+        try:
+            return int(self.dt_year.get()), self.dt_month.current() + 1
+        except ValueError:
+            now = datetime.now()
+            return now.year, now.month
     
     # REPLACE THIS METHOD (Ensure it passes the correct index)
     def on_dt_subtab_change(self, event):
@@ -2052,28 +5568,14 @@ class FinanceApp:
              pass
         # Special handling for Tab 3
         elif idx == 2:
-            self.on_dt_t3_cat_change(None)
+            self.on_dt_t3_cat_change(None, refresh=False)
     
         self.refresh_dt_tables(idx)
     
     
     
-    def make_daily_table(self, parent, pivot_df, title, year, month):
-        # --- FIX: Type Conversion ---
-        # Year comes as a string "2024" from combobox, convert to int
-        try:
-            year_int = int(year)
-        except ValueError:
-            year_int = 2024 # Default fallback
-    
-        # Month comes as a string "January", convert to integer 1-12
-        month_map = {
-            "January": 1, "February": 2, "March": 3, "April": 4, "May": 5, "June": 6,
-            "July": 7, "August": 8, "September": 9, "October": 10, "November": 11, "December": 12
-        }
-        month_int = month_map.get(month, 1) # Default to 1 if not found
-        # ------------------------------
-    
+    @instrumented
+    def make_daily_table(self, parent, matrix, title):
         # Clear existing tree
         for widget in parent.winfo_children(): widget.destroy()
     
@@ -2094,8 +5596,7 @@ class FinanceApp:
         scrollbar_h.pack(side="bottom", fill="x")
     
         # Treeview
-        cols = list(pivot_df.columns)
-        tree_cols = ["Day"] + list(cols) + ["Total"]
+        tree_cols = ["Day"] + matrix.columns + ["Total"]
         tree = ttk.Treeview(scrollable_frame, columns=tree_cols, show="headings")
     
         for col in tree_cols:
@@ -2107,96 +5608,287 @@ class FinanceApp:
         # --- NEW: Configure Tags ---
         # Saturday will be red text
         tree.tag_configure("saturday", foreground="red")
+        # Days with an unusual amount (the cells themselves end in ANOMALY_MARK)
+        tree.tag_configure("anomaly", background="#ffe5b4")
         # Total row config
         tree.tag_configure("total", background="#ccc", font=("Arial", 10, "bold"))
     
-        # Days 1 to 31
-        all_days = range(1, 32)
-        pivot_df = pivot_df.reindex(all_days, fill_value=0)
-    
-        totals = {c: 0.0 for c in cols}
-        grand_total = 0.0
+        # Rows come pre-formatted ("10.Sat", cells..., total) for the real days of the month
+        for row_vals, is_saturday, is_unusual in zip(matrix.rows, matrix.meta.saturday, matrix.row_flags):
+            tags = ("saturday",) if is_saturday else ()
+            tree.insert("", "end", values=row_vals, tags=tags + ("anomaly",) if is_unusual else tags)
     
-        for day in all_days:
-            if day not in pivot_df.index: continue
-            
-            row_vals = []
-            row_sum = 0.0
-            
-            for c in cols:
-                val = pivot_df.loc[day, c]
-                row_vals.append(f"{val:.2f}")
-                row_sum += val
-                totals[c] += val
-            
-            row_vals.append(f"{row_sum:.2f}")
-            grand_total += row_sum
-            
-            d = datetime(year_int, month_int, day)
-            
-            # --- NEW: Check if Saturday (weekday() 5 is Saturday) ---
-            row_tags = ()
-            if d.weekday() == 5:
-                row_tags = ("saturday",)
-            # -------------------------------------------------------
+        # Total Row
+        tree.insert("", "end", values=matrix.total_row, tags=("total",))
+        
+    def plot_daily_total(self, view):
+        year, month = view.year, view.month
+        ax = self.ax_dt
+
+        # Daily totals are the row totals of the same calendar matrix the tables use
+        matrix = view.matrix('category')
+        daily_totals = matrix.row_totals
+
+        has_data = not view.df.empty
+        self.dt_line.set_data(matrix.meta.days, daily_totals)
+        self.dt_line.set_visible(has_data)
+        self.dt_weekends.set_segments(weekend_segments(year, month) if has_data else [])
+        self.dt_nodata.set_visible(not has_data)
+        ax.set_title(f"Total Expense Trend: {self.dt_month.get()} {self.dt_year.get()}" if has_data else "")
+
+        # Snap the y-axis to a 1-2-5 step: months with a similar peak keep the
+        # same background and are blitted, otherwise schedule a full redraw.
+        top = nice_ceiling(daily_totals.max() * 1.05)
+        limits_changed = ax.get_ylim() != (0, top)
+        if limits_changed:
+            ax.set_ylim(0, top)
+        self.dt_blitter.update(full=limits_changed)
+    #----
+   
+
+# ==========================================
+# Command Line
+# ==========================================
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise ValueError(text)
+    return value
+
+
+def cli_parser():
+    import argparse
+    parser = argparse.ArgumentParser(prog="FinMan", description="Run without arguments to open the app.")
+    parser.add_argument("--data-dir", default=".", help="folder with the finance_data_YEAR files (default: current)")
+    parser.add_argument("--timings", metavar="FILE", help="record operation timings and save them to FILE as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
     
-            # --- CHANGE HERE: Format as "10.Sat" ---
-            day_str = d.strftime("%d.%a")
-            # -------------------------------------
+    inbox = commands.add_parser("inbox", help="watch a folder and ingest dropped export files")
+    inbox.add_argument("folder")
+    inbox.add_argument("--interval", type=float, default=5.0, help="seconds between scans")
+    inbox.add_argument("--once", action="store_true", help="scan once and exit")
     
-            tree.insert("", "end", values=(day_str, *row_vals), tags=row_tags)
+    memory = commands.add_parser("memory", help="show what the loaded ledger, caches and indexes hold in memory")
+    memory.add_argument("--warm", action="store_true", help="build the views' cached frames first, as the app would")
+    memory.add_argument("--top", type=int, default=10, help="allocation sites to list")
+    memory.add_argument("--format", default="text", choices=["text", "json"])
     
-        # Total Row
-        total_vals = [f"{totals[c]:.2f}" for c in cols]
-        total_vals.append(f"{grand_total:.2f}")
-        tree.insert("", "end", values=("TOTAL", *total_vals), tags=("total",))
-        
-    def plot_daily_total(self, df):
-        self.ax_dt.clear()
-        
-        try:
-            year = int(self.dt_year.get())
-            month = self.dt_month.current() + 1
-        except:
-            year = datetime.now().year
-            month = datetime.now().month
+    report = commands.add_parser("report", help="print the app's tables as CSV or JSON (no GUI needed)")
+    report.add_argument("table", choices=["summary", "expenses", "investments", "kh", "daily", "budget", "cashflow", "rolling", "forecast", "anomalies", "distribution", "performance", "projection"])
+    report.add_argument("--year", default="All")
+    report.add_argument("--month", type=int, help="month for the daily and budget tables (default: current)")
+    report.add_argument("--region", default="All", choices=["All", "GER", "BD"])
+    report.add_argument("--level", default="category", choices=["category", "subcategory", "subsubcategory"])
+    report.add_argument("--category", help="only this category (subcategory/subsubcategory levels)")
+    report.add_argument("--subcategory", help="only this subcategory (subsubcategory level)")
+    report.add_argument("--type", default="All", choices=["All", "Investment", "Return"], help="investment type")
+    report.add_argument("--period", choices=list(DATE_PRESETS), default="all", help="quick date range (tax years run Apr-Mar)")
+    report.add_argument("--from", dest="date_from", help="first date (YYYY-MM-DD), inclusive")
+    report.add_argument("--to", dest="date_to", help="last date (YYYY-MM-DD), inclusive")
+    report.add_argument("--window", type=int, default=3, choices=ROLLING_WINDOWS, help="months per rolling window")
+    report.add_argument("--stat", default="mean", choices=["mean", "median"], help="rolling statistic")
+    report.add_argument("--horizon", type=positive_int, default=6, help="months to forecast")
+    report.add_argument("--by", default="category", choices=["category", "holding"], help="investment performance per category or holding")
+    report.add_argument("--months", type=positive_int, default=120, help="months to project")
+    report.add_argument("--paths", type=positive_int, default=10_000, help="simulated paths for the projection")
+    report.add_argument("--lookback", type=positive_int, help="resample only the last N months (default: all history)")
+    report.add_argument("--measure", default="size", choices=["size", "daily"], help="distribution of expense sizes or of daily spend")
+    report.add_argument("--totals", action="store_true", help="append TOTAL (and AVERAGE) rows")
+    report.add_argument("--format", default="csv", choices=["csv", "json"])
+    report.add_argument("--output", "-o", help="file to write (default: stdout)")
+    return parser
+
+
+def with_month_column(table):
+    """Month period index -> leading "Month" column ("2025-03")"""
+    table = table.copy()
+    table.index = table.index.astype(str)
+    return table.rename_axis("Month").reset_index()
+
+
+def report_table(dm, args):
+    """DataFrame for `FinMan.py report`, computed by the same DataManager code as the views"""
+    date_range = (args.date_from, args.date_to) if args.date_from or args.date_to else preset_date_range(args.period)
+    query = Query(year=args.year, date_range=date_range)
+    if args.table == "summary":
+        table = with_month_column(dm.monthly_summary(query))
+        if args.totals and len(table):
+            totals = table[dm.SUMMARY_COLUMNS].sum()
+            table.loc[len(table)] = ["TOTAL", *totals]
+            table.loc[len(table)] = ["AVERAGE", *(totals / (len(table) - 1))]
+        return table
     
-        if df.empty:
-            self.ax_dt.text(0.5, 0.5, "No Data", ha="center")
-        else:
-            # Group by day
-            daily_totals = df.groupby('day')['amount_eur'].sum()
-            
-            # Reindex for 1-31 to fill gaps with 0
-            all_days = range(1, 32)
-            daily_totals = daily_totals.reindex(all_days, fill_value=0)
-            
-            # PLOT CHANGES:
-            # 1. kind='line' instead of 'bar'
-            # 2. Added marker='o'
-            daily_totals.plot(kind='line', ax=self.ax_dt, color='teal', marker='o', linewidth=2)
-            
-            # Mark weekends with vertical lines
-            for day in range(1, 32):
-                try:
-                    d = datetime(year, month, day)
-                    if d.weekday() >= 5: # Sat or Sun
-                        self.ax_dt.axvline(x=day, color='red', linestyle='--', alpha=0.5, linewidth=1)
-                except ValueError:
-                    pass
+    if args.table == "expenses":
+        subcategory = args.subcategory if args.category is not None else None
+        df = dm.db_expenses(query._replace(region=args.region, category=args.category, subcategory=subcategory))
+        table = dm.expense_pivot(df, args.level, args.region) if not df.empty else pd.DataFrame()
+        table = table[sorted(table.columns)]
+    elif args.table == "investments":
+        table = dm.investment_pivot(query._replace(inv_type=args.type))
+    elif args.table == "budget":
+        today = datetime.now()
+        year = today.year if args.year == "All" else int(args.year)
+        return dm.budget_table(args.region, year, args.month or today.month)
+    elif args.table == "cashflow":
+        return with_month_column(dm.cash_flow(query))
+    elif args.table == "rolling":
+        # Rolling stat per category path; paths flattened to "GER > Food"
+        monthly = dm.monthly_paths(args.level, query._replace(region=args.region))
+        table = rolling_stats(monthly, (args.window,), (args.stat,))[(args.stat, args.window)]
+        table.columns = [" > ".join(p for p in col if p) for col in table.columns]
+        return with_month_column(table.round(2))
+    elif args.table == "forecast":
+        flow = dm.cash_flow(query)[["Income", "Expense", "Balance"]]
+        return with_month_column(seasonal_forecast(flow, horizon=args.horizon).round(2))
+    elif args.table == "projection":
+        result = dm.balance_projection(args.months, args.paths, args.lookback)
+        if result is None:
+            return pd.DataFrame(columns=["Month", *(f"p{p}" for p in PROJECTION_PERCENTILES)])
+        return with_month_column(result[0].round(2))
+    elif args.table == "performance":
+        table = dm.investment_performance(args.by)
+        for col in ("First", "Breakeven"):
+            table[col] = table[col].dt.strftime("%Y-%m-%d")
+        return table.round({"Invested": 2, "Returned": 2, "Net": 2, "Cash on Cash": 3, "XIRR": 4, "Months to Breakeven": 1})
+    elif args.table == "distribution":
+        # Sketches are monthly, so the range is whole years (--year or --from/--to)
+        first = last = None if args.year == "All" else int(args.year)
+        if date_range:
+            first = int(date_range[0][:4]) if date_range[0] else first
+            last = int(date_range[1][:4]) if date_range[1] else last
+        path = [args.category or ""] + ([args.subcategory] if args.category and args.subcategory else [])
+        return dm.distribution_table(args.region, path, (first, last), args.measure).round(2)
+    elif args.table == "anomalies":
+        return anomaly_table(dm, query._replace(region=args.region))
+    elif args.table == "kh":
+        return pd.DataFrame(dm.get_kh_details(), columns=["Date", "Name/Org", "Address", "Amount (Given)", "Return", "To Be Return"])
+    else:
+        today = datetime.now()
+        year = today.year if args.year == "All" else int(args.year)
+        matrix = dm.month_view(args.region, year, args.month or today.month).matrix(args.level, args.category, args.subcategory)
+        table = pd.DataFrame(matrix.values, index=pd.Index(matrix.meta.labels, name="Day"), columns=matrix.columns)
+        table["Total"] = matrix.row_totals
+        table = table.reset_index()
+        if args.totals:
+            table.loc[len(table)] = ["TOTAL", *matrix.col_totals, matrix.row_totals.sum()]
+        return table
     
-            self.ax_dt.set_title(f"Total Expense Trend: {self.dt_month.get()} {self.dt_year.get()}")
-            self.ax_dt.set_xlabel("Day of Month")
-            self.ax_dt.set_ylabel("Amount (EUR)")
-            self.ax_dt.grid(True, linestyle='-', alpha=0.3)
-            self.ax_dt.set_xticks(all_days[::2]) # Show every other day label if crowded, or all_days
-            
-        self.fig_dt.tight_layout()
-        self.canvas_dt.draw()
-    #----
-   
+    # Month x column pivots (Database tab)
+    table["Total"] = table.sum(axis=1)
+    table = with_month_column(table)
+    if args.totals and len(table):
+        table.loc[len(table)] = ["TOTAL", *table.iloc[:, 1:].sum()]
+    return table
 
-if __name__ == "__main__":
+
+def anomaly_table(dm, query):
+    """Flagged days and expenses matching query, newest first"""
+    found = dm.anomalies()
+    columns = ["Date", "Kind", "Region", "Item", "Amount", "Typical", "Z"]
+    df = dm.query("expenses", query)
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+    z = found.entry_z.reindex(df.index)
+    hits = df[z > ANOMALY_Z]
+    entries = pd.DataFrame({
+        "Date": hits["date"], "Kind": "expense", "Region": hits["region"],
+        "Item": hits[["category", "subcategory", "subsubcategory"]].fillna("").agg(" > ".join, axis=1),
+        "Amount": hits["amount_eur"], "Typical": found.entry_typical.reindex(hits.index), "Z": z[hits.index],
+    })
+    region = query.region if query.region in ("GER", "BD") else "All"
+    days = found.day_z.get(region, pd.Series(dtype=float))
+    day_hits = days[(days > ANOMALY_Z) & days.index.isin(df["date"])]
+    totals = pd.DataFrame({
+        "Date": day_hits.index, "Kind": "day", "Region": region,
+        "Item": day_hits.index.day_name(), "Amount": df.groupby("date")["amount_eur"].sum().reindex(day_hits.index).to_numpy(),
+        "Typical": found.day_typical[region].reindex(day_hits.index).to_numpy(), "Z": day_hits.to_numpy(),
+    })
+    table = pd.concat([entries, totals], ignore_index=True).sort_values(["Date", "Kind"], ascending=[False, True])
+    table["Date"] = table["Date"].dt.strftime("%Y-%m-%d")
+    return table.round({"Amount": 2, "Typical": 2, "Z": 1})[columns].reset_index(drop=True)
+
+
+def write_report(table, fmt, output=None):
+    if fmt == "json":
+        text = json.dumps(table.to_dict(orient="records"), indent=2, ensure_ascii=False, default=str)
+    else:
+        text = table.to_csv(index=False)
+    if output:
+        with open(output, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text if text.endswith("\n") else text + "\n")
+
+
+def print_memory_report(args):
+    # Trace from before the load so every allocation is attributed
+    tracemalloc.start()
+    dm = DataManager()
+    if args.warm:
+        dm.monthly_summary()
+        dm.db_expenses()
+        dm.investment_pivot()
+        dm.date_sorted("expenses")
+        dm.search("")
+    report = memory_report(dm.memory_usage(), args.top)
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+        return
+    group = None
+    for r in report["rows"]:
+        if r["group"] != group:
+            group = r["group"]
+            print(f"\n{group}")
+        print(f"  {r['component']:<40} {format_bytes(r['bytes']):>10}  {r['detail']}")
+    tm = report["tracemalloc"]
+    print(f"\nAccounted {format_bytes(report['accounted_bytes'])}, traced {format_bytes(tm['current_bytes'])} "
+          f"(peak {format_bytes(tm['peak_bytes'])})" + (f", peak RSS {format_bytes(report['peak_rss_bytes'])}" if report["peak_rss_bytes"] else ""))
+    print("\nTop allocations")
+    for s in tm["top"]:
+        print(f"  {format_bytes(s['bytes']):>10}  {s['blocks']:>8} blocks  {s['where']}")
+
+
+def run_cli(argv):
+    args = cli_parser().parse_args(argv)
+    if args.timings:
+        INSTRUMENTS.enabled = True
+        args.timings = os.path.abspath(args.timings)
+    try:
+        if args.command == "inbox":
+            folder = os.path.abspath(args.folder)
+            os.chdir(args.data_dir)
+            InboxWatcher(DataManager(), folder, settle=0 if args.once else 2.0).run(args.interval, args.once)
+        elif args.command == "report":
+            if args.output:
+                args.output = os.path.abspath(args.output)
+            os.chdir(args.data_dir)
+            write_report(report_table(DataManager(), args), args.format, args.output)
+        elif args.command == "memory":
+            os.chdir(args.data_dir)
+            print_memory_report(args)
+    finally:
+        # Also on Ctrl+C, which is how a watching inbox run ends
+        if args.timings:
+            INSTRUMENTS.dump(args.timings)
+    return 0
+
+
+def main():
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+    if os.environ.get("FINMAN_TRACEMALLOC"):
+        tracemalloc.start()
+    STARTUP.mark("imports")
+    # Start importing pandas/matplotlib while Tk builds the window
+    threading.Thread(target=preload_heavy_modules, daemon=True).start()
     root = tk.Tk()
     app = FinanceApp(root)
     root.mainloop()
+    INSTRUMENTS.write_exit_dump()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Benchmarks for FinMan's DataManager and the data side of the views.
+
+Generates synthetic ledgers (GER + BD expenses over 12 years, three-level
+category trees, income, investments/returns and Karje hasana loans) in a
+temp folder and times the file I/O plus the pandas work behind the Input,
+Database, Analysis and Daily Trans tabs. No display needed: the view
+timings call the same DataManager methods / compute_* helpers the GUI uses
+and skip the widgets.
+
+    python benchmarks/bench_finman.py                      # 1k + 100k, compare to baseline.json
+    python benchmarks/bench_finman.py --scales 1k,100k,1m  # include the 1M-expense ledger
+    python benchmarks/bench_finman.py --output results.json --update-baseline
+
+Results are JSON (median/best seconds per operation and scale). Operations
+slower than the baseline by more than --threshold are listed and the exit
+code is 1.
+"""
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import FinMan
+from FinMan import DataManager, FinanceApp, Query, pd
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# name -> (expenses, default repeats)
+SCALES = {
+    "1k": (1_000, 5),
+    "100k": (100_000, 3),
+    "1m": (1_000_000, 1),
+}
+
+FIRST_YEAR = 2014
+YEARS = 12
+
+# Four subcategories with three leaves each under every category
+CATEGORIES = {
+    "GER": ["Food", "Transport", "Housing", "Health", "Shopping", "Leisure", "Insurance", "Education"],
+    "BD": ["Food", "Transport", "Family", "Health", "Housing", "Gifts", "Education", "Utilities"],
+}
+INVESTMENT_CATEGORIES = ["Stocks", "Gold", "Land", "Savings Bond", "Karje hasana"]
+KH_PEOPLE = [("Karim", "Dhaka"), ("Rahim", "Sylhet"), ("Fatema", "Chittagong"), ("Mosque Committee", "Comilla"),
+             ("Hasan", "Rajshahi"), ("Nusrat", "Khulna"), ("Selim", "Barisal"), ("Ayesha", "Rangpur")]
+
+
+# ==========================================
+# Synthetic ledgers
+# ==========================================
+
+def category_tree():
+    return {region: {cat: {f"{cat} {i}": {f"{cat} {i}.{j}": {} for j in range(1, 4)} for i in range(1, 5)}
+                     for cat in cats}
+            for region, cats in CATEGORIES.items()}
+
+
+def make_ledger(n_expenses, seed=0):
+    """finance_data-shaped dict with n_expenses expenses spread over YEARS years"""
+    rng = random.Random(seed)
+    tree = category_tree()
+    paths = {region: [(cat, sub, leaf) for cat, subs in cats.items() for sub, leaves in subs.items() for leaf in leaves]
+             for region, cats in tree.items()}
+    start = date(FIRST_YEAR, 1, 1)
+    days = (date(FIRST_YEAR + YEARS, 1, 1) - start).days
+
+    expenses = []
+    for i in range(n_expenses):
+        region = "GER" if rng.random() < 0.6 else "BD"
+        cat, sub, leaf = rng.choice(paths[region])
+        day = (start + timedelta(days=rng.randrange(days))).isoformat()
+        if region == "GER":
+            amount = round(rng.lognormvariate(3, 1), 2)
+            rate = 1.0
+            amount_eur = amount
+        else:
+            amount = float(rng.randrange(50, 20000))
+            rate = 140.0
+            amount_eur = amount / rate
+        expenses.append({"region": region, "category": cat, "subcategory": sub, "subsubcategory": leaf,
+                         "amount_local": amount, "rate": rate, "amount_eur": amount_eur, "date": day})
+
+    income = []
+    for y in range(FIRST_YEAR, FIRST_YEAR + YEARS):
+        for m in range(1, 13):
+            income.append({"source": "Salary", "amount": 3200.0, "date": f"{y}-{m:02d}-01", "type": "EUR"})
+            if rng.random() < 0.3:
+                income.append({"source": rng.choice(["Freelance", "Tax refund", "Bonus"]),
+                               "amount": round(rng.uniform(100, 2000), 2), "date": f"{y}-{m:02d}-15", "type": "EUR"})
+
+    investments = []
+    for _ in range(max(20, n_expenses // 200)):
+        cat = rng.choice(INVESTMENT_CATEGORIES)
+        name, address = rng.choice(KH_PEOPLE) if cat == "Karje hasana" else (None, None)
+        day = (start + timedelta(days=rng.randrange(days))).isoformat()
+        amount = round(rng.uniform(100, 5000), 2)
+        investments.append({"type": "Investment", "category": cat, "amount": amount, "date": day,
+                            "description": f"{cat} purchase", "name": name, "address": address})
+        if rng.random() < 0.6:
+            back = (date.fromisoformat(day) + timedelta(days=rng.randrange(30, 900))).isoformat()
+            investments.append({"type": "Return", "category": cat, "amount": round(amount * rng.uniform(0.2, 1.3), 2),
+                                "date": min(back, f"{FIRST_YEAR + YEARS - 1}-12-31"),
+                                "description": f"{cat} return", "name": name, "address": address})
+
+    return {"initial_balance_eur": 5000.0, "current_balance_eur": 0.0, "current_balance_bd": 0.0,
+            "categories": tree, "income": income, "expenses": expenses,
+            "investments": investments, "conversion_rates": {}}
+
+
+# ==========================================
+# Timing
+# ==========================================
+
+@contextlib.contextmanager
+def working_dir(path):
+    """DataManager reads and writes the current directory"""
+    old = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+def time_op(fn, repeat, setup=None):
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"median": statistics.median(runs), "best": min(runs), "runs": repeat}
+
+
+def headless_app(dm):
+    """Just enough of FinanceApp for its compute_* helpers (they only read dm)"""
+    return types.SimpleNamespace(dm=dm, pie_state=functools.partial(FinanceApp.pie_state, None),
+                                 trend_series=["Income", "GER_Exp", "BD_Exp", "Investment", "Return"])
+
+
+def db_tables(dm, year, region):
+    """Data side of generate_db_tables/generate_pivot_table"""
+    df = dm.db_expenses(Query(year=year, region=region))
+    dm.expense_pivot(df, "category", region)
+    cats = dm.distinct_values(region=region, year=year)
+    if cats:
+        dm.expense_pivot(FinMan.apply_query(df, Query(category=cats[0])), "subcategory", region)
+        subs = dm.distinct_values(region=region, year=year, category=cats[0])
+        if subs:
+            dm.expense_pivot(FinMan.apply_query(df, Query(category=cats[0], subcategory=subs[0])), "subsubcategory", region)
+    dm.query("investments", Query(inv_type="Investment"))
+    dm.query("investments", Query(inv_type="Return"))
+    dm.get_kh_details()
+    dm.investment_pivot(Query(year=year))
+
+
+def dt_tables(dm, region, year, month):
+    """Data side of refresh_dt_tables (all three sub-tabs) and plot_daily_total"""
+    view = dm.month_view(region, year, month)
+    matrix = view.matrix("category")
+    if matrix.columns:
+        cat = matrix.columns[0]
+        view.matrix("subcategory", cat)
+        subs = dm.distinct_values(region=region, year=year, month=month, category=cat)
+        if subs:
+            view.matrix("subsubcategory", cat, subs[0])
+
+
+def pie_views(app, year):
+    """Data side of plot_pie at each level, plus the trend chart"""
+    FinanceApp.compute_pie_state(app, year, "GER", "category", None, None)
+    FinanceApp.compute_pie_state(app, year, "BD", "subcategory", "Food", None)
+    FinanceApp.compute_pie_state(app, year, "GER", "subsubcategory", "Food", "Food 1")
+    FinanceApp.compute_pie_state(app, year, "Investment", "category", None, None)
+    FinanceApp.compute_trend_state(app, year)
+
+
+def bench_scale(name, n_expenses, repeat, workdir):
+    ledger = make_ledger(n_expenses)
+    results = {}
+    last_year = FIRST_YEAR + YEARS - 1
+
+    data_dir = os.path.join(workdir, name)
+    os.makedirs(data_dir)
+    with working_dir(data_dir):
+        dm = DataManager(autoload=False)
+        dm.data = ledger
+        dm.rebuild_indexes()
+        results["save_data"] = time_op(dm.save_data, repeat)
+        results["load_data"] = time_op(lambda: DataManager(), repeat)
+
+        # Views see a fresh data version every run (the first draw after an edit)
+        dm = DataManager()
+        app = headless_app(dm)
+        results["frame_build"] = time_op(lambda: dm.frame("expenses"), repeat, dm.touch)
+        results["get_summary_df"] = time_op(dm.get_summary_df, repeat, dm.touch)
+        results["get_kh_details"] = time_op(dm.get_kh_details, repeat, dm.touch)
+        results["update_summary"] = time_op(lambda: dm.monthly_summary(Query(year="All")), repeat, dm.touch)
+        results["update_summary_year"] = time_op(lambda: dm.monthly_summary(Query(year=last_year)), repeat, dm.touch)
+        results["generate_db_tables"] = time_op(lambda: db_tables(dm, "All", "All"), repeat, dm.touch)
+        results["generate_db_tables_year"] = time_op(lambda: db_tables(dm, last_year, "BD"), repeat, dm.touch)
+        results["refresh_dt_tables"] = time_op(lambda: dt_tables(dm, "GER", last_year, 6), repeat, dm.touch)
+        results["plot_pie"] = time_op(lambda: pie_views(app, "All"), repeat, dm.touch)
+        results["plot_pie_year"] = time_op(lambda: pie_views(app, last_year), repeat, dm.touch)
+
+        # Same filters again without a data change -> cached frames/indexes
+        dm.touch()
+        dt_tables(dm, "GER", last_year, 6)
+        results["refresh_dt_tables_warm"] = time_op(lambda: dt_tables(dm, "GER", last_year, 6), repeat)
+        results["generate_db_tables_warm"] = time_op(lambda: db_tables(dm, last_year, "BD"), repeat)
+
+    # Legacy single-file export merged into an empty data folder
+    export = os.path.join(workdir, f"{name}_export.json")
+    with open(export, "w") as f:
+        json.dump(ledger, f)
+
+    def fresh_dir():
+        path = os.path.join(workdir, f"{name}_migrate")
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        os.chdir(path)
+        fresh_dir.dm = DataManager(autoload=False)
+
+    old = os.getcwd()
+    try:
+        results["migrate_old_file"] = time_op(lambda: fresh_dir.dm.migrate_old_file(export), repeat, fresh_dir)
+    finally:
+        os.chdir(old)
+
+    sizes = {"expenses": len(ledger["expenses"]), "income": len(ledger["income"]),
+             "investments": len(ledger["investments"])}
+    return {"records": sizes, "ops": results}
+
+
+# ==========================================
+# Baseline comparison
+# ==========================================
+
+def compare(results, baseline, threshold, min_delta):
+    """Rows (scale, op, baseline, current, ratio) for every op slower than the baseline allows"""
+    regressions = []
+    for scale, entry in results["scales"].items():
+        base_ops = baseline.get("scales", {}).get(scale, {}).get("ops", {})
+        for op, timing in entry["ops"].items():
+            base = base_ops.get(op)
+            if base is None:
+                continue
+            ratio = timing["median"] / base["median"] if base["median"] else float("inf")
+            if ratio > threshold and timing["median"] - base["median"] > min_delta:
+                regressions.append((scale, op, base["median"], timing["median"], ratio))
+    return regressions
+
+
+def print_table(results, baseline):
+    base_scales = baseline.get("scales", {}) if baseline else {}
+    print(f"{'scale':<6} {'operation':<26} {'median ms':>11} {'best ms':>10} {'baseline ms':>12} {'ratio':>7}")
+    for scale, entry in results["scales"].items():
+        base_ops = base_scales.get(scale, {}).get("ops", {})
+        for op, timing in entry["ops"].items():
+            base = base_ops.get(op)
+            base_ms = f"{base['median'] * 1000:12.2f}" if base else f"{'-':>12}"
+            ratio = f"{timing['median'] / base['median']:7.2f}" if base and base["median"] else f"{'-':>7}"
+            print(f"{scale:<6} {op:<26} {timing['median'] * 1000:11.2f} {timing['best'] * 1000:10.2f} {base_ms} {ratio}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time FinMan's data layer on synthetic ledgers.")
+    parser.add_argument("--scales", default="1k,100k", help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, help="runs per operation (default depends on scale)")
+    parser.add_argument("--output", "-o", help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.5, help="median/baseline ratio counted as a regression")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    scales = [s.strip().lower() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+
+    results = {
+        "meta": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": FinMan.np.__version__,
+                 "platform": platform.platform(), "first_year": FIRST_YEAR, "years": YEARS},
+        "scales": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="finman_bench_")
+    try:
+        for scale in scales:
+            n, repeat = SCALES[scale]
+            print(f"[{scale}] {n} expenses...", file=sys.stderr)
+            results["scales"][scale] = bench_scale(scale, n, args.repeat or repeat, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = FinMan.load_json_file(args.baseline, None)
+    print_table(results, baseline)
+
+    if args.output:
+        FinMan.save_json_file(args.output, results)
+    if args.update_baseline:
+        # Keep scales that weren't run this time
+        merged = baseline or {"scales": {}}
+        merged["meta"] = results["meta"]
+        merged["scales"].update(results["scales"])
+        FinMan.save_json_file(args.baseline, merged)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        for scale, op, base, current, ratio in regressions:
+            print(f"REGRESSION {scale} {op}: {base * 1000:.2f} ms -> {current * 1000:.2f} ms ({ratio:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Write-path benchmark: cost of entering one record as the ledger grows.
+
+Starts from synthetic ledgers of increasing size (see bench_finman.py),
+then drives add_expense / add_income / add_investment (80/15/5 mix, dates
+in the latest year like everyday entry) and records per-entry latency
+percentiles and the bytes rewritten on disk per entry, under each way the
+app can persist:
+
+    full     every add_* call saves on its own (the Input tab): the entry's
+             year file plus the latest one, which holds the balances
+    batched  add_* calls inside batched_saves(), one save per --batch entries
+             (inbox ingestion) covering the years they touched; the save is
+             charged to the entry that closes the batch
+    bulk     add_*_bulk() with --batch records at a time (imports), cost split evenly
+
+    python benchmarks/bench_writes.py
+    python benchmarks/bench_writes.py --sizes 1k,10k,100k,1m --rate 20 -o writes.json
+
+Bytes are the sizes of the data files rewritten by each call (files whose
+mtime/size changed), so they count what save_data produced, not OS caching.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from bench_finman import FIRST_YEAR, YEARS, make_ledger, working_dir
+from FinMan import DataManager, np
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+MODES = ["full", "batched", "bulk"]
+LATEST_YEAR = FIRST_YEAR + YEARS - 1
+
+
+def data_files():
+    """finance_data file -> (mtime_ns, size)"""
+    result = {}
+    for f in os.listdir("."):
+        if f.startswith("finance_data"):
+            st = os.stat(f)
+            result[f] = (st.st_mtime_ns, st.st_size)
+    return result
+
+
+def bytes_rewritten(before, after):
+    return sum(size for f, (mtime, size) in after.items() if before.get(f) != (mtime, size))
+
+
+def make_entries(n, ledger, seed=1):
+    """n (kind, record) pairs shaped like the add_* arguments"""
+    rng = random.Random(seed)
+    paths = [(region, cat, sub, leaf)
+             for region, cats in ledger["categories"].items()
+             for cat, subs in cats.items() for sub, leaves in subs.items() for leaf in leaves]
+    entries = []
+    for _ in range(n):
+        day = f"{LATEST_YEAR}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"
+        pick = rng.random()
+        if pick < 0.8:
+            region, cat, sub, leaf = rng.choice(paths)
+            amount = round(rng.uniform(1, 150), 2) if region == "GER" else float(rng.randrange(50, 5000))
+            entries.append(("expenses", {"region": region, "category": cat, "subcategory": sub, "subsubcategory": leaf,
+                                         "amount_local": amount, "rate": 140.0, "date": day}))
+        elif pick < 0.95:
+            entries.append(("income", {"source": "Freelance", "amount": round(rng.uniform(50, 900), 2), "date": day}))
+        else:
+            entries.append(("investments", {"type": "Investment", "category": "Stocks", "amount": 250.0,
+                                            "date": day, "description": "monthly plan"}))
+    return entries
+
+
+def add_one(dm, kind, e):
+    if kind == "expenses":
+        dm.add_expense(e["region"], e["category"], e["subcategory"], e["subsubcategory"], e["amount_local"], e["rate"], e["date"])
+    elif kind == "income":
+        dm.add_income(e["source"], e["amount"], e["date"])
+    else:
+        dm.add_investment(e["type"], e["category"], e["amount"], e["date"], e["description"])
+
+
+def add_bulk(dm, batch):
+    by_kind = {"expenses": [], "income": [], "investments": []}
+    for kind, e in batch:
+        by_kind[kind].append(e)
+    if by_kind["expenses"]:
+        dm.add_expenses_bulk(by_kind["expenses"])
+    if by_kind["income"]:
+        dm.add_incomes_bulk(by_kind["income"])
+    if by_kind["investments"]:
+        dm.add_investments_bulk(by_kind["investments"])
+
+
+def pace(next_at, rate):
+    """Hold a sustained entry rate (rate <= 0 means as fast as possible)"""
+    if rate <= 0:
+        return
+    delay = next_at - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def run_mode(mode, dm, entries, batch, rate):
+    """(per-entry latencies in seconds, per-entry bytes written)"""
+    latencies, written = [], []
+    interval = 1.0 / rate if rate > 0 else 0.0
+    start = time.perf_counter()
+
+    if mode == "bulk":
+        for first in range(0, len(entries), batch):
+            chunk = entries[first:first + batch]
+            pace(start + first * interval, rate)
+            before = data_files()
+            t0 = time.perf_counter()
+            add_bulk(dm, chunk)
+            elapsed = time.perf_counter() - t0
+            nbytes = bytes_rewritten(before, data_files())
+            latencies += [elapsed / len(chunk)] * len(chunk)
+            written += [nbytes / len(chunk)] * len(chunk)
+        return latencies, written
+
+    if mode == "full":
+        for i, (kind, e) in enumerate(entries):
+            pace(start + i * interval, rate)
+            before = data_files()
+            t0 = time.perf_counter()
+            add_one(dm, kind, e)
+            latencies.append(time.perf_counter() - t0)
+            written.append(bytes_rewritten(before, data_files()))
+        return latencies, written
+
+    # batched: the deferred save runs when the block closes, inside the last entry's timing
+    for first in range(0, len(entries), batch):
+        chunk = entries[first:first + batch]
+        before = data_files()
+        block = dm.batched_saves()
+        block.__enter__()
+        for i, (kind, e) in enumerate(chunk):
+            pace(start + (first + i) * interval, rate)
+            t0 = time.perf_counter()
+            add_one(dm, kind, e)
+            if i == len(chunk) - 1:
+                block.__exit__(None, None, None)
+            latencies.append(time.perf_counter() - t0)
+        written += [0] * (len(chunk) - 1) + [bytes_rewritten(before, data_files())]
+    return latencies, written
+
+
+def summarize(latencies, written, wall):
+    lat = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    return {
+        "entries": len(latencies),
+        "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+        "mean_ms": float(lat.mean()), "max_ms": float(lat.max()),
+        "bytes_per_entry": float(np.mean(written)),
+        "entries_per_s": len(latencies) / wall if wall else 0.0,
+    }
+
+
+def default_count(size, mode):
+    # A year file rewrite per entry gets slow on big ledgers; keep those runs short
+    if mode == "full":
+        return max(10, min(300, 2_000_000 // size))
+    return 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-entry write latency and bytes written for FinMan.")
+    parser.add_argument("--sizes", default="1k,10k,100k", help=f"existing ledger sizes, from {', '.join(SIZES)}")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--entries", type=int, help="entries per run (default depends on size and mode)")
+    parser.add_argument("--batch", type=int, default=50, help="entries per save in batched/bulk mode")
+    parser.add_argument("--rate", type=float, default=0.0, help="target entries per second (0 = unthrottled)")
+    parser.add_argument("--output", "-o", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    bad = [s for s in sizes if s not in SIZES] + [m for m in modes if m not in MODES]
+    if bad:
+        parser.error(f"unknown size/mode: {', '.join(bad)}")
+
+    results = {"batch": args.batch, "rate": args.rate, "sizes": {}}
+    workdir = tempfile.mkdtemp(prefix="finman_writes_")
+    print(f"{'size':<6} {'mode':<8} {'entries':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'KB/entry':>10} {'entries/s':>10}")
+    try:
+        for size in sizes:
+            results["sizes"][size] = {}
+            for mode in modes:
+                ledger = make_ledger(SIZES[size])
+                path = os.path.join(workdir, f"{size}_{mode}")
+                os.makedirs(path)
+                with working_dir(path):
+                    dm = DataManager(autoload=False)
+                    dm.data = ledger
+                    dm.rebuild_indexes()
+                    dm.save_data()
+                    entries = make_entries(args.entries or default_count(SIZES[size], mode), ledger)
+                    t0 = time.perf_counter()
+                    latencies, written = run_mode(mode, dm, entries, args.batch, args.rate)
+                    row = summarize(latencies, written, time.perf_counter() - t0)
+                shutil.rmtree(path, ignore_errors=True)
+                results["sizes"][size][mode] = row
+                print(f"{size:<6} {mode:<8} {row['entries']:>7} {row['p50_ms']:9.2f} {row['p95_ms']:9.2f} "
+                      f"{row['p99_ms']:9.2f} {row['bytes_per_entry'] / 1024:10.1f} {row['entries_per_s']:10.1f}", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())